@@ -0,0 +1,65 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+from fastapi import HTTPException
+
+
+class AdmissionLimiter:
+    """
+    Bounds concurrent upstream calls and sheds load when the queue is full.
+
+    At most `max_concurrency` callers hold a slot at once and at most
+    `max_queue` wait for one. A caller arriving to a full queue gets a 429;
+    one that waits longer than `queue_timeout` seconds gets a 503. Both carry
+    a Retry-After header.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_queue: int = 32, queue_timeout: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self) -> None:
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=429, detail="AI server is at capacity, try again shortly.", headers={"Retry-After": "1"})
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise HTTPException(status_code=503, detail="Timed out waiting for an AI slot.", headers={"Retry-After": "5"})
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out
+        }
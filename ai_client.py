@@ -1,49 +1,287 @@
+import asyncio
 import httpx
-from typing import Dict, Any, Optional
+import json
+import time
+from typing import Dict, Any, Optional, AsyncIterator, Tuple, List, Set
+from generation_cache import Generation, GenerationCache, cache_key
+from model_router import TEMPLATE
+from ai_transport import MultiplexedConnection
+from telemetry import registry, span, trace, trace_headers, current_trace_id, record_usage
+
+# Tokens reported back by the AI server, and time to first streamed token
+tokens_counter = registry.counter("ai_client_tokens_total", "Model tokens used by AIClient calls, from ModelResponse.usage.")
+ttft_histogram = registry.histogram("ai_client_ttft_seconds", "Time to first streamed token seen by AIClient.")
 
 class AIClient:
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        max_connections: int = 20,
+        timeout: float = 60.0,
+        cache: Optional[GenerationCache] = None,
+        batch_window: float = 0.0,
+        max_batch_size: int = 16,
+        transport: str = "http"
+    ):
         self.base_url = base_url
-        self.client = httpx.AsyncClient()
+        self.cache = cache
+        # transport="ws" multiplexes unbatched generations over one WebSocket to /ws,
+        # falling back to HTTP while that connection is unavailable.
+        self.connection: Optional[MultiplexedConnection] = None
+        if transport == "ws":
+            ws_url = base_url.replace("https://", "wss://").replace("http://", "ws://")
+            self.connection = MultiplexedConnection(f"{ws_url}/ws", request_timeout=timeout)
+        self.ws_fallbacks = 0
+        # Micro-batching: with a positive window, concurrent generate_content calls
+        # are collected for up to `batch_window` seconds and sent to /generate_batch.
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._pending: List[Tuple[Dict[str, Any], "asyncio.Future[Generation]"]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.batched_items = 0
+        # Model calls are slow, so the read timeout is generous but connecting is not.
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(timeout, connect=5.0)
+        )
+        self.requests = 0
+        self.in_flight = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.streams = 0
+        self.ttft_samples = 0
+        self.total_ttft = 0.0
 
     async def generate_content(
         self,
         prompt: str,
-        model: str = "claude-3-opus-20240229",
+        model: Optional[str] = None,
         max_tokens: int = 1000,
         temperature: float = 0.7,
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        cache: bool = True,
+        kind: Optional[str] = None,
+        fallback: bool = True
     ) -> str:
         """
         Generate content using the AI server.
         
         Args:
             prompt: The input prompt for the AI
-            model: The model to use (default: claude-3-opus-20240229)
+            model: The model to use (default: chosen by the AI server's router for `kind`)
             max_tokens: Maximum number of tokens to generate
             temperature: Controls randomness (0.0 to 1.0)
             context: Optional context for the generation
+            cache: Set to False to always make a fresh upstream call
+            kind: What the text is for (personality, recommendation, commentary);
+                selects the AI server's model tier, token budget and deadline
+            fallback: Set to False to get "" instead of the AI server's stock
+                template text when no model answered in time
             
         Returns:
             The generated text response
         """
+        payload = {
+            "prompt": prompt,
+            "model": model,
+            "kind": kind,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "context": context
+        }
+        self.in_flight += 1
+        try:
+            if self.cache is None:
+                response, _, used_model = await self._generate(payload)
+            elif not cache or not self.cache.cacheable(temperature):
+                self.cache.bypassed += 1
+                response, _, used_model = await self._generate(payload)
+            else:
+                key = cache_key(prompt, model, max_tokens, temperature, context, kind)
+                response, _, used_model = await self.cache.fetch(key, lambda: self._generate(payload))
+        finally:
+            self.in_flight -= 1
+        if used_model == TEMPLATE and not fallback:
+            return ""
+        return response
+
+    async def _generate(self, payload: Dict[str, Any]) -> Generation:
+        """Runs one generation and returns (text, usage, model); ("", {}, None) on failure."""
+        if self.batch_window > 0:
+            return await self._enqueue(payload)
+        return await self._post_generate(payload)
+
+    async def _post_generate(self, payload: Dict[str, Any]) -> Generation:
+        started = time.perf_counter()
+        self.requests += 1
+        try:
+            with span("ai_client.generate", model=payload["model"], kind=payload["kind"]) as record:
+                data = None
+                if self.connection is not None:
+                    try:
+                        data = await self.connection.request({**payload, "trace_id": current_trace_id.get()})
+                        record["attributes"]["transport"] = "ws"
+                    except ConnectionError as e:
+                        self.ws_fallbacks += 1
+                        print(f"AI WebSocket unavailable, using HTTP: {e}")
+                if data is None:
+                    response = await self.client.post(f"{self.base_url}/generate", json=payload, headers=trace_headers())
+                    response.raise_for_status()
+                    data = response.json()
+                    record["attributes"]["transport"] = "http"
+            usage = data.get("usage", {})
+            record_usage(tokens_counter, usage, model=data.get("model"))
+            return data["response"], usage, data.get("model")
+        except Exception as e:
+            self.errors += 1
+            print(f"Error generating content: {e}")
+            return "", {}, None
+        finally:
+            self.total_latency += time.perf_counter() - started
+
+    async def _enqueue(self, payload: Dict[str, Any]) -> Generation:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # The batch is sent from another task, so each item carries its caller's trace id
+        self._pending.append(({**payload, "trace_id": current_trace_id.get()}, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._send_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _send_batch(self, batch: List[Tuple[Dict[str, Any], "asyncio.Future[Generation]"]]) -> None:
+        """POSTs a collected batch and resolves each caller's future with its own result."""
+        if len(batch) == 1:
+            payload, future = batch[0]
+            with trace(payload.pop("trace_id")):
+                result = await self._post_generate(payload)
+            if not future.done():
+                future.set_result(result)
+            return
+
+        started = time.perf_counter()
+        self.requests += 1
+        self.batches += 1
+        self.batched_items += len(batch)
         try:
+            trace_ids = [payload.pop("trace_id") for payload, _ in batch]
             response = await self.client.post(
-                f"{self.base_url}/generate",
+                f"{self.base_url}/generate_batch",
+                json={"requests": [payload for payload, _ in batch], "trace_ids": trace_ids},
+                headers=trace_headers()
+            )
+            response.raise_for_status()
+            items = response.json()["responses"]
+            for item in items:
+                if item.get("response"):
+                    record_usage(tokens_counter, item["response"].get("usage", {}), model=item["response"]["model"])
+        except Exception as e:
+            self.errors += 1
+            print(f"Error generating batch: {e}")
+            items = [{"error": str(e)}] * len(batch)
+        finally:
+            self.total_latency += time.perf_counter() - started
+
+        for (_, future), item in zip(batch, items):
+            if future.done():
+                continue
+            if item.get("response"):
+                response = item["response"]
+                future.set_result((response["response"], response.get("usage", {}), response.get("model")))
+            else:
+                print(f"Error generating content: {item.get('error')}")
+                future.set_result(("", {}, None))
+
+    async def stream_content(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        context: Optional[Dict[str, Any]] = None,
+        kind: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream generated content from the AI server as it is produced.
+
+        Takes the same arguments as generate_content and yields text chunks.
+        Errors are logged and end the stream early, mirroring generate_content
+        returning "" on failure. Time-to-first-token is folded into stats().
+        """
+        started = time.perf_counter()
+        first_token = True
+        self.streams += 1
+        self.in_flight += 1
+        try:
+            async with self.client.stream(
+                "POST",
+                f"{self.base_url}/generate_stream",
+                headers=trace_headers(),
                 json={
                     "prompt": prompt,
                     "model": model,
+                    "kind": kind,
                     "max_tokens": max_tokens,
                     "temperature": temperature,
                     "context": context
                 }
-            )
-            response.raise_for_status()
-            return response.json()["response"]
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    if event["type"] == "delta":
+                        if first_token:
+                            first_token = False
+                            ttft = time.perf_counter() - started
+                            self.ttft_samples += 1
+                            self.total_ttft += ttft
+                            ttft_histogram.observe(ttft, kind=kind or "default")
+                        yield event["text"]
+                    elif event["type"] == "done":
+                        record_usage(tokens_counter, event.get("usage", {}), model=event.get("model"))
+                    elif event["type"] == "error":
+                        raise RuntimeError(event.get("detail", "stream error"))
         except Exception as e:
-            print(f"Error generating content: {e}")
-            return ""
+            self.errors += 1
+            print(f"Error streaming content: {e}")
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Request counters and average latency for calls to the AI server."""
+        return {
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "errors": self.errors,
+            "avg_latency_ms": (self.total_latency / self.requests * 1000) if self.requests else 0.0,
+            "streams": self.streams,
+            "avg_ttft_ms": (self.total_ttft / self.ttft_samples * 1000) if self.ttft_samples else 0.0,
+            "batches": self.batches,
+            "avg_batch_size": (self.batched_items / self.batches) if self.batches else 0.0,
+            "ws": self.connection.stats() if self.connection else None,
+            "ws_fallbacks": self.ws_fallbacks,
+            "cache": self.cache.stats() if self.cache else None
+        }
 
     async def close(self):
-        """Close the HTTP client."""
-        await self.client.aclose() 
\ No newline at end of file
+        """Close the HTTP client and the WebSocket connection, if any."""
+        if self.connection is not None:
+            await self.connection.close()
+        await self.client.aclose()
+        if self.cache is not None:
+            self.cache.close() 
\ No newline at end of file
@@ -1,10 +1,16 @@
-from fastapi import FastAPI, HTTPException, WebSocket
+from fastapi import FastAPI, HTTPException, WebSocket, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
-import anthropic
 import os
+import json
+import time
 from dotenv import load_dotenv
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+import asyncio
+from admission import AdmissionLimiter
+from model_router import DEFAULT_KIND, TEMPLATE, router_from_env, template_text
+from telemetry import registry, trace, span, timed, record_usage, current_trace_id, TRACE_HEADER
 
 # Load environment variables
 load_dotenv('api.env')
@@ -20,18 +26,72 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Metrics exported at /metrics
+request_duration = registry.histogram("ai_server_request_duration_seconds", "AI server HTTP request latency by route.")
+tokens_counter = registry.counter("ai_server_tokens_total", "Anthropic tokens used, from ModelResponse.usage.")
+ttft_histogram = registry.histogram("ai_server_ttft_seconds", "Upstream time to first streamed token.")
+
+def route_label(request: Request) -> str:
+    """The matched route's template, or "other" for unmatched paths, so metric labels stay bounded."""
+    return getattr(request.scope.get("route"), "path", "other")
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Continues the caller's trace (X-Trace-Id) or starts one, and times the request."""
+    started = time.perf_counter()
+    with trace(request.headers.get(TRACE_HEADER)) as trace_id:
+        try:
+            response = await call_next(request)
+        finally:
+            # The route is only known once the router has matched the request
+            request_duration.observe(time.perf_counter() - started, path=route_label(request))
+    response.headers[TRACE_HEADER] = trace_id
+    return response
+
 # Load Anthropic API key
 anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
 
-# Initialize Anthropic client
-client = anthropic.Anthropic(
-    api_key=anthropic_api_key,
-    base_url="https://api.anthropic.com/v1"
+# Async Anthropic client so model calls never block the event loop. The SDK is
+# imported and the client built on first use to keep cold starts fast.
+async_client = None
+
+def get_async_client():
+    global async_client
+    if async_client is None:
+        import anthropic
+        async_client = anthropic.AsyncAnthropic(
+            api_key=anthropic_api_key,
+            base_url="https://api.anthropic.com/v1"
+        )
+    return async_client
+
+# Bounds concurrent upstream calls; excess requests queue, then get 429/503
+limiter = AdmissionLimiter(
+    max_concurrency=int(os.getenv("AI_MAX_CONCURRENCY", "8")),
+    max_queue=int(os.getenv("AI_MAX_QUEUE", "32")),
+    queue_timeout=float(os.getenv("AI_QUEUE_TIMEOUT", "30"))
 )
 
+registry.gauge("ai_server_active_requests", "Upstream calls holding a limiter slot.", lambda: limiter.active)
+registry.gauge("ai_server_queued_requests", "Requests waiting for a limiter slot.", lambda: limiter.waiting)
+registry.gauge("ai_server_shed_requests", "Requests shed with 429 or 503 so far.", lambda: limiter.rejected + limiter.timed_out)
+
+# Maps request kinds (personality, recommendation, commentary) to model tiers,
+# token budgets and deadlines, with fallback to faster tiers or local templates
+router = router_from_env()
+
+def upstream_pressure() -> float:
+    """Queued requests per upstream slot; scales the router's latency predictions."""
+    return limiter.waiting / limiter.max_concurrency
+
+# Largest batch accepted by /generate_batch. Each item takes its own limiter slot, so
+# a batch never exceeds what the limiter can run or queue; larger ones would shed their own tail.
+MAX_BATCH_SIZE = min(int(os.getenv("AI_MAX_BATCH_SIZE", "64")), limiter.max_concurrency + limiter.max_queue)
+
 class ModelRequest(BaseModel):
     prompt: str
-    model: str = "claude-3-opus-20240229"
+    model: Optional[str] = None  # None lets the router pick a tier for the kind
+    kind: Optional[str] = None  # personality, recommendation, commentary; None is the default route
     max_tokens: int = 1000
     temperature: float = 0.7
     context: Optional[Dict[str, Any]] = None
@@ -40,6 +100,19 @@ class ModelResponse(BaseModel):
     response: str
     model: str
     usage: Dict[str, int]
+    route: Optional[Dict[str, Any]] = None
+
+class BatchRequest(BaseModel):
+    requests: List[ModelRequest]
+    trace_ids: Optional[List[Optional[str]]] = None  # Per-item trace ids; items may come from different sessions
+
+class BatchItem(BaseModel):
+    response: Optional[ModelResponse] = None
+    error: Optional[str] = None
+    status_code: int = 200
+
+class BatchResponse(BaseModel):
+    responses: List[BatchItem]
 
 @app.get("/")
 async def root():
@@ -47,66 +120,270 @@ async def root():
 
 @app.post("/generate", response_model=ModelResponse)
 async def generate_content(request: ModelRequest):
+    async def attempt(model: str, prompt: str, max_tokens: int) -> ModelResponse:
+        return await call_model(request.model_copy(update={"model": model, "prompt": prompt, "max_tokens": max_tokens}))
+
     try:
-        # Prepare the message for Claude
-        message = client.messages.create(
-            model=request.model,
-            max_tokens=request.max_tokens,
-            temperature=request.temperature,
-            messages=[
-                {"role": "user", "content": request.prompt}
-            ]
+        # A full limiter (429) or a slot wait that times out (503) is returned as is, not routed around
+        result, decision = await router.run(
+            request.kind, request.prompt, request.max_tokens, request.model, attempt,
+            pressure=upstream_pressure(), slot=limiter.slot
         )
+    except asyncio.TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    if decision["tier"] == TEMPLATE:
+        return ModelResponse(response=result, model=TEMPLATE, usage={}, route=decision)
+    result.route = decision
+    return result
+
+async def call_model(request: ModelRequest) -> ModelResponse:
+    try:
+        # Prepare the message for Claude
+        with span("anthropic.messages.create", model=request.model):
+            message = await get_async_client().messages.create(
+                model=request.model,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature,
+                messages=[
+                    {"role": "user", "content": request.prompt}
+                ]
+            )
         
         # Extract the response
         response_text = message.content[0].text if message.content else ""
         
+        usage = {
+            "input_tokens": message.usage.input_tokens,
+            "output_tokens": message.usage.output_tokens
+        }
+        record_usage(tokens_counter, usage, model=request.model)
         return ModelResponse(
             response=response_text,
             model=request.model,
-            usage={
-                "input_tokens": message.usage.input_tokens,
-                "output_tokens": message.usage.output_tokens
-            }
+            usage=usage
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/generate_batch", response_model=BatchResponse)
+async def generate_batch(batch: BatchRequest):
+    """
+    Runs several generations in one HTTP round-trip. Items fan out upstream
+    concurrently, each taking its own limiter slot, and fail independently.
+    """
+    if len(batch.requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} requests per batch.")
+
+    async def run_item(request: ModelRequest, trace_id: Optional[str]) -> BatchItem:
+        with trace(trace_id or current_trace_id.get()):
+            try:
+                return BatchItem(response=await generate_content(request))
+            except HTTPException as e:
+                return BatchItem(error=str(e.detail), status_code=e.status_code)
+
+    trace_ids = batch.trace_ids or []
+    return BatchResponse(responses=await asyncio.gather(*(
+        run_item(request, trace_ids[index] if index < len(trace_ids) else None)
+        for index, request in enumerate(batch.requests)
+    )))
+
+async def stream_events(request: ModelRequest):
+    """
+    Yields newline-delimited JSON events for a streamed completion:
+    {"type": "delta", "text": ...} per chunk, then one {"type": "done", ...}
+    carrying usage, time-to-first-token and the routing decision, or
+    {"type": "error", ...}.
+
+    The router picks the tier; its deadline applies to the first token, and
+    a kind with a template falls back to it when the deadline passes.
+    """
+    started = time.perf_counter()
+    first_token_at = None
+    kind = request.kind or DEFAULT_KIND
+    route = router.route_for(kind)
+    prompt, max_tokens = router.budget(kind, request.prompt, request.max_tokens)
+    tier = router.choose(kind, request.model, pressure=upstream_pressure())
+    reason = "preferred" if tier is not None and tier.name == router.candidates(route, request.model)[0].name else "predicted_miss"
+
+    def template_events(reason: str):
+        decision = router.decide(kind, TEMPLATE, TEMPLATE, reason, started)
+        yield json.dumps({"type": "delta", "text": template_text(kind, prompt)}) + "\n"
+        yield json.dumps({"type": "done", "model": TEMPLATE, "usage": {}, "ttft_ms": None, "route": decision}) + "\n"
+
+    if tier is None:
+        for event in template_events("predicted_miss"):
+            yield event
+        return
+
+    try:
+        async with get_async_client().messages.stream(
+            model=tier.model,
+            max_tokens=max_tokens,
+            temperature=request.temperature,
+            messages=[
+                {"role": "user", "content": prompt}
+            ]
+        ) as stream:
+            texts = stream.text_stream.__aiter__()
+            try:
+                text = await asyncio.wait_for(texts.__anext__(), timeout=route.deadline)
+            except asyncio.TimeoutError:
+                if template_text(kind, prompt) is None:
+                    raise
+                for event in template_events("timeout"):
+                    yield event
+                return
+            except StopAsyncIteration:
+                text = None
+            if text is not None:
+                first_token_at = time.perf_counter()
+                ttft_histogram.observe(first_token_at - started, model=tier.model)
+                yield json.dumps({"type": "delta", "text": text}) + "\n"
+                async for text in texts:
+                    yield json.dumps({"type": "delta", "text": text}) + "\n"
+            message = await stream.get_final_message()
+        usage = {
+            "input_tokens": message.usage.input_tokens,
+            "output_tokens": message.usage.output_tokens
+        }
+        record_usage(tokens_counter, usage, model=tier.model)
+        yield json.dumps({
+            "type": "done",
+            "model": tier.model,
+            "usage": usage,
+            "ttft_ms": (first_token_at - started) * 1000 if first_token_at else None,
+            "route": router.decide(kind, tier.name, tier.model, reason, started)
+        }) + "\n"
+    except Exception as e:
+        yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
+class SlotStreamingResponse(StreamingResponse):
+    """
+    Streams a response that holds a limiter slot, releasing it however the
+    response ends. If the request is cancelled before the body is iterated
+    (the client went away), the generator's own cleanup never runs, so the
+    release also happens when the response itself finishes or is cancelled.
+    """
+
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
+@app.post("/generate_stream")
+async def generate_stream(request: ModelRequest):
+    # Admission happens before the response starts so overload still maps to 429/503;
+    # the slot is held until the stream finishes.
+    await limiter.acquire()
+    released = False
+
+    def release() -> None:
+        nonlocal released
+        if not released:
+            released = True
+            limiter.release()
+
+    async def limited_events():
+        try:
+            async for event in stream_events(request):
+                yield event
+        finally:
+            release()
+
+    return SlotStreamingResponse(limited_events(), release, media_type="application/x-ndjson")
+
+@app.get("/stats")
+async def get_stats():
+    return {"limiter": limiter.stats(), "router": router.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return registry.render()
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Ready when an API key is configured and the limiter still has queue room."""
+    if not anthropic_api_key:
+        raise HTTPException(status_code=503, detail="ANTHROPIC_API_KEY is not set")
+    if limiter.waiting >= limiter.max_queue:
+        raise HTTPException(status_code=503, detail="At capacity")
+    return {"status": "ready"}
+
+MODEL_INFO = {
+    "quality": {"name": "Claude 3 Opus", "capabilities": ["complex_reasoning", "creative_tasks", "long_form_content"]},
+    "balanced": {"name": "Claude 3 Sonnet", "capabilities": ["general_purpose", "creative_tasks"]},
+    "fast": {"name": "Claude 3 Haiku", "capabilities": ["fast_responses", "general_purpose"]}
+}
+
 @app.get("/models")
 async def list_models():
+    """The router's tiers, slowest first, with their current latency estimates and the kinds routed to them."""
     return {
         "models": [
             {
-                "id": "claude-3-opus-20240229",
-                "name": "Claude 3 Opus",
-                "capabilities": ["complex_reasoning", "creative_tasks", "long_form_content"]
-            },
-            {
-                "id": "claude-3-sonnet-20240229",
-                "name": "Claude 3 Sonnet",
-                "capabilities": ["general_purpose", "creative_tasks"]
-            },
-            {
-                "id": "claude-3-haiku-20240229",
-                "name": "Claude 3 Haiku",
-                "capabilities": ["fast_responses", "general_purpose"]
+                "id": tier.model,
+                "tier": tier.name,
+                **MODEL_INFO.get(tier.name, {"name": tier.model, "capabilities": []}),
+                "latency_ms": tier.latency * 1000,
+                "kinds": [kind for kind, route in router.routes.items() if route.tier == tier.name]
             }
+            for tier in reversed(router.tiers)
         ]
     }
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
+    """
+    Multiplexed generation over one socket. Requests carrying an "id" run
+    concurrently and their responses ({"id", "response"} or {"id", "error",
+    "status_code"}) may arrive out of order; requests without an id are
+    answered one at a time, in order, with the bare ModelResponse as before.
+    """
     await websocket.accept()
+    send_lock = asyncio.Lock()
+    tasks = set()
+
+    async def handle(payload: Dict[str, Any]) -> None:
+        request_id = payload.pop("id", None)
+        try:
+            with trace(payload.pop("trace_id", None)), timed(request_duration, path="/ws"):
+                response = (await generate_content(ModelRequest(**payload))).model_dump()
+            message = response if request_id is None else {"id": request_id, "response": response}
+        except HTTPException as e:
+            message = {"id": request_id, "error": str(e.detail), "status_code": e.status_code}
+        except Exception as e:
+            message = {"id": request_id, "error": str(e), "status_code": 400}
+        async with send_lock:
+            await websocket.send_json(message)
+
     try:
         while True:
-            data = await websocket.receive_text()
-            request = ModelRequest.parse_raw(data)
-            response = await generate_content(request)
-            await websocket.send_json(response.dict())
+            payload = json.loads(await websocket.receive_text())
+            if payload.get("id") is None:
+                # Without an id the client can only match responses by order
+                await handle(payload)
+                continue
+            task = asyncio.create_task(handle(payload))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
     except Exception as e:
         print(f"WebSocket error: {e}")
     finally:
-        await websocket.close()
+        for task in tasks:
+            task.cancel()
+        try:
+            await websocket.close()
+        except Exception:
+            pass
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,105 @@
+import asyncio
+import itertools
+import json
+import time
+from typing import Any, Dict, Optional
+
+# websockets is imported on first connect; it is only needed for AI_TRANSPORT=ws.
+
+
+class MultiplexedConnection:
+    """
+    One persistent WebSocket to ai_server's /ws shared by many concurrent calls.
+
+    Every request carries an id and responses are matched back by id, so they
+    may complete out of order. The socket is opened lazily and reopened on the
+    next request after a failure (at most once per `reconnect_delay` seconds);
+    while it is down, request() raises ConnectionError so callers can fall back
+    to HTTP.
+    """
+
+    def __init__(self, url: str, request_timeout: float = 60.0, reconnect_delay: float = 1.0):
+        self.url = url
+        self.request_timeout = request_timeout
+        self.reconnect_delay = reconnect_delay
+        self._ws = None
+        self._reader: Optional[asyncio.Task] = None
+        self._pending: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+        self._ids = itertools.count(1)
+        self._connect_lock = asyncio.Lock()
+        self._last_attempt = 0.0
+        self.connects = 0
+        self.disconnects = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None
+
+    async def _ensure_connected(self) -> None:
+        if self._ws is not None:
+            return
+        async with self._connect_lock:
+            if self._ws is not None:
+                return
+            if time.monotonic() - self._last_attempt < self.reconnect_delay:
+                raise ConnectionError("AI server WebSocket is reconnecting")
+            self._last_attempt = time.monotonic()
+            import websockets
+            try:
+                self._ws = await websockets.connect(self.url, max_size=None)
+            except (OSError, websockets.WebSocketException) as e:
+                raise ConnectionError(f"Could not connect to {self.url}: {e}") from e
+            self.connects += 1
+            self._reader = asyncio.create_task(self._read_loop(self._ws))
+
+    async def _read_loop(self, ws) -> None:
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                future = self._pending.pop(str(message.get("id")), None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except Exception as e:
+            print(f"AI server WebSocket closed: {e}")
+        finally:
+            if self._ws is ws:
+                self._ws = None
+                self.disconnects += 1
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("AI server WebSocket closed"))
+
+    async def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Sends one generation request and returns the ModelResponse dict."""
+        await self._ensure_connected()
+        ws = self._ws
+        request_id = str(next(self._ids))
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            text = json.dumps({**payload, "id": request_id})
+            try:
+                await ws.send(text)
+            except Exception as e:
+                raise ConnectionError("AI server WebSocket closed") from e
+            message = await asyncio.wait_for(future, timeout=self.request_timeout)
+        finally:
+            self._pending.pop(request_id, None)
+        if message.get("error"):
+            raise RuntimeError(message["error"])
+        return message["response"]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "in_flight": len(self._pending),
+            "connects": self.connects,
+            "disconnects": self.disconnects
+        }
+
+    async def close(self) -> None:
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await self._reader
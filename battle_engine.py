@@ -0,0 +1,128 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Damage dealt when attack equals defense; scaled by the attack/defense ratio.
+BASE_DAMAGE = 20
+# Power of the basic moves (Tackle, Scratch, ...) BASE_DAMAGE corresponds to.
+REFERENCE_POWER = 40
+
+
+class StatRecord:
+    """Compact, flat view of the base stats the battle code reads every turn."""
+
+    __slots__ = ("name", "id", "hp", "attack", "defense", "special_attack", "special_defense", "speed", "types")
+
+    def __init__(
+        self,
+        name: str,
+        id: int | None,
+        hp: int = 0,
+        attack: int = 0,
+        defense: int = 0,
+        special_attack: int = 0,
+        special_defense: int = 0,
+        speed: int = 0,
+        types: Tuple[str, ...] = ()
+    ):
+        self.name = name
+        self.id = id
+        self.hp = hp
+        self.attack = attack
+        self.defense = defense
+        self.special_attack = special_attack
+        self.special_defense = special_defense
+        self.speed = speed
+        self.types = types
+
+    @classmethod
+    def from_species(cls, species: Dict[str, Any]) -> "StatRecord":
+        """Normalizes PokeAPI's nested `stats` and `types` lists into a StatRecord."""
+        values = {
+            stat['stat']['name'].replace('-', '_'): stat['base_stat']
+            for stat in species.get('stats') or []
+        }
+        types = sorted(species.get('types') or [], key=lambda entry: entry.get('slot', 0))
+        return cls(
+            name=species['name'],
+            id=species.get('id'),
+            hp=values.get('hp', 0),
+            attack=values.get('attack', 0),
+            defense=values.get('defense', 0),
+            special_attack=values.get('special_attack', 0),
+            special_defense=values.get('special_defense', 0),
+            speed=values.get('speed', 0),
+            types=tuple(entry['type']['name'] for entry in types)
+        )
+
+    def __repr__(self) -> str:
+        return f"StatRecord({self.name!r}, hp={self.hp}, attack={self.attack}, defense={self.defense})"
+
+
+# Species stats never change, so each species is normalized once per process.
+_records: Dict[str, StatRecord] = {}
+
+
+def stat_record(species: Dict[str, Any]) -> StatRecord:
+    """
+    Returns the cached StatRecord for a species dict, building it on first use.
+    Only dicts with `stats` are cached, so a partial dict never stands in for
+    the full record; a cached record without types is rebuilt once a dict
+    that carries them arrives.
+    """
+    record = _records.get(species['name'])
+    if record is None or (not record.types and species.get('types')):
+        record = StatRecord.from_species(species)
+        if 'stats' in species:
+            _records[species['name']] = record
+    return record
+
+
+def move_damage(
+    attacker: StatRecord,
+    defender: StatRecord,
+    power: int = REFERENCE_POWER,
+    multiplier: float = 1.0,
+    special: bool = False
+) -> int:
+    """
+    Damage for a hit with a move of the given power. `multiplier` is type
+    effectiveness times any same-type bonus; special moves use the special
+    stats. A reference-power physical move with no multiplier deals what the
+    original PokemonGame.attack did, and a move with no power or no effect
+    deals nothing.
+    """
+    if power <= 0 or multiplier <= 0:
+        return 0
+    if special:
+        ratio = attacker.special_attack / (defender.special_defense or 1)
+    else:
+        ratio = attacker.attack / (defender.defense or 1)
+    return max(1, int(ratio * (BASE_DAMAGE * power / REFERENCE_POWER * multiplier)))
+
+
+def damage_batch(pairs: Iterable[Tuple[StatRecord, StatRecord]]) -> List[int]:
+    """Damage for many (attacker, defender) hits with a basic, typeless move."""
+    return [move_damage(attacker, defender) for attacker, defender in pairs]
+
+
+def apply_turns(
+    hps: List[int],
+    attackers: Sequence[StatRecord],
+    defenders: Sequence[StatRecord],
+    moves: Optional[Sequence[Optional[str]]] = None,
+    damage: Optional[Callable[[StatRecord, StatRecord, Optional[str]], int]] = None
+) -> List[int]:
+    """
+    Resolves one hit per battle for a batch of battles.
+
+    `hps[i]` is the defender's current HP in battle i; returns the damage
+    dealt per battle and updates `hps` in place, clamping at zero. With a
+    `damage` function (MoveIndex.damage), battle i's hit uses `moves[i]`;
+    without one every hit is a basic, typeless move.
+    """
+    if damage is None:
+        damages = damage_batch(zip(attackers, defenders))
+    else:
+        damages = [damage(attacker, defender, move) for attacker, defender, move in zip(attackers, defenders, moves)]
+    for i, dealt in enumerate(damages):
+        hps[i] = max(0, hps[i] - dealt)
+    return damages
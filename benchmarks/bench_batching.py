@@ -0,0 +1,60 @@
+"""
+Latency vs throughput of AIClient micro-batching against the fake AI server.
+
+Fires `calls` concurrent generate_content calls for several batch windows
+and reports throughput, per-call latency and how many HTTP requests the
+client actually made.
+
+Run from the project root:
+    python benchmarks/bench_batching.py [calls]
+"""
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("FAKE_AI_LATENCY", "0.05")
+os.environ.setdefault("FAKE_AI_TOKEN_DELAY", "0")
+
+from harness import percentile, serve_in_thread
+
+from ai_client import AIClient
+from fake_ai_server import app as fake_app
+
+PORT = 8767
+WINDOWS_MS = [0, 2, 10, 25]
+
+
+async def run(base_url: str, calls: int, window_ms: float, max_batch_size: int) -> None:
+    client = AIClient(base_url=base_url, batch_window=window_ms / 1000, max_batch_size=max_batch_size)
+    latencies = []
+
+    async def one(i: int) -> None:
+        started = time.perf_counter()
+        await client.generate_content(prompt=f"Describe move {i}", max_tokens=20)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - started
+    stats = client.stats()
+    await client.close()
+    print(
+        f"window={window_ms:>4} ms  max_batch={max_batch_size:<3} {calls / elapsed:8.1f} calls/s  "
+        f"p50={percentile(latencies, 50):7.1f} ms  p99={percentile(latencies, 99):7.1f} ms  "
+        f"http_requests={stats['requests']:<4} avg_batch={stats['avg_batch_size']:.1f}"
+    )
+
+
+def main() -> None:
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with serve_in_thread(fake_app, PORT) as base_url:
+        for window_ms in WINDOWS_MS:
+            for max_batch_size in (16, 64):
+                if window_ms == 0 and max_batch_size != 16:
+                    continue
+                asyncio.run(run(base_url, calls, window_ms, max_batch_size))
+
+
+if __name__ == "__main__":
+    main()
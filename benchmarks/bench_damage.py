@@ -0,0 +1,65 @@
+"""
+Compares the original dict-scan damage path with the StatRecord engine.
+
+Run from the project root:
+    python benchmarks/bench_damage.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battle_engine import damage_batch, move_damage, stat_record  # noqa: E402
+
+TURNS = 100_000
+
+
+def make_species(name: str, hp: int, attack: int, defense: int) -> dict:
+    stats = [
+        ("hp", hp), ("attack", attack), ("defense", defense),
+        ("special-attack", 65), ("special-defense", 65), ("speed", 45)
+    ]
+    return {
+        "name": name,
+        "id": hash(name) % 1000,
+        "stats": [{"base_stat": value, "effort": 0, "stat": {"name": stat, "url": ""}} for stat, value in stats]
+    }
+
+
+def dict_scan_damage(attacking_pokemon: dict, defending_pokemon: dict) -> int:
+    """The pre-engine PokemonGame.attack damage calculation."""
+    attacker_attack = 0
+    defender_defense = 0
+    for stat in attacking_pokemon.get('stats', []):
+        if stat['stat']['name'] == 'attack':
+            attacker_attack = stat['base_stat']
+            break
+    for stat in defending_pokemon.get('stats', []):
+        if stat['stat']['name'] == 'defense':
+            defender_defense = stat['base_stat']
+            break
+    if defender_defense == 0:
+        defender_defense = 1
+    return max(1, int((attacker_attack / defender_defense) * 20))
+
+
+def main() -> None:
+    attacker = make_species("pikachu", 35, 55, 40)
+    defender = make_species("bulbasaur", 45, 49, 49)
+    assert dict_scan_damage(attacker, defender) == move_damage(stat_record(attacker), stat_record(defender))
+
+    pairs = [(stat_record(attacker), stat_record(defender))] * TURNS
+    results = {
+        "dict scan": timeit.timeit(lambda: dict_scan_damage(attacker, defender), number=TURNS),
+        "stat record": timeit.timeit(lambda: move_damage(stat_record(attacker), stat_record(defender)), number=TURNS),
+        "batch": timeit.timeit(lambda: damage_batch(pairs), number=1),
+    }
+    baseline = results["dict scan"]
+    print(f"{TURNS} turns")
+    for label, seconds in results.items():
+        print(f"{label:>12}: {seconds * 1e9 / TURNS:8.1f} ns/turn  ({baseline / seconds:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Bytes on the wire per /ws message: the old full-dict frames vs the compact wire schema.
+
+Replays one session (six catches, a selection and a battle) and builds each
+frame the way server.py did before wire.py, and the way it does now.
+Species data is PokeAPI-shaped. The compact frames are measured as JSON
+text and, if msgpack is installed, as MessagePack.
+
+Run from the project root:
+    python benchmarks/bench_payloads.py [turns]
+"""
+import json
+import sys
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Tuple
+
+from harness import pokeapi_species
+
+from wire import SpeciesTracker, battle_start, turn_delta
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MOVES = ["Tackle", "Quick Attack", "Scratch", "Bite"]
+TEAM_SIZE = 6
+DESCRIPTION = "species-1 used Tackle! It dealt 12 damage.\nspecies-99 used Bite! It dealt 9 damage."
+
+
+def caught(index: int) -> Dict[str, Any]:
+    """PokemonGame.make_caught_entry() plus a personality."""
+    species = pokeapi_species(index)
+    return {"name": species['name'], "id": species['id'], "stats": species['stats'], "sprites": species['sprites'],
+            "hp": None, "moves": list(MOVES), "personality": "Likes collecting shiny stones."}
+
+
+def session_before(turns: int) -> List[Tuple[str, Dict[str, Any]]]:
+    team: List[Dict[str, Any]] = []
+    frames = []
+    for index in range(1, TEAM_SIZE + 1):
+        team.append(caught(index))
+        frames.append(("catch", {"type": "catch_result", "caught_pokemon": team[-1]['name'], "caught_list": team,
+                                 "newly_caught_personality": team[-1]['personality']}))
+    player = {**team[0], "hp": 60}
+    opponent = {**pokeapi_species(99), "hp": 60}
+    frames.append(("select", {"type": "game_state", "player_pokemon": player, "opponent_pokemon": opponent}))
+    for turn in range(turns):
+        player['hp'], opponent['hp'] = player['hp'] - 1, opponent['hp'] - 2
+        frames.append(("turn", {"type": "game_state", "player_pokemon": player, "opponent_pokemon": opponent,
+                                "description": DESCRIPTION, "move": MOVES[turn % 4], "winner": None}))
+    return frames
+
+
+def session_after(turns: int) -> List[Tuple[str, Dict[str, Any]]]:
+    tracker = SpeciesTracker()
+    team: List[Dict[str, Any]] = []
+    frames = []
+    for index in range(1, TEAM_SIZE + 1):
+        team.append(caught(index))
+        frames.append(("catch", tracker.frame(team[-1])))
+        frames.append(("catch", {"type": "catch_result", "caught_pokemon": team[-1]['name'], "slot": index - 1,
+                                 "team": [entry['name'] for entry in team],
+                                 "newly_caught_personality": team[-1]['personality']}))
+    player = {**team[0], "hp": 60}
+    opponent = {**pokeapi_species(99), "hp": 60}
+    frames.append(("select", tracker.frame(player, opponent)))
+    frames.append(("select", {"type": "game_state", **battle_start(player, opponent)}))
+    for turn in range(turns):
+        player['hp'], opponent['hp'] = player['hp'] - 1, opponent['hp'] - 2
+        frames.append(("turn", {"type": "game_state", **turn_delta(player, opponent, DESCRIPTION, MOVES[turn % 4], None)}))
+    return [(kind, frame) for kind, frame in frames if frame]
+
+
+def measure(frames: List[Tuple[str, Dict[str, Any]]], encoder: Callable[[Any], bytes]) -> Dict[str, List[int]]:
+    sizes: Dict[str, List[int]] = defaultdict(list)
+    for kind, frame in frames:
+        sizes[kind].append(len(encoder(frame)))
+    return sizes
+
+
+def main() -> None:
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    as_json = lambda frame: json.dumps(frame, separators=(",", ":")).encode()  # noqa: E731
+    before = measure(session_before(turns), as_json)
+    columns = [("before (json)", before), ("after (json)", measure(session_after(turns), as_json))]
+    if msgpack is not None:
+        columns.append(("after (msgpack)", measure(session_after(turns), msgpack.packb)))
+
+    print(f"{'bytes':<16}" + "".join(f"{name:>18}" for name, _ in columns))
+    events = {"catch": TEAM_SIZE, "select": 1, "turn": turns}
+    for kind, label in (("catch", "per catch"), ("select", "per selection"), ("turn", "per attack turn")):
+        print(f"{label:<16}" + "".join(f"{sum(sizes[kind]) / events[kind]:>18,.0f}" for _, sizes in columns))
+    print(f"{'whole session':<16}" + "".join(
+        f"{sum(sum(values) for values in sizes.values()):>18,}" for _, sizes in columns
+    ))
+    if msgpack is None:
+        print("(pip install msgpack to measure MessagePack frames)")
+
+
+if __name__ == "__main__":
+    main()
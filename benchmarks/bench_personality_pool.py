@@ -0,0 +1,120 @@
+"""
+Catch latency with the pre-generated personality pool vs a live model call per catch.
+
+A simulated AI server answers personality requests in about PERSONALITY_LATENCY
+seconds (the fast tier, scaled by SCALE). Players catch random species from
+a ROSTER-sized roster, with a pause between catches. Two setups run:
+  - live:    every catch awaits its own generation, as before the pool
+  - pooled:  the warmup worker gets a head start while the server is idle,
+             then keeps refilling behind the catches, rate-limited and
+             holding off while a catch is waiting on a live call
+
+Run from the project root:
+    python benchmarks/bench_personality_pool.py [catches]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from harness import percentile
+
+from personality_pool import PersonalityPool
+
+SCALE = 0.05
+PERSONALITY_LATENCY = 0.8
+ROSTER = 150
+PLAYERS = 8
+# Seconds between one player's catches, and idle time before the first one (full scale)
+CATCH_INTERVAL = 4.0
+WARMUP = 120.0
+
+
+class FakeAI:
+    def __init__(self):
+        self.in_flight = 0
+        self.calls = 0
+
+    async def generate(self, name: str) -> str:
+        self.in_flight += 1
+        self.calls += 1
+        try:
+            await asyncio.sleep(PERSONALITY_LATENCY * SCALE * random.uniform(0.7, 1.6))
+            return f"{name} hums a tune nobody else has ever heard."
+        finally:
+            self.in_flight -= 1
+
+
+async def play(catches: int, catch) -> list:
+    latencies = []
+
+    async def player(count: int) -> None:
+        for _ in range(count):
+            await asyncio.sleep(CATCH_INTERVAL * SCALE * random.uniform(0.5, 1.5))
+            started = time.perf_counter()
+            waited_on_model = await catch(f"species-{random.randrange(ROSTER)}")
+            # Only time spent waiting on the (scaled) model is scaled back up
+            elapsed = (time.perf_counter() - started) * 1000
+            latencies.append(elapsed / SCALE if waited_on_model else elapsed)
+
+    await asyncio.gather(*(player(catches // PLAYERS) for _ in range(PLAYERS)))
+    return latencies
+
+
+def report(name: str, latencies: list, extra: str = "") -> None:
+    print(f"{name:<8} catch p50 {percentile(latencies, 50):8.2f} ms  p99 {percentile(latencies, 99):8.2f} ms  {extra}")
+
+
+async def run_live(catches: int) -> None:
+    ai = FakeAI()
+
+    async def catch(name: str) -> bool:
+        await ai.generate(name)
+        return True
+
+    report("live", await play(catches, catch), f"model calls {ai.calls}")
+
+
+async def run_pooled(catches: int) -> None:
+    ai = FakeAI()
+    with tempfile.TemporaryDirectory() as directory:
+        pool = PersonalityPool(
+            db_path=os.path.join(directory, "pool.sqlite3"),
+            depth=2,
+            generate=ai.generate,
+            species=lambda: [f"species-{i}" for i in range(ROSTER)],
+            busy=lambda: ai.in_flight > pool.active,
+            concurrency=2,
+            rate=4.0 / SCALE,
+            busy_backoff=0.05 * SCALE
+        )
+        worker = asyncio.create_task(pool.run())
+        await asyncio.sleep(WARMUP * SCALE)
+        warmed = len(pool)
+
+        async def catch(name: str) -> bool:
+            if pool.take(name) is not None:
+                return False
+            await ai.generate(name)
+            return True
+
+        latencies = await play(catches, catch)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        stats = pool.stats()
+        report("pooled", latencies, f"hit ratio {stats['hit_ratio']:.0%}, depth {warmed} after warmup -> {stats['depth']}, "
+                                    f"deferred {stats['deferred']} times for interactive calls")
+        pool.close()
+
+
+async def main() -> None:
+    catches = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    print(f"{catches} catches by {PLAYERS} players from a {ROSTER}-species roster; latencies at full scale")
+    await run_live(catches)
+    await run_pooled(catches)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""
+Recommendation latency: the local move-scoring engine vs a model round-trip.
+
+Builds random matchups between typed species and recommends a move for each:
+  - local:  moves.MoveIndex.recommend() plus the reason text, as get_recommendation now answers
+  - ai:     one routed "recommendation" call per request, as before, against a
+            simulated upstream (balanced tier latency, scaled down by SCALE so
+            the run is quick, reported at full scale)
+
+Also reports how often the recommended move differs from Tackle and how much
+more damage it deals.
+
+Run from the project root:
+    python benchmarks/bench_recommendation.py [requests]
+"""
+import asyncio
+import random
+import sys
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from harness import percentile
+
+from battle_engine import StatRecord
+from model_router import DEFAULT_ROUTES, ModelRouter, Route, default_tiers
+from moves import BASIC_MOVES, MoveIndex, recommendation_text
+
+SCALE = 0.05
+TYPES = ["normal", "fire", "water", "grass", "psychic", "rock", "ghost", "dark", "fighting", "steel", "fairy"]
+UPSTREAM_LATENCY = {"claude-3-haiku-20240307": 0.7, "claude-3-sonnet-20240229": 1.8, "claude-3-opus-20240229": 4.5}
+
+
+def species(rng: random.Random, index: int) -> StatRecord:
+    types = tuple(rng.sample(TYPES, rng.choice((1, 2))))
+    return StatRecord(f"species-{index}", index, *(rng.randint(30, 130) for _ in range(6)), types=types)
+
+
+def matchups(count: int):
+    rng = random.Random(7)
+    return [(species(rng, 2 * i), species(rng, 2 * i + 1), rng.randint(1, 130)) for i in range(count)]
+
+
+def run_local(pairs) -> None:
+    index = MoveIndex(path=None)
+    latencies = []
+    picks = Counter()
+    gain = 0
+    for attacker, defender, hp in pairs:
+        started = time.perf_counter_ns()
+        pick = index.recommend(attacker, defender, hp, BASIC_MOVES)
+        recommendation_text(pick, defender.name)
+        latencies.append((time.perf_counter_ns() - started) / 1e6)
+        picks[pick["move"]] += 1
+        gain += pick["damage"] - pick["scores"]["Tackle"]
+    print(f"local  p50 {percentile(latencies, 50):9.3f} ms  p99 {percentile(latencies, 99):9.3f} ms")
+    not_tackle = len(pairs) - picks["Tackle"]
+    print(f"       picks {dict(picks)}; differs from Tackle in {not_tackle / len(pairs):.0%} of matchups, "
+          f"+{gain / max(1, not_tackle):.1f} damage when it does")
+
+
+async def run_ai(requests: int) -> None:
+    tiers = default_tiers()
+    for tier in tiers:
+        tier.expected_latency *= SCALE
+        tier.latency *= SCALE
+    routes = {kind: Route(route.tier, route.max_tokens, route.deadline * SCALE, route.max_prompt_chars)
+              for kind, route in DEFAULT_ROUTES.items()}
+    router = ModelRouter(tiers=tiers, routes=routes)
+
+    async def call(model, prompt, max_tokens):
+        await asyncio.sleep(UPSTREAM_LATENCY[model] * SCALE * random.uniform(0.7, 1.6))
+        return SimpleNamespace(response="Tackle because it's a basic reliable move.", model=model, usage={})
+
+    latencies = []
+
+    async def one() -> None:
+        _, decision = await router.run("recommendation", "x" * 400, 100, None, call)
+        latencies.append(decision["latency_ms"] / SCALE)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    print(f"ai     p50 {percentile(latencies, 50):9.0f} ms  p99 {percentile(latencies, 99):9.0f} ms  (routed, full scale)")
+
+
+def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{requests} recommendations")
+    run_local(matchups(requests))
+    asyncio.run(run_ai(requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Catch-time species sampling: the old per-catch list rebuild vs RosterIndex.
+
+Run from the project root:
+    python benchmarks/bench_roster.py
+"""
+import asyncio
+import random
+import time
+
+import harness  # noqa: F401  (puts the project root on sys.path)
+
+from roster import RosterIndex
+
+SIZES = [150, 1_000, 10_000, 100_000]
+CATCHES = 2_000
+
+
+def list_rebuild_catch(all_pokemon_names, caught_pokemon):
+    """The pre-index PokemonGame.catch_pokemon name selection."""
+    available_to_catch = [name for name in all_pokemon_names if name not in [p['name'] for p in caught_pokemon]]
+    return random.choice(available_to_catch)
+
+
+async def main() -> None:
+    for size in SIZES:
+        names = [f"species-{i}" for i in range(size)]
+        team = [{"name": name} for name in random.sample(names, 5)]
+        roster = RosterIndex(path=None)
+        roster.set_names(names)
+
+        # The old path is O(N * team); fewer iterations keep large rosters tractable
+        rebuild_catches = max(5, CATCHES * 150 // size)
+        started = time.perf_counter()
+        for _ in range(rebuild_catches):
+            list_rebuild_catch(names, team)
+        rebuild = (time.perf_counter() - started) / rebuild_catches
+
+        caught = {p['name'] for p in team}
+        started = time.perf_counter()
+        for _ in range(CATCHES):
+            await roster.sample(exclude=caught)
+        indexed = (time.perf_counter() - started) / CATCHES
+
+        print(f"roster={size:>7}  list rebuild {rebuild * 1e6:10.1f} us/catch   index {indexed * 1e6:6.2f} us/catch")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
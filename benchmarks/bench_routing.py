@@ -0,0 +1,102 @@
+"""
+Tiered model routing vs the old everything-on-Opus setup.
+
+Drives a game-shaped mix of request kinds through model_router.ModelRouter
+against a simulated upstream whose latency depends on the model tier. The
+latencies, tier estimates and deadlines are all scaled down by SCALE so the
+run is quick. Three setups run:
+  - baseline:  every call made directly on the quality tier, no deadlines, as before routing
+  - routed:    each kind on its own tier with its budget and deadline
+  - overload:  routed, with the upstream queue four times deeper than its concurrency
+
+Run from the project root:
+    python benchmarks/bench_routing.py [requests]
+"""
+import asyncio
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+
+from harness import percentile
+
+from model_router import DEFAULT_ROUTES, ModelRouter, Route, default_tiers
+
+SCALE = 0.05
+# Mean seconds per call by tier at full scale, with some jitter
+UPSTREAM_LATENCY = {"claude-3-haiku-20240307": 0.7, "claude-3-sonnet-20240229": 1.8, "claude-3-opus-20240229": 4.5}
+# Roughly what one game produces: a few catches, then a recommendation and commentary per turn
+MIX = ["personality"] * 3 + ["recommendation"] * 6 + ["commentary"] * 6
+
+
+def scaled_router() -> ModelRouter:
+    tiers = default_tiers()
+    for tier in tiers:
+        tier.expected_latency *= SCALE
+        tier.latency *= SCALE
+    routes = {kind: Route(route.tier, route.max_tokens, route.deadline * SCALE, route.max_prompt_chars)
+              for kind, route in DEFAULT_ROUTES.items()}
+    return ModelRouter(tiers=tiers, routes=routes)
+
+
+async def upstream(model: str, prompt: str, max_tokens: int, slow: float = 1.0):
+    await asyncio.sleep(UPSTREAM_LATENCY[model] * SCALE * slow * random.uniform(0.7, 1.6))
+    return SimpleNamespace(response="ok", model=model, usage={"input_tokens": len(prompt) // 4, "output_tokens": max_tokens})
+
+
+async def run_baseline(requests: int) -> None:
+    quality = default_tiers()[-1]
+    latencies = defaultdict(list)
+    cost = 0.0
+
+    async def one(kind: str) -> None:
+        nonlocal cost
+        started = time.perf_counter()
+        result = await upstream(quality.model, "x" * 400, 1000)
+        latencies[kind].append((time.perf_counter() - started) * 1000 / SCALE)
+        cost += quality.cost(result.usage)
+
+    await asyncio.gather(*(one(random.choice(MIX)) for _ in range(requests)))
+    print(f"\nbaseline (every call on {quality.model}, max_tokens 1000): estimated cost ${cost:.2f}")
+    for kind in ("personality", "recommendation", "commentary"):
+        samples = latencies[kind]
+        print(f"  {kind:<15} p50 {percentile(samples, 50):7.0f} ms  p99 {percentile(samples, 99):7.0f} ms")
+
+
+async def run(name: str, requests: int, pressure: float = 0.0) -> None:
+    router = scaled_router()
+    # Queueing in front of the upstream makes every call slower under overload
+    slow = 1.0 + pressure
+
+    async def call(model, prompt, max_tokens):
+        return await upstream(model, prompt, max_tokens, slow)
+
+    latencies = defaultdict(list)
+    tiers = Counter()
+
+    async def one(kind: str) -> None:
+        _, decision = await router.run(kind, "x" * 400, 1000, None, call, pressure=pressure)
+        latencies[kind].append(decision["latency_ms"] / SCALE)
+        tiers[(kind, decision["tier"], decision["reason"])] += 1
+
+    await asyncio.gather(*(one(random.choice(MIX)) for _ in range(requests)))
+    stats = router.stats()
+    print(f"\n{name}: saved {stats['saved_seconds'] / SCALE:,.0f} s of latency vs the quality tier, "
+          f"estimated cost ${stats['estimated_cost_usd']:.2f}")
+    for kind in ("personality", "recommendation", "commentary"):
+        samples = latencies[kind]
+        routes = ", ".join(f"{tier}/{reason} {count}" for (k, tier, reason), count in sorted(tiers.items()) if k == kind)
+        print(f"  {kind:<15} p50 {percentile(samples, 50):7.0f} ms  p99 {percentile(samples, 99):7.0f} ms   {routes}")
+
+
+async def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{requests} requests; latencies reported at full scale")
+    await run_baseline(requests)
+    await run("routed", requests)
+    await run("routed, overloaded upstream", requests, pressure=4.0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
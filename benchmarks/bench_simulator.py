@@ -0,0 +1,50 @@
+"""
+Measures headless battle throughput, single process and across a process pool.
+
+Run from the project root:
+    python benchmarks/bench_simulator.py [pairs] [battles_per_pair]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battle_engine import StatRecord  # noqa: E402
+from simulator import simulate_matchups, summarize  # noqa: E402
+
+
+def random_species(index: int, rng: random.Random) -> StatRecord:
+    return StatRecord(
+        name=f"species-{index}",
+        id=index,
+        hp=rng.randint(20, 255),
+        attack=rng.randint(5, 190),
+        defense=rng.randint(5, 230)
+    )
+
+
+def main() -> None:
+    pair_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    battles = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(42)
+    roster = [random_species(i, rng) for i in range(151)]
+    pairs = [tuple(rng.sample(roster, 2)) for _ in range(pair_count)]
+    total = pair_count * battles
+    cores = os.cpu_count() or 1
+
+    for processes in sorted({1, cores}):
+        started = time.perf_counter()
+        results = simulate_matchups(pairs, battles, processes)
+        elapsed = time.perf_counter() - started
+        summary = summarize(results)
+        print(
+            f"processes={processes:<3} battles={total:<8} {elapsed:6.2f}s  "
+            f"{total / elapsed:10.0f} battles/s  {total / elapsed / processes:10.0f} battles/s/core  "
+            f"win_rate={summary['win_rate']:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Cold-start benchmark for server.py and ai_server.py.
+
+Reports module import time for both apps, then boots server.py under uvicorn
+with a roster snapshot and measures time until /healthz and /readyz answer
+and the latency of the first page request.
+
+Run from the project root:
+    python benchmarks/bench_startup.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+import harness  # noqa: F401  (puts the project root on sys.path)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = 8769
+
+
+def import_time(module: str) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1]) * 1000
+
+
+def wait_for(client: httpx.Client, path: str, started: float, timeout: float = 30.0) -> float:
+    while time.perf_counter() - started < timeout:
+        try:
+            if client.get(f"http://127.0.0.1:{PORT}{path}").status_code == 200:
+                return (time.perf_counter() - started) * 1000
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(f"{path} did not become ready")
+
+
+def boot_server(roster_path: str) -> dict:
+    env = {**os.environ, "ROSTER_PATH": roster_path, "FAST_START": "1"}
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client() as client:
+            healthy = wait_for(client, "/healthz", started)
+            ready = wait_for(client, "/readyz", started)
+            first_started = time.perf_counter()
+            client.get(f"http://127.0.0.1:{PORT}/").raise_for_status()
+            first_page = (time.perf_counter() - first_started) * 1000
+        return {"healthz_ms": healthy, "readyz_ms": ready, "first_page_ms": first_page}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for module in ("server", "ai_server"):
+        samples = [import_time(module) for _ in range(runs)]
+        print(f"import {module:<10} median {statistics.median(samples):7.1f} ms")
+
+    roster_path = os.path.join(tempfile.mkdtemp(), "roster_cache.json")
+    with open(roster_path, "w", encoding="utf-8") as f:
+        json.dump({"names": [f"species-{i}" for i in range(1300)], "filters": {}}, f)
+    boots = [boot_server(roster_path) for _ in range(runs)]
+    for key in ("healthz_ms", "readyz_ms", "first_page_ms"):
+        print(f"{key:<14} median {statistics.median(boot[key] for boot in boots):7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
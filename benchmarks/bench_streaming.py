@@ -0,0 +1,47 @@
+"""
+Compares time-to-first-text of AIClient.generate_content and AIClient.stream_content
+against the local fake AI server.
+
+Run from the project root:
+    python benchmarks/bench_streaming.py [calls]
+"""
+import asyncio
+import sys
+import time
+
+from harness import percentile, serve_in_thread
+
+from ai_client import AIClient
+from fake_ai_server import app as fake_app
+
+PORT = 8765
+
+
+async def measure(base_url: str, calls: int) -> None:
+    client = AIClient(base_url=base_url)
+    blocking, streaming = [], []
+    for _ in range(calls):
+        started = time.perf_counter()
+        await client.generate_content(prompt="Pikachu used Tackle!")
+        blocking.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        first = None
+        async for _chunk in client.stream_content(prompt="Pikachu used Tackle!"):
+            if first is None:
+                first = (time.perf_counter() - started) * 1000
+        streaming.append(first or 0.0)
+    await client.close()
+
+    for label, samples in (("generate_content", blocking), ("stream_content", streaming)):
+        print(f"{label:>17}: first text p50={percentile(samples, 50):7.1f} ms  p99={percentile(samples, 99):7.1f} ms")
+
+
+def main() -> None:
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with serve_in_thread(fake_app, PORT) as base_url:
+        asyncio.run(measure(base_url, calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Per-call overhead of AIClient over HTTP POSTs vs the multiplexed WebSocket.
+
+The fake AI server answers with zero model latency, so the numbers are pure
+transport overhead.
+
+Run from the project root:
+    python benchmarks/bench_transport.py [calls]
+"""
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("FAKE_AI_LATENCY", "0")
+os.environ.setdefault("FAKE_AI_TOKEN_DELAY", "0")
+
+from harness import percentile, serve_in_thread
+
+from ai_client import AIClient
+from fake_ai_server import app as fake_app
+
+PORT = 8768
+CONCURRENCY = [1, 16, 128]
+
+
+async def run(base_url: str, transport: str, concurrency: int, calls: int) -> None:
+    client = AIClient(base_url=base_url, transport=transport)
+    latencies = []
+    remaining = iter(range(calls))
+
+    async def worker() -> None:
+        for i in remaining:
+            started = time.perf_counter()
+            await client.generate_content(prompt=f"Describe move {i}", max_tokens=10)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await client.generate_content(prompt="warmup", max_tokens=1)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stats = client.stats()
+    await client.close()
+    print(
+        f"{transport:>4} concurrency={concurrency:<4} {calls / elapsed:8.0f} calls/s  "
+        f"{elapsed / calls * 1e6:7.0f} us/call  p50={percentile(latencies, 50):6.2f} ms  "
+        f"p99={percentile(latencies, 99):6.2f} ms  fallbacks={stats['ws_fallbacks']}"
+    )
+
+
+def main() -> None:
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with serve_in_thread(fake_app, PORT) as base_url:
+        for concurrency in CONCURRENCY:
+            for transport in ("http", "ws"):
+                asyncio.run(run(base_url, transport, concurrency, calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Input responsiveness of the /ws message pipeline while AI calls are pending.
+
+Each simulated connection asks for a recommendation (a slow AI call) and
+then attacks shortly after. The benchmark times how long the attack waits
+for its game_state:
+  - sequential: the pre-pipeline handler, which awaited the AI call inline
+    before reading the next frame
+  - pipeline:   ws_pipeline.MessagePipeline, where the AI call runs in a
+    background lane and the attack cancels it
+
+It also compares the stdlib JSON encoder with ws_pipeline.encode on a
+game_state frame that carries full PokeAPI sprite dicts.
+
+Run from the project root:
+    python benchmarks/bench_ws_pipeline.py [connections] [ai_latency_s]
+"""
+import asyncio
+import json
+import random
+import sys
+import time
+
+from harness import percentile, pokeapi_species
+
+import ws_pipeline
+from ws_pipeline import MessagePipeline
+
+ATTACK_DELAY = 0.01
+# Connections start at random offsets in this window so they don't all wake in one loop iteration
+START_SPREAD = 0.5
+
+
+class FakeWebSocket:
+    """Just the receive_text/send_text surface the pipeline uses, backed by queues."""
+
+    def __init__(self):
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.outgoing: asyncio.Queue = asyncio.Queue()
+
+    async def receive_text(self) -> str:
+        return await self.incoming.get()
+
+    async def send_text(self, text: str) -> None:
+        await self.outgoing.put(json.loads(text))
+
+
+async def fake_ai_call(ai_latency: float) -> str:
+    await asyncio.sleep(ai_latency)
+    return "Tackle because it's a basic reliable move."
+
+
+async def run_sequential(ws: FakeWebSocket, ai_latency: float) -> None:
+    while True:
+        message = json.loads(await ws.receive_text())
+        if message["type"] == "get_recommendation":
+            await ws.send_text(json.dumps({"type": "recommendation", "recommended_move": await fake_ai_call(ai_latency)}))
+        elif message["type"] == "attack":
+            await ws.send_text(json.dumps({"type": "game_state", "move": message["move"]}))
+
+
+async def run_pipeline(ws: FakeWebSocket, ai_latency: float) -> None:
+    async def recommend() -> None:
+        await pipeline.send({"type": "recommendation", "recommended_move": await fake_ai_call(ai_latency)})
+
+    async def handle(message: dict) -> None:
+        if message["type"] == "get_recommendation":
+            pipeline.spawn(recommend(), lane="recommendation")
+        elif message["type"] == "attack":
+            pipeline.cancel("recommendation")
+            await pipeline.send({"type": "game_state", "move": message["move"]})
+
+    pipeline = MessagePipeline(ws, handle)
+    await pipeline.run()
+
+
+async def client(server, ai_latency: float) -> tuple:
+    await asyncio.sleep(random.uniform(0, START_SPREAD))
+    ws = FakeWebSocket()
+    task = asyncio.create_task(server(ws, ai_latency))
+    await ws.incoming.put(json.dumps({"type": "get_recommendation"}))
+    await asyncio.sleep(ATTACK_DELAY)
+    started = time.perf_counter()
+    await ws.incoming.put(json.dumps({"type": "attack", "move": "Tackle"}))
+    superseded = False
+    # The pipeline reports the cancelled recommendation ahead of the game_state
+    while (frame := await ws.outgoing.get())["type"] != "game_state":
+        superseded = superseded or frame["type"] == "superseded"
+    latency = (time.perf_counter() - started) * 1000
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    return latency, superseded
+
+
+def sprite_heavy_frame() -> dict:
+    """A pre-slimming game_state frame with full PokeAPI sprite dicts."""
+    def pokemon(index: int) -> dict:
+        return {**pokeapi_species(index), "hp": 40, "moves": ["Tackle", "Quick Attack", "Scratch", "Bite"]}
+
+    return {"type": "game_state", "player_pokemon": pokemon(25), "opponent_pokemon": pokemon(1),
+            "description": "species-25 used Tackle! It dealt 12 damage.", "move": "Tackle", "winner": None}
+
+
+def bench_encoding(iterations: int = 2_000) -> None:
+    frame = sprite_heavy_frame()
+    encoders = [("json.dumps", lambda payload: json.dumps(payload, separators=(",", ":"))),
+                (f"ws_pipeline.encode ({'orjson' if ws_pipeline.orjson else 'stdlib fallback'})", ws_pipeline.encode)]
+    for name, encoder in encoders:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            encoder(frame)
+        elapsed = (time.perf_counter() - started) / iterations
+        print(f"{name:<36} {elapsed * 1e6:8.1f} us/frame  ({len(encoder(frame))} bytes)")
+
+
+async def main() -> None:
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    ai_latency = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    print(f"{connections} connections, AI latency {ai_latency * 1000:.0f} ms, attack sent {ATTACK_DELAY * 1000:.0f} ms after the recommendation request")
+    for name, server in (("sequential", run_sequential), ("pipeline", run_pipeline)):
+        results = await asyncio.gather(*(client(server, ai_latency) for _ in range(connections)))
+        latencies = [latency for latency, _ in results]
+        superseded = sum(1 for _, was_superseded in results if was_superseded)
+        print(f"{name:<11} attack reply p50 {percentile(latencies, 50):8.2f} ms  p99 {percentile(latencies, 99):8.2f} ms  "
+              f"superseded recommendations {superseded}/{connections}")
+    bench_encoding()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
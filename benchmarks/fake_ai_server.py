@@ -0,0 +1,101 @@
+"""
+Local stand-in for ai_server.py that never calls Anthropic.
+
+Implements the same /generate, /generate_batch, /generate_stream and /ws contracts with a
+configurable latency so benchmarks can run offline:
+
+    FAKE_AI_LATENCY      seconds before the first token (default 0.2)
+    FAKE_AI_TOKEN_DELAY  seconds between streamed tokens (default 0.02)
+    FAKE_AI_TOKENS       tokens per completion (default 30)
+
+    uvicorn benchmarks.fake_ai_server:app --port 8000
+"""
+import asyncio
+import json
+import os
+
+from fastapi import FastAPI, WebSocket
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+LATENCY = float(os.getenv("FAKE_AI_LATENCY", "0.2"))
+TOKEN_DELAY = float(os.getenv("FAKE_AI_TOKEN_DELAY", "0.02"))
+TOKENS = int(os.getenv("FAKE_AI_TOKENS", "30"))
+
+app = FastAPI(title="Fake AI Server")
+
+
+class ModelRequest(BaseModel):
+    prompt: str
+    model: Optional[str] = None
+    kind: Optional[str] = None
+    max_tokens: int = 1000
+    temperature: float = 0.7
+    context: Optional[Dict[str, Any]] = None
+
+
+def fake_tokens(request: ModelRequest) -> list:
+    count = min(TOKENS, request.max_tokens)
+    return [f"word{i} " for i in range(count)]
+
+
+def served_model(request: ModelRequest) -> str:
+    return request.model or f"fake-{request.kind or 'default'}"
+
+
+def fake_usage(request: ModelRequest, tokens: list) -> Dict[str, int]:
+    return {"input_tokens": len(request.prompt.split()), "output_tokens": len(tokens)}
+
+
+@app.post("/generate")
+async def generate(request: ModelRequest):
+    tokens = fake_tokens(request)
+    await asyncio.sleep(LATENCY + TOKEN_DELAY * len(tokens))
+    return {"response": "".join(tokens), "model": served_model(request), "usage": fake_usage(request, tokens)}
+
+
+class BatchRequest(BaseModel):
+    requests: List[ModelRequest]
+
+
+@app.post("/generate_batch")
+async def generate_batch(batch: BatchRequest):
+    responses = await asyncio.gather(*(generate(request) for request in batch.requests))
+    return {"responses": [{"response": response, "error": None, "status_code": 200} for response in responses]}
+
+
+@app.post("/generate_stream")
+async def generate_stream(request: ModelRequest):
+    tokens = fake_tokens(request)
+
+    async def events():
+        await asyncio.sleep(LATENCY)
+        for token in tokens:
+            yield json.dumps({"type": "delta", "text": token}) + "\n"
+            await asyncio.sleep(TOKEN_DELAY)
+        yield json.dumps({"type": "done", "model": served_model(request), "usage": fake_usage(request, tokens), "ttft_ms": LATENCY * 1000}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+
+    async def handle(payload: dict) -> None:
+        request_id = payload.pop("id", None)
+        response = await generate(ModelRequest(**payload))
+        async with send_lock:
+            await websocket.send_json({"id": request_id, "response": response})
+
+    tasks = set()
+    try:
+        while True:
+            task = asyncio.create_task(handle(json.loads(await websocket.receive_text())))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except Exception:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,128 @@
+"""
+Local stand-in for PokeAPI so the game server can be load-tested offline.
+
+Serves deterministic species under the paths server.py uses (/pokemon listing,
+/pokemon/{name}, /pokemon-species/{name}, /type/{name}, /generation/{name},
+/move/{name}) with a configurable latency:
+
+    FAKE_POKEAPI_LATENCY  seconds added to every response (default 0.02)
+    FAKE_POKEAPI_SPECIES  number of species in the roster (default 1000)
+
+    uvicorn benchmarks.fake_pokeapi:app --port 8001
+"""
+import asyncio
+import os
+import random
+
+from fastapi import FastAPI, HTTPException
+from typing import Any, Dict
+
+LATENCY = float(os.getenv("FAKE_POKEAPI_LATENCY", "0.02"))
+SPECIES = int(os.getenv("FAKE_POKEAPI_SPECIES", "1000"))
+TYPES = ["normal", "fire", "water", "grass", "electric", "psychic", "rock", "ghost"]
+GENERATIONS = ["generation-i", "generation-ii", "generation-iii", "generation-iv"]
+STAT_NAMES = ["hp", "attack", "defense", "special-attack", "special-defense", "speed"]
+# PokeAPI's data for the moves the game uses, and the damage relations of their types
+MOVES = {
+    "tackle": {"power": 40, "type": "normal", "damage_class": "physical"},
+    "quick-attack": {"power": 40, "type": "normal", "damage_class": "physical"},
+    "scratch": {"power": 40, "type": "normal", "damage_class": "physical"},
+    "bite": {"power": 60, "type": "dark", "damage_class": "physical"}
+}
+DAMAGE_RELATIONS = {
+    "normal": {"double_damage_to": [], "half_damage_to": ["rock", "steel"], "no_damage_to": ["ghost"]},
+    "dark": {"double_damage_to": ["psychic", "ghost"], "half_damage_to": ["fighting", "dark", "fairy"], "no_damage_to": []}
+}
+
+app = FastAPI(title="Fake PokeAPI")
+
+
+def species_name(index: int) -> str:
+    return f"species-{index}"
+
+
+def species_index(name: str) -> int:
+    prefix, _, number = name.rpartition("-")
+    if prefix != "species" or not number.isdigit() or int(number) >= SPECIES:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return int(number)
+
+
+def species_payload(index: int) -> Dict[str, Any]:
+    """Shaped like a real /pokemon/{name} payload, including bulk the game never reads."""
+    rng = random.Random(index)
+    return {
+        "id": index + 1,
+        "name": species_name(index),
+        "base_experience": rng.randint(50, 300),
+        "height": rng.randint(1, 30),
+        "weight": rng.randint(10, 1000),
+        "types": [{"slot": 1, "type": {"name": TYPES[index % len(TYPES)], "url": ""}}],
+        "stats": [
+            {"base_stat": rng.randint(30, 130), "effort": 0, "stat": {"name": stat, "url": ""}}
+            for stat in STAT_NAMES
+        ],
+        "sprites": {
+            "front_default": f"https://example.invalid/sprites/{index + 1}.png",
+            "back_default": f"https://example.invalid/sprites/back/{index + 1}.png",
+            "other": {"official-artwork": {"front_default": f"https://example.invalid/art/{index + 1}.png"}}
+        },
+        "moves": [{"move": {"name": f"move-{rng.randint(1, 900)}", "url": ""}} for _ in range(40)]
+    }
+
+
+@app.get("/pokemon")
+async def list_pokemon(limit: int = 20, offset: int = 0):
+    await asyncio.sleep(LATENCY)
+    end = min(SPECIES, offset + limit)
+    return {
+        "count": SPECIES,
+        "results": [{"name": species_name(i), "url": ""} for i in range(offset, end)]
+    }
+
+
+@app.get("/pokemon/{name}")
+async def get_pokemon(name: str):
+    index = species_index(name)
+    await asyncio.sleep(LATENCY)
+    return species_payload(index)
+
+
+@app.get("/pokemon-species/{name}")
+async def get_pokemon_species(name: str):
+    index = species_index(name)
+    await asyncio.sleep(LATENCY)
+    return {"name": name, "varieties": [{"is_default": True, "pokemon": {"name": species_name(index), "url": ""}}]}
+
+
+@app.get("/type/{name}")
+async def get_type(name: str):
+    if name not in TYPES and name not in DAMAGE_RELATIONS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    await asyncio.sleep(LATENCY)
+    relations = DAMAGE_RELATIONS.get(name, {})
+    pokemon = range(TYPES.index(name), SPECIES, len(TYPES)) if name in TYPES else []
+    return {
+        "pokemon": [{"pokemon": {"name": species_name(i), "url": ""}} for i in pokemon],
+        "damage_relations": {key: [{"name": t, "url": ""} for t in names] for key, names in relations.items()}
+    }
+
+
+@app.get("/move/{name}")
+async def get_move(name: str):
+    if name not in MOVES:
+        raise HTTPException(status_code=404, detail="Not Found")
+    await asyncio.sleep(LATENCY)
+    move = MOVES[name]
+    return {"name": name, "power": move["power"], "type": {"name": move["type"], "url": ""},
+            "damage_class": {"name": move["damage_class"], "url": ""}}
+
+
+@app.get("/generation/{name}")
+async def get_generation(name: str):
+    if name not in GENERATIONS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    await asyncio.sleep(LATENCY)
+    size = -(-SPECIES // len(GENERATIONS))
+    start = GENERATIONS.index(name) * size
+    return {"pokemon_species": [{"name": species_name(i), "url": ""} for i in range(start, min(SPECIES, start + size))]}
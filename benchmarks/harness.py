@@ -0,0 +1,48 @@
+"""Shared helpers for the benchmark scripts."""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@contextmanager
+def serve_in_thread(app, port: int, host: str = "127.0.0.1") -> Iterator[str]:
+    """Runs an ASGI app with uvicorn in a background thread and yields its base URL."""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://{host}:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile; returns 0.0 for an empty sample list."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def pokeapi_species(index: int) -> Dict[str, Any]:
+    """A species as PokemonStore keeps it: PokeAPI stats plus the full sprites tree."""
+    urls = {key: f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{key}/{index}.png"
+            for key in ("back_default", "back_female", "back_shiny", "back_shiny_female",
+                        "front_default", "front_female", "front_shiny", "front_shiny_female")}
+    versions = {f"generation-{gen}": {game: dict(urls) for game in ("red-blue", "yellow", "gold", "silver")}
+                for gen in ("i", "ii", "iii", "iv", "v")}
+    stats = [{"base_stat": 50 + i, "effort": 0, "stat": {"name": name, "url": ""}}
+             for i, name in enumerate(("hp", "attack", "defense", "special-attack", "special-defense", "speed"))]
+    return {"name": f"species-{index}", "id": index, "stats": stats,
+            "sprites": {**urls, "other": {"home": dict(urls), "official-artwork": dict(urls)}, "versions": versions}}
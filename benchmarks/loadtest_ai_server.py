@@ -0,0 +1,72 @@
+"""
+Load-tests ai_server's /generate against a stubbed Anthropic upstream.
+
+The real app is served by uvicorn with its async client replaced by a stub
+that sleeps for UPSTREAM_LATENCY seconds, so throughput should scale with
+client concurrency up to AI_MAX_CONCURRENCY and then plateau, with excess
+load shed as 429/503.
+
+Run from the project root:
+    AI_MAX_CONCURRENCY=16 python benchmarks/loadtest_ai_server.py [requests_per_level]
+"""
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+
+from harness import percentile, serve_in_thread
+
+import ai_server
+
+PORT = 8766
+UPSTREAM_LATENCY = float(os.getenv("UPSTREAM_LATENCY", "0.25"))
+LEVELS = [1, 2, 4, 8, 16, 32, 64]
+
+
+class StubMessages:
+    async def create(self, model, max_tokens, temperature, messages):
+        await asyncio.sleep(UPSTREAM_LATENCY)
+        return SimpleNamespace(
+            content=[SimpleNamespace(text="A stubbed completion.")],
+            usage=SimpleNamespace(input_tokens=12, output_tokens=4)
+        )
+
+
+async def run_level(base_url: str, concurrency: int, total: int) -> None:
+    statuses = {}
+    latencies = []
+    remaining = iter(range(total))
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.post(f"{base_url}/generate", json={"prompt": "Pikachu used Tackle!"})
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(
+        f"concurrency={concurrency:<3} {statuses.get(200, 0) / elapsed:7.1f} ok/s  "
+        f"p50={percentile(latencies, 50):7.1f} ms  p99={percentile(latencies, 99):7.1f} ms  statuses={statuses}"
+    )
+
+
+def main() -> None:
+    per_level = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    ai_server.async_client = SimpleNamespace(messages=StubMessages())
+    print(f"upstream latency {UPSTREAM_LATENCY * 1000:.0f} ms, limiter {ai_server.limiter.stats()}")
+    with serve_in_thread(ai_server.app, PORT) as base_url:
+        for level in LEVELS:
+            asyncio.run(run_level(base_url, level, per_level))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Multi-worker load test for session resume over /ws.
+
+Boots the stub PokeAPI and stub AI server, then server.py under uvicorn with
+several worker processes sharing one SQLite session store. Every simulated
+player catches a team and starts a battle, then plays each attack turn on a
+fresh connection: connect, resume with its token, attack, disconnect. The
+kernel spreads those connections over the workers, so most turns resume a
+session last saved by a different process.
+
+After every resume the player checks the team and both HPs against the last
+state it was sent; any difference is a lost update. Reported: resume and
+attack p50/p99, turns/s, resumes that failed and lost updates.
+
+Run from the project root:
+    python benchmarks/loadtest_sessions.py [workers] [players] [turns]
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+import websockets
+
+from harness import percentile
+from loadtest_ws import ROOT, start_app, wait_until_ready
+
+GAME_PORT, AI_PORT, POKEAPI_PORT = 8776, 8777, 8778
+CATCHES = 3
+
+
+class Player:
+    def __init__(self):
+        self.token = ""
+        self.team: List[str] = []
+        self.hp: Dict[str, int] = {}
+        self.over = False
+
+
+async def receive_until(ws, done_types: set) -> Dict[str, Any]:
+    while True:
+        message = json.loads(await ws.recv())
+        if message["type"] in done_types or message["type"] == "error":
+            return message
+
+
+async def timed_request(ws, payload: Dict[str, Any], done_types: set, latencies: Dict[str, List[float]]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    await ws.send(json.dumps(payload))
+    reply = await receive_until(ws, done_types)
+    latencies[payload["type"]].append((time.perf_counter() - started) * 1000)
+    return reply
+
+
+async def start(url: str, player: Player) -> None:
+    async with websockets.connect(url, ping_interval=None, open_timeout=60) as ws:
+        player.token = (await receive_until(ws, {"session"}))["token"]
+        for _ in range(CATCHES):
+            await ws.send(json.dumps({"type": "catch_attempt"}))
+            reply = await receive_until(ws, {"catch_result"})
+            if reply["type"] == "catch_result":
+                player.team.append(reply["caught_pokemon"])
+        await ws.send(json.dumps({"type": "select_pokemon", "pokemon": player.team[0]}))
+        state = await receive_until(ws, {"game_state"})
+        player.hp = {"player_hp": state["player_hp"], "opponent_hp": state["opponent_hp"]}
+
+
+async def turn(url: str, player: Player, latencies: Dict[str, List[float]], counts: Dict[str, int]) -> None:
+    async with websockets.connect(url, ping_interval=None, open_timeout=60) as ws:
+        await receive_until(ws, {"session"})
+        resumed = await timed_request(ws, {"type": "resume", "token": player.token}, {"session_resumed", "session"}, latencies)
+        if resumed["type"] != "session_resumed":
+            counts["resume_failed"] += 1
+            player.over = True
+            return
+        battle = resumed.get("battle") or {}
+        team = [entry["name"] for entry in resumed["caught_list"]]
+        if team != player.team or {key: battle.get(key) for key in player.hp} != player.hp:
+            counts["lost_updates"] += 1
+            player.over = True
+            return
+        state = await timed_request(ws, {"type": "attack", "move": "Tackle"}, {"game_state"}, latencies)
+        if state["type"] == "error":
+            counts["attack_errors"] += 1
+            player.over = True
+            return
+        counts["turns"] += 1
+        player.hp = {"player_hp": state["player_hp"], "opponent_hp": state["opponent_hp"]}
+        player.over = bool(state.get("winner"))
+
+
+async def play(url: str, player: Player, turns: int, latencies: Dict[str, List[float]], counts: Dict[str, int]) -> None:
+    try:
+        await start(url, player)
+        for _ in range(turns):
+            if player.over:
+                break
+            await turn(url, player, latencies, counts)
+    except Exception as e:
+        counts["failed_players"] += 1
+        print(f"player failed: {e!r}")
+
+
+async def run(workers: int, players: int, turns: int) -> None:
+    workdir = tempfile.mkdtemp(prefix="loadtest_sessions-")
+    processes = [
+        start_app("benchmarks.fake_pokeapi:app", POKEAPI_PORT, {"FAKE_POKEAPI_LATENCY": "0.005"}),
+        start_app("benchmarks.fake_ai_server:app", AI_PORT, {"FAKE_AI_LATENCY": "0.02", "FAKE_AI_TOKEN_DELAY": "0.001"})
+    ]
+    try:
+        await wait_until_ready(f"http://127.0.0.1:{POKEAPI_PORT}/pokemon?limit=1")
+        await wait_until_ready(f"http://127.0.0.1:{AI_PORT}/docs")
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "server:app", "--port", str(GAME_PORT),
+             "--workers", str(workers), "--log-level", "warning"],
+            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            env={
+                **os.environ,
+                "POKEAPI_BASE_URL": f"http://127.0.0.1:{POKEAPI_PORT}",
+                "AI_SERVER_URL": f"http://127.0.0.1:{AI_PORT}",
+                "POKEMON_CACHE_PATH": os.path.join(workdir, "pokemon_cache.sqlite3"),
+                "ROSTER_PATH": os.path.join(workdir, "roster_cache.json"),
+                "MOVES_PATH": os.path.join(workdir, "moves_cache.json"),
+                "PERSONALITY_POOL_PATH": os.path.join(workdir, "personality_pool.sqlite3"),
+                "SESSION_STORE": "sqlite",
+                "SESSION_STORE_PATH": os.path.join(workdir, "sessions.sqlite3")
+            }
+        ))
+        await wait_until_ready(f"http://127.0.0.1:{GAME_PORT}/readyz")
+
+        url = f"ws://127.0.0.1:{GAME_PORT}/ws"
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        counts: Dict[str, int] = defaultdict(int)
+        started = time.perf_counter()
+        await asyncio.gather(*(play(url, Player(), turns, latencies, counts) for _ in range(players)))
+        elapsed = time.perf_counter() - started
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+    print(f"workers={workers} players={players} turns<={turns}  {counts['turns'] / elapsed:8.0f} turns/s")
+    for kind in ("resume", "attack"):
+        samples = latencies[kind]
+        print(f"{kind:<8} n={len(samples):<6} p50={percentile(samples, 50):.2f} ms  p99={percentile(samples, 99):.2f} ms")
+    print(f"resumes failed={counts['resume_failed']}  lost updates={counts['lost_updates']}  "
+          f"attack errors={counts['attack_errors']}  failed players={counts['failed_players']}")
+
+
+def main() -> None:
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    players = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    turns = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    asyncio.run(run(workers, players, turns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""
+End-to-end load test for the /ws game loop.
+
+Boots a local stub PokeAPI (fake_pokeapi.py), the stub AI server
+(fake_ai_server.py) and server.py as separate uvicorn processes, then drives
+many simulated players over WebSockets. Each player catches a team, selects
+a pokemon and battles until someone wins, asking for a recommendation before
+every attack.
+
+Reported per message type: count, errors, p50/p99/mean latency from send to
+the final reply (`attack` is timed to the game_state frame, and
+`attack_commentary` to description_done). Also reported: requests/s,
+frames/s, bytes received per session and per attack turn, and game-server
+RSS per open session.
+
+RSS is sampled once every player has finished and all sessions are still
+open. The delta includes the bounded species LRU, so it over-counts slightly
+for small runs.
+
+Results are written as JSON. Compare a run against an earlier one with
+--compare, and add --max-regression to fail on a p99 or throughput regression:
+
+    python benchmarks/loadtest_ws.py --clients 1000 --ramp 5
+    python benchmarks/loadtest_ws.py --compare benchmarks/results/baseline.json --max-regression 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+import websockets
+
+try:
+    import msgpack
+except ImportError:  # only needed for --encoding msgpack
+    msgpack = None
+
+from harness import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+GAME_PORT, AI_PORT, POKEAPI_PORT = 8773, 8774, 8775
+MOVES = ["Tackle", "Quick Attack", "Scratch", "Bite"]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=500, help="simulated players")
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which players connect")
+    parser.add_argument("--catches", type=int, default=3, help="catch_attempt messages per player")
+    parser.add_argument("--max-turns", type=int, default=30, help="attack turns per battle before giving up")
+    parser.add_argument("--no-recommend", action="store_true", help="skip get_recommendation before attacks")
+    parser.add_argument("--encoding", choices=["json", "msgpack"], default="json", help="wire encoding to request")
+    parser.add_argument("--ai-latency", type=float, default=0.2, help="stub AI seconds before the first token")
+    parser.add_argument("--ai-token-delay", type=float, default=0.01, help="stub AI seconds between tokens")
+    parser.add_argument("--ai-tokens", type=int, default=20, help="stub AI tokens per completion")
+    parser.add_argument("--pokeapi-latency", type=float, default=0.02, help="stub PokeAPI seconds per response")
+    parser.add_argument("--species", type=int, default=1000, help="species served by the stub PokeAPI")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/loadtest_ws-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--max-regression", type=float, help="exit 1 if p99 or throughput regresses by more than this %%")
+    return parser.parse_args()
+
+
+def raise_fd_limit() -> None:
+    """Every player holds a socket in this process and in the game server."""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def rss_kb(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_app(app: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+async def wait_until_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.05)
+    raise TimeoutError(f"{url} did not become ready")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.requests = 0
+        self.frames = 0
+        self.bytes = 0
+        self.turn_bytes: List[int] = []
+        self.battles = 0
+        self.wins: Counter = Counter()
+        self.failed_clients = 0
+
+
+def encode(payload: Dict[str, Any], encoding: str):
+    return msgpack.packb(payload) if encoding == "msgpack" else json.dumps(payload)
+
+
+async def receive_until(ws, recorder: Recorder, done_types: set, received: Optional[List[int]] = None) -> Dict[str, Any]:
+    """
+    Reads frames (skipping server_log, description_chunk, ...) until one of
+    `done_types` or an error. Bytes read are also added to `received[0]`, a
+    counter for this connection alone.
+    """
+    while True:
+        frame = await ws.recv()
+        message = msgpack.unpackb(frame) if isinstance(frame, bytes) else json.loads(frame)
+        size = len(frame) if isinstance(frame, bytes) else len(frame.encode())
+        recorder.frames += 1
+        recorder.bytes += size
+        if received is not None:
+            received[0] += size
+        if message["type"] in done_types or message["type"] == "error":
+            return message
+
+
+async def request(ws, recorder: Recorder, payload: Dict[str, Any], done_types: set, encoding: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    await ws.send(encode(payload, encoding))
+    recorder.requests += 1
+    reply = await receive_until(ws, recorder, done_types)
+    if reply["type"] == "error":
+        recorder.errors[payload["type"]] += 1
+    else:
+        recorder.latencies[payload["type"]].append((time.perf_counter() - started) * 1000)
+    return reply
+
+
+async def play(url: str, args: argparse.Namespace, recorder: Recorder, delay: float,
+               finished: List[int], all_finished: asyncio.Event, release: asyncio.Event) -> None:
+    await asyncio.sleep(delay)
+    try:
+        async with websockets.connect(url, max_size=None, ping_interval=None, open_timeout=60) as ws:
+            await receive_until(ws, recorder, {"session"})
+
+            team: List[str] = []
+            for _ in range(args.catches):
+                reply = await request(ws, recorder, {"type": "catch_attempt"}, {"catch_result"}, args.encoding)
+                if reply["type"] == "catch_result":
+                    team.append(reply["caught_pokemon"])
+
+            if team:
+                reply = await request(ws, recorder, {"type": "select_pokemon", "pokemon": team[0]}, {"game_state"}, args.encoding)
+                if reply["type"] == "game_state":
+                    await battle(ws, args, recorder)
+
+            finished[0] += 1
+            if finished[0] == args.clients:
+                all_finished.set()
+            # Hold the session open so server memory can be sampled with every session live
+            await release.wait()
+    except Exception as e:
+        recorder.failed_clients += 1
+        print(f"client failed: {e!r}")
+        finished[0] += 1
+        if finished[0] == args.clients:
+            all_finished.set()
+
+
+async def battle(ws, args: argparse.Namespace, recorder: Recorder) -> None:
+    recorder.battles += 1
+    for _ in range(args.max_turns):
+        if not args.no_recommend:
+            await request(ws, recorder, {"type": "get_recommendation"}, {"recommendation"}, args.encoding)
+
+        started = time.perf_counter()
+        # recorder.bytes is shared by every client, so the turn's bytes are counted on this connection only
+        received = [0]
+        await ws.send(encode({"type": "attack", "move": random.choice(MOVES)}, args.encoding))
+        recorder.requests += 1
+        state = await receive_until(ws, recorder, {"game_state"}, received)
+        if state["type"] == "error":
+            recorder.errors["attack"] += 1
+            return
+        recorder.latencies["attack"].append((time.perf_counter() - started) * 1000)
+
+        if state.get("winner"):
+            recorder.wins[state["winner"]] += 1
+            recorder.turn_bytes.append(received[0])
+            return
+        done = await receive_until(ws, recorder, {"description_done"}, received)
+        recorder.turn_bytes.append(received[0])
+        if done["type"] == "error":
+            recorder.errors["attack_commentary"] += 1
+        else:
+            recorder.latencies["attack_commentary"].append((time.perf_counter() - started) * 1000)
+
+
+def summarize_latencies(recorder: Recorder) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for kind in sorted(set(recorder.latencies) | set(recorder.errors)):
+        samples = recorder.latencies.get(kind, [])
+        summary[kind] = {
+            "count": len(samples),
+            "errors": recorder.errors.get(kind, 0),
+            "p50_ms": round(percentile(samples, 50), 3),
+            "p99_ms": round(percentile(samples, 99), 3),
+            "mean_ms": round(sum(samples) / len(samples), 3) if samples else 0.0
+        }
+    return summary
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="loadtest_ws-")
+    processes = [
+        start_app("benchmarks.fake_pokeapi:app", POKEAPI_PORT, {
+            "FAKE_POKEAPI_LATENCY": str(args.pokeapi_latency),
+            "FAKE_POKEAPI_SPECIES": str(args.species)
+        }),
+        start_app("benchmarks.fake_ai_server:app", AI_PORT, {
+            "FAKE_AI_LATENCY": str(args.ai_latency),
+            "FAKE_AI_TOKEN_DELAY": str(args.ai_token_delay),
+            "FAKE_AI_TOKENS": str(args.ai_tokens)
+        })
+    ]
+    try:
+        await wait_until_ready(f"http://127.0.0.1:{POKEAPI_PORT}/pokemon?limit=1")
+        await wait_until_ready(f"http://127.0.0.1:{AI_PORT}/docs")
+        game = start_app("server:app", GAME_PORT, {
+            "POKEAPI_BASE_URL": f"http://127.0.0.1:{POKEAPI_PORT}",
+            "AI_SERVER_URL": f"http://127.0.0.1:{AI_PORT}",
+            "POKEMON_CACHE_PATH": os.path.join(workdir, "pokemon_cache.sqlite3"),
+            "ROSTER_PATH": os.path.join(workdir, "roster_cache.json"),
+            "SESSION_STORE": "memory"
+        })
+        processes.append(game)
+        await wait_until_ready(f"http://127.0.0.1:{GAME_PORT}/readyz")
+        baseline_rss = rss_kb(game.pid)
+
+        recorder = Recorder()
+        finished = [0]
+        all_finished, release = asyncio.Event(), asyncio.Event()
+        url = f"ws://127.0.0.1:{GAME_PORT}/ws?encoding={args.encoding}"
+        started = time.perf_counter()
+        players = [
+            asyncio.create_task(play(url, args, recorder, i * args.ramp / args.clients, finished, all_finished, release))
+            for i in range(args.clients)
+        ]
+        await all_finished.wait()
+        duration = time.perf_counter() - started
+        loaded_rss = rss_kb(game.pid)
+        open_sessions = args.clients - recorder.failed_clients
+        release.set()
+        await asyncio.gather(*players)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+    per_session = None
+    if baseline_rss is not None and loaded_rss is not None and open_sessions:
+        per_session = round((loaded_rss - baseline_rss) / open_sessions, 2)
+    return {
+        "benchmark": "loadtest_ws",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": git_revision(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "max_regression")},
+        "messages": summarize_latencies(recorder),
+        "throughput": {
+            "duration_s": round(duration, 3),
+            "requests": recorder.requests,
+            "frames": recorder.frames,
+            "requests_per_s": round(recorder.requests / duration, 1),
+            "frames_per_s": round(recorder.frames / duration, 1)
+        },
+        "bytes": {
+            "received": recorder.bytes,
+            "per_session": round(recorder.bytes / args.clients, 1),
+            "per_attack_turn": round(sum(recorder.turn_bytes) / len(recorder.turn_bytes), 1) if recorder.turn_bytes else 0.0
+        },
+        "sessions": {
+            "clients": args.clients,
+            "failed": recorder.failed_clients,
+            "battles": recorder.battles,
+            "wins": dict(recorder.wins)
+        },
+        "memory": {
+            "baseline_rss_kb": baseline_rss,
+            "loaded_rss_kb": loaded_rss,
+            "per_session_kb": per_session
+        }
+    }
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    print(f"{'message':<20}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for kind, stats in results["messages"].items():
+        print(f"{kind:<20}{stats['count']:>8}{stats['errors']:>8}{stats['p50_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['mean_ms']:>10.1f}")
+    throughput = results["throughput"]
+    print(f"{throughput['requests']} requests in {throughput['duration_s']:.1f}s: "
+          f"{throughput['requests_per_s']:.0f} req/s, {throughput['frames_per_s']:.0f} frames/s")
+    print(f"{results['bytes']['per_session']:.0f} bytes received per session, {results['bytes']['per_attack_turn']:.0f} per attack turn")
+    sessions, memory = results["sessions"], results["memory"]
+    print(f"{sessions['clients']} clients ({sessions['failed']} failed), {sessions['battles']} battles, wins {sessions['wins']}")
+    if memory["per_session_kb"] is not None:
+        print(f"server RSS {memory['baseline_rss_kb']} -> {memory['loaded_rss_kb']} KB, {memory['per_session_kb']:.1f} KB/session")
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Prints old -> new for every shared metric and returns the ones that got worse (as % change)."""
+    def change(old: float, new: float) -> float:
+        return (new - old) / old * 100 if old else 0.0
+
+    regressions = []
+    print(f"\ncompared with {baseline.get('git_revision')} ({baseline.get('timestamp')}):")
+    for kind, stats in results["messages"].items():
+        old = baseline["messages"].get(kind)
+        if not old:
+            continue
+        p99_change = change(old["p99_ms"], stats["p99_ms"])
+        print(f"{kind:<20} p50 {old['p50_ms']:8.1f} -> {stats['p50_ms']:8.1f}   "
+              f"p99 {old['p99_ms']:8.1f} -> {stats['p99_ms']:8.1f} ({p99_change:+.1f}%)")
+        regressions.append((f"{kind} p99", p99_change))
+    old_rate, new_rate = baseline["throughput"]["requests_per_s"], results["throughput"]["requests_per_s"]
+    rate_change = change(old_rate, new_rate)
+    print(f"{'throughput':<20} {old_rate:.0f} -> {new_rate:.0f} req/s ({rate_change:+.1f}%)")
+    regressions.append(("throughput", -rate_change))
+    old_memory, new_memory = baseline["memory"].get("per_session_kb"), results["memory"].get("per_session_kb")
+    if old_memory and new_memory:
+        print(f"{'memory':<20} {old_memory:.1f} -> {new_memory:.1f} KB/session ({change(old_memory, new_memory):+.1f}%)")
+    return regressions
+
+
+def main() -> None:
+    args = parse_args()
+    if args.encoding == "msgpack" and msgpack is None:
+        sys.exit("--encoding msgpack needs the msgpack package")
+    raise_fd_limit()
+    results = asyncio.run(run(args))
+    print_report(results)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"loadtest_ws-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f))
+        if args.max_regression is not None:
+            failed = [(name, pct) for name, pct in regressions if pct > args.max_regression]
+            for name, pct in failed:
+                print(f"REGRESSION: {name} worse by {pct:.1f}% (limit {args.max_regression:.1f}%)")
+            if failed:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from model_router import TEMPLATE
+
+# A generation result: the response text, the upstream token usage and the
+# model that wrote it (TEMPLATE when the AI server fell back to stock text).
+Generation = Tuple[str, Dict[str, int], Optional[str]]
+
+
+def cache_key(
+    prompt: str,
+    model: Optional[str],
+    max_tokens: int,
+    temperature: float,
+    context: Optional[Dict[str, Any]] = None,
+    kind: Optional[str] = None
+) -> str:
+    """Key on the whitespace-normalized prompt plus every parameter that changes the output."""
+    normalized = " ".join(prompt.split())
+    payload = json.dumps([normalized, model, max_tokens, round(temperature, 3), context, kind], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    TTL + LRU cache for AI generations, with optional SQLite disk tier and
+    coalescing of identical in-flight requests.
+
+    Calls above `max_temperature` are treated as creative and bypass the
+    cache entirely, as does any call made with cache=False on AIClient.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 3600.0,
+        disk_path: Optional[str] = None,
+        max_temperature: float = 0.7
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+        self._memory: "OrderedDict[str, Tuple[float, str, Dict[str, int], Optional[str]]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Future[Generation]"] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS generations ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, usage TEXT NOT NULL, expires REAL NOT NULL, model TEXT)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(generations)")}
+            if "model" not in columns:
+                # Caches written before the model was recorded
+                self._db.execute("ALTER TABLE generations ADD COLUMN model TEXT")
+            self._db.commit()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bypassed = 0
+        self.saved_input_tokens = 0
+        self.saved_output_tokens = 0
+
+    def cacheable(self, temperature: float) -> bool:
+        return temperature <= self.max_temperature
+
+    def get(self, key: str) -> Optional[Generation]:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires, response, usage, model = entry
+            if expires > now:
+                self._memory.move_to_end(key)
+                return response, usage, model
+            del self._memory[key]
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT response, usage, expires, model FROM generations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[2] > now:
+                usage = json.loads(row[1])
+                self._remember(key, row[2], row[0], usage, row[3])
+                return row[0], usage, row[3]
+        return None
+
+    def set(self, key: str, response: str, usage: Dict[str, int], model: Optional[str] = None) -> None:
+        expires = time.time() + self.ttl
+        self._remember(key, expires, response, usage, model)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO generations (key, response, usage, expires, model) VALUES (?, ?, ?, ?, ?)",
+                (key, response, json.dumps(usage), expires, model)
+            )
+            self._db.commit()
+
+    def _remember(self, key: str, expires: float, response: str, usage: Dict[str, int], model: Optional[str]) -> None:
+        self._memory[key] = (expires, response, usage, model)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _record_saving(self, usage: Dict[str, int]) -> None:
+        self.saved_input_tokens += usage.get("input_tokens", 0)
+        self.saved_output_tokens += usage.get("output_tokens", 0)
+
+    async def fetch(self, key: str, compute: Callable[[], Awaitable[Generation]]) -> Generation:
+        """
+        Returns the cached generation for `key`, joining an identical in-flight
+        request if there is one, and otherwise calls `compute` once.
+        Empty responses (failed generations) and template fallbacks are
+        never cached, so the next call tries the model again.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._record_saving(cached[1])
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            generation = await asyncio.shield(inflight)
+            self._record_saving(generation[1])
+            return generation
+
+        self.misses += 1
+        task = asyncio.ensure_future(compute())
+        self._inflight[key] = task
+        try:
+            # Shielded so a cancelled caller does not cancel the call for coalesced waiters
+            generation = await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._inflight.pop(key, None)
+            else:
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        response, usage, model = generation
+        if response and model != TEMPLATE:
+            self.set(key, response, usage, model)
+        return generation
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "bypassed": self.bypassed,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "saved_input_tokens": self.saved_input_tokens,
+            "saved_output_tokens": self.saved_output_tokens,
+            "entries": len(self._memory),
+            "in_flight": len(self._inflight)
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def cache_from_env() -> Optional[GenerationCache]:
+    """
+    Builds a cache from AI_CACHE_SIZE, AI_CACHE_TTL, AI_CACHE_PATH and
+    AI_CACHE_MAX_TEMPERATURE; AI_CACHE=0 disables caching.
+    """
+    if os.getenv("AI_CACHE", "1").lower() in ("0", "false", "no"):
+        return None
+    return GenerationCache(
+        max_entries=int(os.getenv("AI_CACHE_SIZE", "1024")),
+        ttl=float(os.getenv("AI_CACHE_TTL", "3600")),
+        disk_path=os.getenv("AI_CACHE_PATH") or None,
+        max_temperature=float(os.getenv("AI_CACHE_MAX_TEMPERATURE", "0.7"))
+    )
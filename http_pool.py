@@ -0,0 +1,118 @@
+import asyncio
+import importlib.util
+import random
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from telemetry import span
+
+# Status codes that are worth retrying: rate limiting and transient upstream errors.
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class PooledHTTPClient:
+    """
+    App-lifetime httpx client with keep-alive, connection limits, timeouts and
+    retry with exponential backoff.
+
+    Call start() at startup and close() at shutdown. Requests made before
+    start() open the client lazily so the class also works from scripts.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "",
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        timeout: float = 10.0,
+        retries: int = 3,
+        backoff_factor: float = 0.25
+    ):
+        self.base_url = base_url
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self.timeout = httpx.Timeout(timeout, connect=min(timeout, 5.0))
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        # HTTP/2 needs the optional h2 package (pip install httpx[http2]).
+        self.http2 = importlib.util.find_spec("h2") is not None
+        self.client: Optional[httpx.AsyncClient] = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    async def start(self) -> None:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2
+            )
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Sends a request, retrying transient failures, and raises on a bad final status."""
+        with span("http.request", base_url=self.base_url, method=method, url=url) as record:
+            response = await self._request(method, url, **kwargs)
+            record["attributes"]["status"] = response.status_code
+            return response
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        await self.start()
+        attempt = 0
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            while True:
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                except httpx.TransportError:
+                    if attempt >= self.retries:
+                        self.failures += 1
+                        raise
+                else:
+                    if response.status_code not in RETRY_STATUS_CODES or attempt >= self.retries:
+                        if response.is_error:
+                            self.failures += 1
+                        response.raise_for_status()
+                        return response
+                attempt += 1
+                self.retried += 1
+                delay = self.backoff_factor * (2 ** (attempt - 1))
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+        finally:
+            latency = time.perf_counter() - started
+            self.in_flight -= 1
+            self.requests += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retried": self.retried,
+            "failures": self.failures,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "max_connections": self.limits.max_connections,
+            "http2": self.http2,
+            "avg_latency_ms": (self.total_latency / self.requests * 1000) if self.requests else 0.0,
+            "max_latency_ms": self.max_latency * 1000
+        }
@@ -0,0 +1,272 @@
+import asyncio
+import contextlib
+import json
+import os
+import time
+import zlib
+from typing import Any, AsyncContextManager, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from telemetry import registry
+
+decisions_counter = registry.counter("ai_router_decisions_total", "Routed generations by request kind, tier and reason.")
+saved_counter = registry.counter("ai_router_saved_seconds_total", "Estimated latency saved vs the baseline tier, by kind.")
+tier_latency = registry.histogram("ai_router_tier_latency_seconds", "Upstream latency of routed calls by tier.")
+
+# Kind used when a request does not say what it is for
+DEFAULT_KIND = "default"
+TEMPLATE = "template"
+
+
+class Tier:
+    """One model with its typical latency (tracked as an EWMA) and price per million tokens."""
+
+    def __init__(self, name: str, model: str, expected_latency: float, input_cost: float, output_cost: float):
+        self.name = name
+        self.model = model
+        self.expected_latency = expected_latency
+        self.latency = expected_latency
+        self.input_cost = input_cost
+        self.output_cost = output_cost
+        self.calls = 0
+
+    def observe(self, latency: float, weight: float = 0.2) -> None:
+        self.latency += weight * (latency - self.latency)
+        self.calls += 1
+
+    def relax(self, weight: float = 0.05) -> None:
+        """Drifts a skipped tier back towards its expected latency so it gets retried after a slow spell."""
+        self.latency += weight * (self.expected_latency - self.latency)
+
+    def cost(self, usage: Dict[str, int]) -> float:
+        return (usage.get("input_tokens", 0) * self.input_cost + usage.get("output_tokens", 0) * self.output_cost) / 1e6
+
+
+class Route:
+    """Policy for one request kind: preferred tier, token budgets and a deadline (seconds)."""
+
+    def __init__(self, tier: str, max_tokens: int, deadline: float, max_prompt_chars: int = 4000):
+        self.tier = tier
+        self.max_tokens = max_tokens
+        self.deadline = deadline
+        self.max_prompt_chars = max_prompt_chars
+
+
+def default_tiers() -> List[Tier]:
+    """Fastest first; fallbacks only ever move towards the front of this list."""
+    return [
+        Tier("fast", "claude-3-haiku-20240307", expected_latency=0.8, input_cost=0.25, output_cost=1.25),
+        Tier("balanced", "claude-3-sonnet-20240229", expected_latency=2.0, input_cost=3.0, output_cost=15.0),
+        Tier("quality", "claude-3-opus-20240229", expected_latency=4.5, input_cost=15.0, output_cost=75.0)
+    ]
+
+
+DEFAULT_ROUTES = {
+    "personality": Route("fast", max_tokens=50, deadline=2.0, max_prompt_chars=500),
+    "recommendation": Route("balanced", max_tokens=100, deadline=4.0, max_prompt_chars=2000),
+    "commentary": Route("balanced", max_tokens=200, deadline=5.0, max_prompt_chars=2000),
+    DEFAULT_KIND: Route("quality", max_tokens=1000, deadline=60.0, max_prompt_chars=100_000)
+}
+
+PERSONALITY_TEMPLATES = [
+    "Likes collecting shiny stones.",
+    "Naps in sunbeams and refuses to move until dinner.",
+    "Hums a tune nobody else has ever heard.",
+    "Is convinced it can beat any Pokemon twice its size.",
+    "Hoards berries but always shares the sweetest one."
+]
+
+
+def template_text(kind: str, prompt: str) -> Optional[str]:
+    """Local stand-in text for a kind, or None if the kind has no template."""
+    if kind == "personality":
+        return PERSONALITY_TEMPLATES[zlib.crc32(prompt.encode("utf-8")) % len(PERSONALITY_TEMPLATES)]
+    if kind == "recommendation":
+        return "Tackle because it's a basic reliable move."
+    if kind == "commentary":
+        # The commentary prompt is the mechanical battle log, which is a fine description on its own
+        return prompt
+    return None
+
+
+class ModelRouter:
+    """
+    Maps request kinds to model tiers and enforces per-kind token budgets
+    and deadlines.
+
+    Each call starts on its kind's tier, or on a faster one when the tier's
+    predicted latency (inflated by upstream queueing) would miss the
+    deadline. A call that times out or fails falls back to a faster tier
+    while time remains, then to a local template. Each attempt is cut off
+    after `attempt_margin` times its tier's average latency, timed from when
+    it holds an upstream slot, so a hung tier leaves time for the fallback. Latency saved is measured against
+    the baseline tier every call used before routing.
+    """
+
+    def __init__(
+        self,
+        tiers: Optional[List[Tier]] = None,
+        routes: Optional[Dict[str, Route]] = None,
+        baseline_tier: str = "quality",
+        attempt_margin: float = 2.0
+    ):
+        self.attempt_margin = attempt_margin
+        self.tiers = tiers if tiers is not None else default_tiers()
+        self.routes = routes if routes is not None else dict(DEFAULT_ROUTES)
+        self.tier_index = {tier.name: index for index, tier in enumerate(self.tiers)}
+        self.by_model = {tier.model: tier for tier in self.tiers}
+        self.baseline = self.tiers[self.tier_index[baseline_tier]]
+        self.decisions: Dict[Tuple[str, str, str], int] = {}
+        self.saved_seconds = 0.0
+        self.cost = 0.0
+
+    def route_for(self, kind: Optional[str]) -> Route:
+        return self.routes.get(kind or DEFAULT_KIND, self.routes[DEFAULT_KIND])
+
+    def candidates(self, route: Route, model: Optional[str]) -> List[Tier]:
+        """The starting tier (a pinned model's tier, else the route's) followed by every faster tier."""
+        start = self.by_model.get(model) if model else self.tiers[self.tier_index[route.tier]]
+        if start is None:
+            # A model outside the tier table: try it as-is, then fall back to the fastest tier
+            start = Tier("custom", model, self.baseline.latency, self.baseline.input_cost, self.baseline.output_cost)
+            return [start, self.tiers[0]]
+        return list(reversed(self.tiers[:self.tier_index[start.name] + 1]))
+
+    def choose(self, kind: Optional[str], model: Optional[str] = None, pressure: float = 0.0) -> Optional[Tier]:
+        """
+        The first tier predicted to answer within the kind's deadline, for
+        streamed calls; None means the local template should be used.
+        """
+        route = self.route_for(kind)
+        has_template = template_text(kind or DEFAULT_KIND, "") is not None
+        candidates = self.candidates(route, model)
+        for index, tier in enumerate(candidates):
+            if tier.latency * (1 + pressure) <= route.deadline or not (has_template or index < len(candidates) - 1):
+                return tier
+            tier.relax()
+        return None
+
+    def budget(self, kind: Optional[str], prompt: str, max_tokens: int) -> Tuple[str, int]:
+        """Clamps a request to its kind's prompt and output token budgets."""
+        route = self.route_for(kind)
+        return prompt[:route.max_prompt_chars], min(max_tokens, route.max_tokens)
+
+    async def run(
+        self,
+        kind: Optional[str],
+        prompt: str,
+        max_tokens: int,
+        model: Optional[str],
+        call: Callable[[str, str, int], Awaitable[Any]],
+        pressure: float = 0.0,
+        slot: Optional[Callable[[], AsyncContextManager[Any]]] = None
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Runs `call(model, prompt, max_tokens)` on the best tier that fits the
+        deadline. `pressure` (queued / concurrency upstream) scales predicted
+        latency. Each attempt runs inside `slot()` (an admission slot); the
+        attempt's timeout and latency start once it is held, and errors from
+        acquiring it propagate instead of falling back. Returns (result,
+        decision). When the decision's tier is "template", result is the
+        template text instead of a call result.
+        """
+        slot = slot or contextlib.nullcontext
+        kind = kind or DEFAULT_KIND
+        route = self.route_for(kind)
+        prompt, max_tokens = self.budget(kind, prompt, max_tokens)
+        started = time.perf_counter()
+        deadline = started + route.deadline
+        reason = "preferred"
+        last_error: Optional[Exception] = None
+        has_template = template_text(kind, "") is not None
+
+        candidates = self.candidates(route, model)
+        for index, tier in enumerate(candidates):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            # Skip a tier that would miss the deadline, unless there is nothing left to fall back to
+            if tier.latency * (1 + pressure) > remaining and (has_template or index < len(candidates) - 1):
+                reason = "predicted_miss"
+                tier.relax()
+                continue
+            async with slot():
+                # Queue wait is already priced in by `pressure`; only the upstream call is timed
+                call_started = time.perf_counter()
+                remaining = deadline - call_started
+                if remaining <= 0:
+                    reason = "timeout"
+                    break
+                # The last resort gets whatever time is left; earlier tiers leave some for their fallbacks
+                last_resort = not has_template and index == len(candidates) - 1
+                timeout = remaining if last_resort else min(remaining, tier.latency * self.attempt_margin)
+                try:
+                    result = await asyncio.wait_for(call(tier.model, prompt, max_tokens), timeout=timeout)
+                except asyncio.TimeoutError:
+                    tier.observe(time.perf_counter() - call_started)
+                    reason = "timeout"
+                    continue
+                except Exception as e:
+                    last_error = e
+                    reason = "error"
+                    continue
+            latency = time.perf_counter() - call_started
+            tier.observe(latency)
+            tier_latency.observe(latency, tier=tier.name)
+            usage = getattr(result, "usage", None) or {}
+            self.cost += tier.cost(usage)
+            return result, self.decide(kind, tier.name, tier.model, reason, started)
+
+        text = template_text(kind, prompt)
+        if text is None:
+            if last_error is not None:
+                raise last_error
+            raise asyncio.TimeoutError(f"No tier could answer a {kind} request within {route.deadline:.1f}s")
+        return text, self.decide(kind, TEMPLATE, TEMPLATE, reason, started)
+
+    def decide(self, kind: str, tier: str, model: str, reason: str, started: float) -> Dict[str, Any]:
+        """Records where a request ended up and how much faster than the baseline tier it finished."""
+        latency = time.perf_counter() - started
+        saved = max(0.0, self.baseline.latency - latency)
+        key = (kind, tier, reason)
+        self.decisions[key] = self.decisions.get(key, 0) + 1
+        self.saved_seconds += saved
+        decisions_counter.inc(kind=kind, tier=tier, reason=reason)
+        saved_counter.inc(saved, kind=kind)
+        return {
+            "kind": kind,
+            "tier": tier,
+            "model": model,
+            "reason": reason,
+            "latency_ms": latency * 1000,
+            "saved_ms": saved * 1000
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tiers": {tier.name: {"model": tier.model, "latency_ms": tier.latency * 1000, "calls": tier.calls} for tier in self.tiers},
+            "routes": {kind: vars(route) for kind, route in self.routes.items()},
+            "decisions": [
+                {"kind": kind, "tier": tier, "reason": reason, "count": count}
+                for (kind, tier, reason), count in sorted(self.decisions.items())
+            ],
+            "saved_seconds": self.saved_seconds,
+            "estimated_cost_usd": self.cost
+        }
+
+
+def router_from_env() -> ModelRouter:
+    """
+    AI_ROUTES (JSON) overrides per-kind policy, e.g.
+    {"commentary": {"tier": "fast", "deadline": 3}, "personality": {"max_tokens": 40}}.
+    AI_ROUTER_ATTEMPT_MARGIN caps each attempt at that multiple of its tier's predicted latency.
+    """
+    routes = dict(DEFAULT_ROUTES)
+    overrides = json.loads(os.getenv("AI_ROUTES", "{}"))
+    for kind, fields in overrides.items():
+        base = routes.get(kind, routes[DEFAULT_KIND])
+        routes[kind] = Route(**{**vars(base), **fields})
+    return ModelRouter(
+        routes=routes,
+        baseline_tier=os.getenv("AI_ROUTER_BASELINE", "quality"),
+        attempt_margin=float(os.getenv("AI_ROUTER_ATTEMPT_MARGIN", "2.0"))
+    )
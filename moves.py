@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from battle_engine import REFERENCE_POWER, StatRecord, move_damage
+
+# Moves every caught pokemon knows
+BASIC_MOVES = ["Tackle", "Quick Attack", "Scratch", "Bite"]
+
+# Damage multiplier when the move's type is one of the attacker's own types
+STAB = 1.5
+
+
+class Move:
+    """The parts of a PokeAPI /move/{name} payload the damage model uses."""
+
+    __slots__ = ("name", "power", "type", "special")
+
+    def __init__(self, name: str, power: int = REFERENCE_POWER, type: Optional[str] = None, special: bool = False):
+        self.name = name
+        self.power = power
+        self.type = type
+        self.special = special
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "power": self.power, "type": self.type, "special": self.special}
+
+    def __repr__(self) -> str:
+        return f"Move({self.name!r}, power={self.power}, type={self.type!r})"
+
+
+def move_slug(name: str) -> str:
+    """PokeAPI's name for a move label, e.g. "Quick Attack" -> "quick-attack"."""
+    return name.strip().lower().replace(" ", "-")
+
+
+# PokeAPI's values for the basic moves and their types' damage relations, so
+# the game plays correctly before (or without) a fetch.
+DEFAULT_MOVES = {
+    "tackle": Move("Tackle", 40, "normal"),
+    "quick-attack": Move("Quick Attack", 40, "normal"),
+    "scratch": Move("Scratch", 40, "normal"),
+    "bite": Move("Bite", 60, "dark")
+}
+DEFAULT_EFFECTIVENESS = {
+    "normal": {"rock": 0.5, "steel": 0.5, "ghost": 0.0},
+    "dark": {"psychic": 2.0, "ghost": 2.0, "fighting": 0.5, "dark": 0.5, "fairy": 0.5}
+}
+
+
+def effectiveness_row(type_data: Dict[str, Any]) -> Dict[str, float]:
+    """Defending type -> multiplier, from a PokeAPI /type/{name} payload."""
+    relations = type_data.get('damage_relations') or {}
+    row: Dict[str, float] = {}
+    for key, multiplier in (("double_damage_to", 2.0), ("half_damage_to", 0.5), ("no_damage_to", 0.0)):
+        for entry in relations.get(key) or []:
+            row[entry['name']] = multiplier
+    return row
+
+
+class MoveIndex:
+    """
+    Per-move power, type and damage class, plus the type chart rows for
+    those types, shared by all games.
+
+    Starts from the built-in values for the basic moves. ensure_loaded()
+    fetches moves from PokeAPI once and keeps them in a local JSON snapshot,
+    like the roster. Damage and recommendations are plain dict lookups and
+    arithmetic over StatRecords, with no I/O.
+    """
+
+    def __init__(
+        self,
+        fetch_json: Optional[Callable[[str], Awaitable[Dict[str, Any]]]] = None,
+        path: Optional[str] = "moves_cache.json"
+    ):
+        self.fetch_json = fetch_json
+        self.path = path
+        self.moves: Dict[str, Move] = dict(DEFAULT_MOVES)
+        self.effectiveness: Dict[str, Dict[str, float]] = {t: dict(row) for t, row in DEFAULT_EFFECTIVENESS.items()}
+        self.fetched: set = set()
+        self._load_lock = asyncio.Lock()
+
+    def detached(self) -> "MoveIndex":
+        """A copy of the current moves and type chart with no fetcher or snapshot file, cheap to send to worker processes."""
+        index = MoveIndex(path=None)
+        index.moves = dict(self.moves)
+        index.effectiveness = {t: dict(row) for t, row in self.effectiveness.items()}
+        return index
+
+    def get(self, name: Optional[str]) -> Move:
+        """The move for a label; unknown moves hit like a basic, typeless move."""
+        move = self.moves.get(move_slug(name)) if name else None
+        return move if move is not None else Move(name or "", REFERENCE_POWER)
+
+    def multiplier(self, move: Move, attacker: StatRecord, defender: StatRecord) -> float:
+        """Type effectiveness against the defender's types, times STAB."""
+        if move.type is None:
+            return 1.0
+        row = self.effectiveness.get(move.type, {})
+        multiplier = 1.0
+        for defending_type in defender.types:
+            multiplier *= row.get(defending_type, 1.0)
+        if move.type in attacker.types:
+            multiplier *= STAB
+        return multiplier
+
+    def damage(self, attacker: StatRecord, defender: StatRecord, name: Optional[str]) -> int:
+        move = self.get(name)
+        return move_damage(attacker, defender, move.power, self.multiplier(move, attacker, defender), move.special)
+
+    def recommend(self, attacker: StatRecord, defender: StatRecord, defender_hp: int, moves: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Scores each move by the damage it deals this turn. The best move is
+        the one dealing the most (so any knockout beats any non-knockout);
+        ties go to the earlier move. None if there are no moves.
+        """
+        best: Optional[Dict[str, Any]] = None
+        scores: Dict[str, int] = {}
+        for name in moves:
+            move = self.get(name)
+            multiplier = self.multiplier(move, attacker, defender)
+            damage = move_damage(attacker, defender, move.power, multiplier, move.special)
+            scores[name] = damage
+            if best is None or damage > best["damage"]:
+                best = {"move": name, "damage": damage, "multiplier": multiplier, "stab": move.type in attacker.types}
+        if best is None:
+            return None
+        best["knocks_out"] = best["damage"] >= defender_hp
+        best["scores"] = scores
+        return best
+
+    def load_snapshot(self) -> bool:
+        """Loads fetched moves and type chart rows from the local snapshot, if present."""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        for slug, fields in snapshot.get("moves", {}).items():
+            self.moves[slug] = Move(**fields)
+            self.fetched.add(slug)
+        self.effectiveness.update(snapshot.get("effectiveness", {}))
+        return bool(self.fetched)
+
+    def save_snapshot(self) -> None:
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "moves": {slug: self.moves[slug].to_dict() for slug in sorted(self.fetched)},
+                "effectiveness": self.effectiveness
+            }, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    async def ensure_loaded(self, names: Iterable[str]) -> None:
+        """Fetches moves not yet fetched from PokeAPI, along with the damage relations of their types."""
+        async with self._load_lock:
+            labels = {move_slug(name): name for name in names}
+            missing = [slug for slug in labels if slug not in self.fetched]
+            if not missing or self.fetch_json is None:
+                return
+            fetched_types = set()
+            for slug in missing:
+                data = await self.fetch_json(f"/move/{slug}")
+                move_type = (data.get('type') or {}).get('name')
+                self.moves[slug] = Move(
+                    labels[slug],
+                    power=data.get('power') or 0, # Status moves have no power
+                    type=move_type,
+                    special=(data.get('damage_class') or {}).get('name') == "special"
+                )
+                self.fetched.add(slug)
+                if move_type and move_type not in fetched_types:
+                    self.effectiveness[move_type] = effectiveness_row(await self.fetch_json(f"/type/{move_type}"))
+                    fetched_types.add(move_type)
+            self.save_snapshot()
+
+
+def recommendation_text(pick: Dict[str, Any], defender_name: str) -> str:
+    """One line in the "<Move> because <reason>" shape the client displays."""
+    reasons = [f"it deals {pick['damage']} damage"]
+    if pick["knocks_out"]:
+        reasons.append(f"knocks out {defender_name}")
+    effectiveness = pick["multiplier"] / STAB if pick["stab"] else pick["multiplier"]
+    if effectiveness > 1:
+        reasons.append("is super effective")
+    elif 0 < effectiveness < 1:
+        reasons.append("is resisted least")
+    if pick["stab"]:
+        reasons.append("gets the same-type bonus")
+    reason = reasons[0] if len(reasons) == 1 else ", ".join(reasons[:-1]) + " and " + reasons[-1]
+    return f"{pick['move']} because {reason}."
@@ -0,0 +1,208 @@
+import asyncio
+import os
+import sqlite3
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+
+class PersonalityPool:
+    """
+    Ready-made personalities per species, kept in SQLite so they survive restarts.
+
+    A catch takes the oldest personality for its species with take(), which
+    never waits on a model. A background worker (run()) keeps every species
+    topped up to `depth`: species that were just taken from or missed come
+    first, then the roster is walked in order. At most `concurrency`
+    generations run at once, new ones start at most `rate` per second, and
+    none start while `busy()` reports interactive AI work in progress.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "personality_pool.sqlite3",
+        depth: int = 2,
+        generate: Optional[Callable[[str], Awaitable[str]]] = None,
+        species: Optional[Callable[[], List[str]]] = None,
+        busy: Optional[Callable[[], bool]] = None,
+        concurrency: int = 1,
+        rate: float = 0.5,
+        busy_backoff: float = 1.0,
+        error_backoff: float = 30.0
+    ):
+        self.db_path = db_path
+        self.depth = depth
+        self.generate = generate
+        self.species = species
+        self.busy = busy
+        self.concurrency = concurrency
+        self.rate = rate
+        self.busy_backoff = busy_backoff
+        self.error_backoff = error_backoff
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        # take() runs on the event loop for every catch; WAL keeps its commit cheap
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS personalities ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, text TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS personalities_name ON personalities (name, id)")
+        self._db.commit()
+        self._depths: Dict[str, int] = dict(
+            self._db.execute("SELECT name, COUNT(*) FROM personalities GROUP BY name").fetchall()
+        )
+        self._pending: Dict[str, int] = {}
+        self._wanted: Deque[str] = deque()
+        self._wanted_set: Set[str] = set()
+        self._cursor = 0
+        self._slots = asyncio.Semaphore(concurrency)
+        self._fills: Set[asyncio.Task] = set()
+        self.active = 0
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.failures = 0
+        self.deferred = 0
+
+    def __len__(self) -> int:
+        return sum(self._depths.values())
+
+    def depth_of(self, name: str) -> int:
+        return self._depths.get(name, 0)
+
+    def take(self, name: str) -> Optional[str]:
+        """Pops the oldest personality for a species, or None on a miss; either way a refill is queued."""
+        self._want(name)
+        if not self._depths.get(name):
+            self.misses += 1
+            return None
+        row = self._db.execute(
+            "SELECT id, text FROM personalities WHERE name = ? ORDER BY id LIMIT 1", (name,)
+        ).fetchone()
+        if row is None:
+            self._depths.pop(name, None)
+            self.misses += 1
+            return None
+        self._db.execute("DELETE FROM personalities WHERE id = ?", (row[0],))
+        self._db.commit()
+        self._depths[name] -= 1
+        self.hits += 1
+        return row[1]
+
+    def put(self, name: str, text: str) -> None:
+        self._db.execute("INSERT INTO personalities (name, text) VALUES (?, ?)", (name, text))
+        self._db.commit()
+        self._depths[name] = self._depths.get(name, 0) + 1
+
+    def _want(self, name: str) -> None:
+        if name not in self._wanted_set:
+            self._wanted_set.add(name)
+            self._wanted.append(name)
+
+    def _short(self, name: str) -> bool:
+        return self._depths.get(name, 0) + self._pending.get(name, 0) < self.depth
+
+    def _next_species(self) -> Optional[str]:
+        """The next species below depth: recently taken ones first, then the roster in order."""
+        while self._wanted:
+            name = self._wanted[0]
+            if self._short(name):
+                return name
+            self._wanted.popleft()
+            self._wanted_set.discard(name)
+        names = self.species() if self.species is not None else []
+        for _ in range(len(names)):
+            self._cursor %= len(names)
+            name = names[self._cursor]
+            if self._short(name):
+                return name
+            self._cursor += 1
+        return None
+
+    async def _fill(self, name: str) -> None:
+        self.active += 1
+        try:
+            text = await self.generate(name)
+        except Exception as e:
+            print(f"Personality warmup failed for {name}: {e}")
+            text = ""
+        finally:
+            self.active -= 1
+            self._pending[name] -= 1
+            self._slots.release()
+        if text:
+            self.put(name, text)
+            self.generated += 1
+        else:
+            self.failures += 1
+
+    async def run(self) -> None:
+        """Warmup loop; runs until cancelled, and returns only once its in-flight fills have stopped."""
+        if self.generate is None or self.depth <= 0:
+            return
+        failures = self.failures
+        try:
+            while True:
+                if self.busy is not None and self.busy():
+                    self.deferred += 1
+                    await asyncio.sleep(self.busy_backoff)
+                    continue
+                name = self._next_species()
+                if name is None:
+                    await asyncio.sleep(self.busy_backoff)
+                    continue
+                await self._slots.acquire()
+                self._pending[name] = self._pending.get(name, 0) + 1
+                task = asyncio.create_task(self._fill(name))
+                self._fills.add(task)
+                task.add_done_callback(self._fills.discard)
+                await asyncio.sleep(1.0 / self.rate if self.rate > 0 else 0)
+                if self.failures > failures:
+                    # The AI server is down or shedding load; don't keep knocking
+                    failures = self.failures
+                    await asyncio.sleep(self.error_backoff)
+        finally:
+            # Wait for the fills to unwind so none writes to the pool after close()
+            fills = list(self._fills)
+            for task in fills:
+                task.cancel()
+            await asyncio.gather(*fills, return_exceptions=True)
+
+    def stats(self) -> Dict[str, float]:
+        takes = self.hits + self.misses
+        return {
+            "depth": len(self),
+            "species": sum(1 for count in self._depths.values() if count),
+            "target_depth": self.depth,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / takes if takes else 0.0,
+            "generated": self.generated,
+            "failures": self.failures,
+            "active": self.active,
+            "deferred": self.deferred
+        }
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def pool_from_env(
+    generate: Optional[Callable[[str], Awaitable[str]]] = None,
+    species: Optional[Callable[[], List[str]]] = None,
+    busy: Optional[Callable[[], bool]] = None
+) -> PersonalityPool:
+    """
+    Builds a pool from PERSONALITY_POOL_PATH, PERSONALITY_POOL_DEPTH (0 turns
+    the warmup worker off), PERSONALITY_POOL_CONCURRENCY and
+    PERSONALITY_POOL_RATE (generations started per second).
+    """
+    return PersonalityPool(
+        db_path=os.getenv("PERSONALITY_POOL_PATH", "personality_pool.sqlite3"),
+        depth=int(os.getenv("PERSONALITY_POOL_DEPTH", "2")),
+        generate=generate,
+        species=species,
+        busy=busy,
+        concurrency=int(os.getenv("PERSONALITY_POOL_CONCURRENCY", "1")),
+        rate=float(os.getenv("PERSONALITY_POOL_RATE", "0.5"))
+    )
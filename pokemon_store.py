@@ -0,0 +1,215 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Only these fields of a PokeAPI /pokemon/{name} payload are used by the game.
+SPECIES_FIELDS = ("name", "id", "types", "stats", "sprites")
+
+
+def slim_species(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduces a full PokeAPI payload to the fields the game needs; of the sprites tree only front_default is kept."""
+    record = {field: data.get(field) for field in SPECIES_FIELDS}
+    record["sprites"] = {"front_default": (data.get("sprites") or {}).get("front_default")}
+    return record
+
+
+class PokemonStore:
+    """
+    Species store with a warm in-memory LRU in front of a compact SQLite cache.
+
+    Lookups go memory -> disk -> remote fetcher. Records are slimmed to
+    SPECIES_FIELDS and stored zlib-compressed on disk; a disk record written
+    before a field was added is fetched again. Disk reads and writes run in
+    a worker thread, and concurrent misses for one species share a single
+    lookup. In offline mode the remote fetcher is never called, older
+    records are served as they are and a miss raises LookupError, so the
+    server can run entirely from a seeded cache.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "pokemon_cache.sqlite3",
+        max_memory_entries: int = 256,
+        fetcher: Optional[Callable[[str], Awaitable[Dict[str, Any]]]] = None,
+        offline: bool = False
+    ):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.fetcher = fetcher
+        self.offline = offline
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        # The connection is shared by worker threads; statements and commits must not interleave
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS species ("
+                "name TEXT PRIMARY KEY, id INTEGER, data BLOB NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _remember(self, name: str, record: Dict[str, Any]) -> None:
+        self._memory[name] = record
+        self._memory.move_to_end(name)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT data FROM species WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    def _write_disk(self, record: Dict[str, Any]) -> None:
+        blob = zlib.compress(json.dumps(record, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO species (name, id, data) VALUES (?, ?, ?)",
+                (record["name"], record["id"], blob)
+            )
+            db.commit()
+
+    def put(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Stores a species payload (full or already slim) in both tiers."""
+        record = slim_species(data)
+        self._write_disk(record)
+        self._remember(record["name"], record)
+        return record
+
+    async def get(self, name: str) -> Dict[str, Any]:
+        """Returns a shallow copy of the slim record for a species."""
+        record = self._memory.get(name)
+        if record is not None:
+            self._memory.move_to_end(name)
+            self.memory_hits += 1
+            return record.copy()
+
+        lookup = self._inflight.get(name)
+        if lookup is None:
+            lookup = self._inflight[name] = asyncio.ensure_future(self._load(name))
+            lookup.add_done_callback(lambda _: self._inflight.pop(name, None))
+        else:
+            self.coalesced += 1
+        # Shielded so one cancelled caller does not fail the lookup for the others
+        return (await asyncio.shield(lookup)).copy()
+
+    async def _load(self, name: str) -> Dict[str, Any]:
+        remote = not self.offline and self.fetcher is not None
+        record = await asyncio.to_thread(self._read_disk, name)
+        if record is not None and (not remote or all(field in record for field in SPECIES_FIELDS)):
+            self.disk_hits += 1
+            self._remember(name, record)
+            return record
+
+        self.misses += 1
+        if not remote:
+            raise LookupError(f"{name} is not in the local pokemon store")
+        record = slim_species(await self.fetcher(name))
+        await asyncio.to_thread(self._write_disk, record)
+        self._remember(record["name"], record)
+        return record
+
+    def species_names(self) -> List[str]:
+        """Names of every species held on disk, ordered by pokedex id."""
+        with self._lock:
+            rows = self._connect().execute("SELECT name FROM species ORDER BY id").fetchall()
+        return [row[0] for row in rows]
+
+    def seed_from_file(self, path: str) -> int:
+        """Loads a JSON list of species payloads into the store."""
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        for entry in entries:
+            self.put(entry)
+        return len(entries)
+
+    def export_to_file(self, path: str) -> int:
+        """Writes every cached species to a JSON file usable by seed_from_file."""
+        with self._lock:
+            rows = self._connect().execute("SELECT data FROM species ORDER BY id").fetchall()
+        entries = [json.loads(zlib.decompress(row[0])) for row in rows]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, separators=(",", ":"))
+        return len(entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "offline": self.offline
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def store_from_env(fetcher: Optional[Callable[[str], Awaitable[Dict[str, Any]]]] = None) -> PokemonStore:
+    """
+    Builds a store from POKEMON_CACHE_PATH, POKEMON_CACHE_SIZE, POKEMON_OFFLINE
+    and POKEMON_SEED_FILE.
+    """
+    store = PokemonStore(
+        db_path=os.getenv("POKEMON_CACHE_PATH", "pokemon_cache.sqlite3"),
+        max_memory_entries=int(os.getenv("POKEMON_CACHE_SIZE", "256")),
+        fetcher=fetcher,
+        offline=os.getenv("POKEMON_OFFLINE", "").lower() in ("1", "true", "yes")
+    )
+    seed_file = os.getenv("POKEMON_SEED_FILE")
+    if seed_file and os.path.exists(seed_file):
+        count = store.seed_from_file(seed_file)
+        print(f"Seeded pokemon store with {count} species from {seed_file}.")
+    return store
+
+
+if __name__ == "__main__":
+    # Usage:
+    #   python pokemon_store.py seed <file.json>    load a JSON dump into the cache
+    #   python pokemon_store.py export <file.json>  dump the cache for offline use
+    #   python pokemon_store.py fetch <name> ...    warm the cache from PokeAPI
+    import asyncio
+    import sys
+    import httpx
+
+    async def _fetch(name: str) -> Dict[str, Any]:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"https://pokeapi.co/api/v2/pokemon/{name}")
+            response.raise_for_status()
+            return response.json()
+
+    command, args = sys.argv[1], sys.argv[2:]
+    cli_store = store_from_env(fetcher=_fetch)
+    if command == "seed":
+        print(f"Seeded {cli_store.seed_from_file(args[0])} species.")
+    elif command == "export":
+        print(f"Exported {cli_store.export_to_file(args[0])} species.")
+    elif command == "fetch":
+        for pokemon_name in args:
+            asyncio.run(cli_store.get(pokemon_name))
+        print(cli_store.stats())
+    cli_store.close()
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import os
+import random
+from typing import Any, Awaitable, Callable, Collection, Dict, List, Optional
+
+# Page size used when walking PokeAPI's paginated /pokemon listing.
+PAGE_SIZE = 500
+
+# Bumped when cached filters change meaning; snapshots with another version keep only the names.
+SNAPSHOT_VERSION = 2
+
+
+class RosterIndex:
+    """
+    Process-wide index of every species name, loaded once and shared by all games.
+
+    Names are held in a list with a name -> position map, so sampling is a
+    random index lookup. Exclusions (a team of at most six) are handled by
+    rejection, which stays O(1) on average no matter how large the roster is.
+    Type and generation filters are fetched from PokeAPI on first use and
+    kept, along with the roster, in a local JSON snapshot. In offline mode a
+    filter that has not been fetched raises LookupError instead.
+    """
+
+    def __init__(
+        self,
+        fetch_json: Optional[Callable[[str], Awaitable[Dict[str, Any]]]] = None,
+        path: Optional[str] = "roster_cache.json",
+        offline: bool = False
+    ):
+        self.fetch_json = fetch_json
+        self.path = path
+        self.offline = offline
+        self.names: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self._filters: Dict[str, List[int]] = {}
+        self._rng = random.Random()
+        self._load_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.positions
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.names)
+
+    def set_names(self, names: List[str]) -> None:
+        self.names = list(dict.fromkeys(names))
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self._filters = {}
+
+    def load_snapshot(self) -> bool:
+        """Loads the roster and cached filters from the local snapshot, if present."""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        self.set_names(snapshot["names"])
+        if snapshot.get("version") == SNAPSHOT_VERSION:
+            self._filters = {key: indices for key, indices in snapshot.get("filters", {}).items()}
+        return self.loaded
+
+    def save_snapshot(self) -> None:
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": SNAPSHOT_VERSION, "names": self.names, "filters": self._filters}, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    async def refresh(self) -> None:
+        """
+        Walks every page of PokeAPI's /pokemon listing and replaces the roster.
+        Callers of ensure_loaded() wait for a refresh that is in progress.
+        """
+        async with self._load_lock:
+            await self._refresh()
+
+    async def _refresh(self) -> None:
+        names: List[str] = []
+        offset, count = 0, None
+        while count is None or offset < count:
+            page = await self.fetch_json(f"/pokemon?limit={PAGE_SIZE}&offset={offset}")
+            count = page["count"]
+            results = page["results"]
+            if not results:
+                break
+            names.extend(result['name'] for result in results)
+            offset += len(results)
+        self.set_names(names)
+        self.save_snapshot()
+        print(f"Loaded {len(self.names)} pokemon names from PokeAPI.")
+
+    async def ensure_loaded(self) -> None:
+        """Loads the roster once: from the snapshot if there is one, else from PokeAPI."""
+        if self.loaded:
+            return
+        async with self._load_lock:
+            if not self.loaded and not self.load_snapshot():
+                await self._refresh()
+
+    async def _filter(self, kind: str, value: str) -> List[int]:
+        key = f"{kind}:{value}".lower()
+        indices = self._filters.get(key)
+        if indices is None:
+            if self.offline or self.fetch_json is None:
+                raise LookupError(f"Filtering by {kind} needs PokeAPI, which is not used in offline mode.")
+            if kind == "type":
+                data = await self.fetch_json(f"/type/{value.lower()}")
+                members = [entry['pokemon']['name'] for entry in data['pokemon']]
+            else:
+                members = await self._generation_members(value.lower())
+            indices = sorted(self.positions[name] for name in members if name in self.positions)
+            self._filters[key] = indices
+            self.save_snapshot()
+        return indices
+
+    async def _generation_members(self, generation: str) -> List[str]:
+        """
+        /pokemon names in a generation. PokeAPI lists a generation's species,
+        whose names differ from the roster's for species with forms (deoxys ->
+        deoxys-normal, wormadam -> wormadam-plant), so each species is mapped
+        to its varieties.
+        """
+        data = await self.fetch_json(f"/generation/{generation}")
+        species = [entry['name'] for entry in data['pokemon_species']]
+        details = await asyncio.gather(*(self.fetch_json(f"/pokemon-species/{name}") for name in species))
+        return [variety['pokemon']['name'] for detail in details for variety in detail.get('varieties') or []]
+
+    async def sample(
+        self,
+        exclude: Collection[str] = (),
+        pokemon_type: Optional[str] = None,
+        generation: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Returns a random species name not in `exclude`, optionally restricted to
+        a type and/or generation. Returns None when nothing is eligible.
+        """
+        await self.ensure_loaded()
+        candidates: Optional[List[int]] = None
+        if pokemon_type:
+            candidates = await self._filter("type", pokemon_type)
+        if generation:
+            in_generation = await self._filter("generation", str(generation))
+            candidates = in_generation if candidates is None else sorted(set(candidates) & set(in_generation))
+        size = len(self.names) if candidates is None else len(candidates)
+        if size == 0:
+            return None
+
+        # Rejection sampling is O(1) on average while the exclusions are a small
+        # fraction of the candidates; otherwise fall back to an explicit filter.
+        if len(exclude) * 2 < size:
+            while True:
+                position = self._rng.randrange(size)
+                name = self.names[position if candidates is None else candidates[position]]
+                if name not in exclude:
+                    return name
+        pool = self.names if candidates is None else [self.names[i] for i in candidates]
+        remaining = [name for name in pool if name not in exclude]
+        return self._rng.choice(remaining) if remaining else None
@@ -1,15 +1,27 @@
 from fastapi import FastAPI, WebSocket, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi import Request
+from pydantic import BaseModel, Field
 import os
-import json
 from dotenv import load_dotenv
 from typing import Dict, List, Any
 import asyncio
-import httpx
+import time
+import secrets
 from ai_client import AIClient
+from generation_cache import cache_from_env
+from http_pool import PooledHTTPClient
+from battle_engine import stat_record
+from simulator import simulate_matchups, simulation_pool, summarize
+from pokemon_store import store_from_env
+from session_store import session_store_from_env
+from roster import RosterIndex
+from personality_pool import pool_from_env
+from moves import MoveIndex, BASIC_MOVES, recommendation_text
+from telemetry import registry, trace, span, timed
+from ws_pipeline import MessagePipeline, codec_for
+from wire import SpeciesTracker, battle_start, turn_delta, caught_entry
 
 # Load environment variables
 load_dotenv('api.env')
@@ -19,313 +31,611 @@ app = FastAPI()
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Templates
-templates = Jinja2Templates(directory=".")
+# Templates (Jinja2 is imported on the first page request, not at startup)
+templates = None
+
+def get_templates():
+    global templates
+    if templates is None:
+        from fastapi.templating import Jinja2Templates
+        templates = Jinja2Templates(directory=".")
+    return templates
 
 # Initialize AI client
-ai_client = AIClient(base_url="http://localhost:8000")
+ai_client = AIClient(
+    base_url=os.getenv("AI_SERVER_URL", "http://localhost:8000"),
+    cache=cache_from_env(),
+    batch_window=float(os.getenv("AI_BATCH_WINDOW_MS", "0")) / 1000,
+    max_batch_size=int(os.getenv("AI_BATCH_MAX_SIZE", "16")),
+    transport=os.getenv("AI_TRANSPORT", "http")
+)
 
 # PokeAPI base URL
-POKEAPI_BASE_URL = "https://pokeapi.co/api/v2"
-
-# Game state
+POKEAPI_BASE_URL = os.getenv("POKEAPI_BASE_URL", "https://pokeapi.co/api/v2")
+
+# Shared, pooled HTTP client for all PokeAPI traffic (opened at startup, closed at shutdown)
+pokeapi_client = PooledHTTPClient(
+    base_url=POKEAPI_BASE_URL,
+    max_connections=int(os.getenv("POKEAPI_MAX_CONNECTIONS", "20")),
+    timeout=float(os.getenv("POKEAPI_TIMEOUT", "10"))
+)
+
+async def fetch_remote_pokemon(pokemon_name: str) -> Dict[str, Any]:
+    """Fetches detailed data for a specific pokemon from PokeAPI."""
+    response = await pokeapi_client.get(f"/pokemon/{pokemon_name}")
+    return response.json()
+
+async def fetch_pokeapi_json(path: str) -> Dict[str, Any]:
+    response = await pokeapi_client.get(path)
+    return response.json()
+
+# Species store (memory LRU + on-disk cache) in front of PokeAPI
+pokemon_store = store_from_env(fetcher=fetch_remote_pokemon)
+
+# Shared index of every species name, loaded once per process
+roster = RosterIndex(
+    fetch_json=fetch_pokeapi_json,
+    path=os.getenv("ROSTER_PATH", "roster_cache.json"),
+    offline=pokemon_store.offline
+)
+
+def personality_prompt(pokemon_name: str) -> str:
+    return f"Generate a very short, quirky personality trait or backstory for a {pokemon_name} Pokemon.\nExample: Likes collecting shiny stones."
+
+async def generate_personality(pokemon_name: str) -> str:
+    """A fresh personality for the warmup worker; "" when the AI server only had a template to offer."""
+    return await ai_client.generate_content(
+        prompt=personality_prompt(pokemon_name),
+        kind="personality",
+        max_tokens=50,
+        temperature=1.0, # Variety matters more than consistency here
+        cache=False,
+        fallback=False
+    )
+
+# Personalities generated ahead of time during idle moments, so a catch never waits on the model.
+# The worker holds off while any player-facing AI call is in flight.
+personality_pool = pool_from_env(
+    generate=generate_personality,
+    species=lambda: roster.names,
+    busy=lambda: ai_client.in_flight > personality_pool.active
+)
+personality_pool_task: asyncio.Task | None = None
+
+# Power, type and damage class of each move, cached from PokeAPI; drives damage and recommendations
+move_index = MoveIndex(fetch_json=fetch_pokeapi_json, path=os.getenv("MOVES_PATH", "moves_cache.json"))
+
+# Recommendations are computed locally; an AI-written rationale can follow (disable with 0, or per request)
+RECOMMENDATION_RATIONALE = os.getenv("RECOMMENDATION_RATIONALE", "1").lower() not in ("0", "false", "no")
+
+# Game state: live games per connection, persisted by token in the session store
 game_states: Dict[str, dict] = {}
+session_store = session_store_from_env()
+
+# Latency of each /ws message type (catch_attempt, select_pokemon, attack, get_recommendation, ...)
+ws_message_duration = registry.histogram("ws_message_duration_seconds", "Game WebSocket message handling latency by type.")
+registry.gauge("ws_active_sessions", "Open game WebSocket connections.", lambda: len(game_states))
+catch_latency = registry.histogram("catch_latency_seconds", "Time from catch_attempt to catch_result, by personality source.")
+registry.gauge("personality_pool_depth", "Pre-generated personalities waiting in the pool.", lambda: len(personality_pool))
+registry.gauge("personality_pool_hit_ratio", "Share of catches served a pre-generated personality.", lambda: personality_pool.stats()["hit_ratio"])
+
+# Message types that change a game and trigger a session save
+SESSION_MUTATING_MESSAGES = {"select_pokemon", "catch_attempt", "attack"}
+
+# POST /simulate: worker processes (0 = one per core) and per-request limits
+SIMULATOR_PROCESSES = int(os.getenv("SIMULATOR_PROCESSES", "1"))
+SIMULATOR_MAX_OPPONENTS = int(os.getenv("SIMULATOR_MAX_OPPONENTS", "500"))
+SIMULATOR_MAX_BATTLES = int(os.getenv("SIMULATOR_MAX_BATTLES", "1000000"))
+simulation_executor = None
+
+class SimulationRequest(BaseModel):
+    player: str
+    opponents: List[str] = Field(default=[], max_length=SIMULATOR_MAX_OPPONENTS)
+    random_opponents: int = Field(default=0, ge=0, le=SIMULATOR_MAX_OPPONENTS)
+    battles: int = Field(default=100, ge=1, le=10000)
 
 class PokemonGame:
     def __init__(self):
         self.current_pokemon: Dict[str, Any] | None = None
         self.opponent_pokemon: Dict[str, Any] | None = None
         self.caught_pokemon: List[Dict[str, Any]] = []
-        self.all_pokemon_names: List[str] = []
-
-    async def load_all_pokemon_names(self):
-        """Fetches a list of all pokemon names from PokeAPI."""
-        async with httpx.AsyncClient() as client:
-            # Fetching a high limit to get most pokemon in one go. PokeAPI supports up to 100000.
-            response = await client.get(f"{POKEAPI_BASE_URL}/pokemon?limit=1000")
-            response.raise_for_status() # Raise an exception for bad status codes
-            data = response.json()
-            self.all_pokemon_names = [result['name'] for result in data['results']]
-            print(f"Loaded {len(self.all_pokemon_names)} pokemon names from PokeAPI.")
 
     async def fetch_pokemon_data(self, pokemon_name: str) -> Dict[str, Any]:
-        """Fetches detailed data for a specific pokemon from PokeAPI."""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{POKEAPI_BASE_URL}/pokemon/{pokemon_name}")
-            response.raise_for_status() # Raise an exception for bad status codes
-            return response.json()
+        """Fetches the slim record for a pokemon, going to PokeAPI only on a cache miss."""
+        return await pokemon_store.get(pokemon_name)
 
     async def select_pokemon(self, pokemon_name: str) -> bool:
         selected = next((p for p in self.caught_pokemon if p['name'] == pokemon_name), None)
         if selected:
             self.current_pokemon = selected.copy()
-            for stat in self.current_pokemon.get('stats', []):
-                if stat['stat']['name'] == 'hp':
-                    self.current_pokemon['hp'] = stat['base_stat']
-                    break
+            self.current_pokemon['hp'] = stat_record(selected).hp
             return True
         return False
 
     async def select_opponent(self) -> None:
-        import random
-        available_names = [name for name in self.all_pokemon_names if name != self.current_pokemon['name']]
-        if not available_names:
+        opponent_name = await roster.sample(exclude={self.current_pokemon['name']})
+        if opponent_name is None:
              print("No other pokemon available to select as opponent.")
              return
 
-        opponent_name = random.choice(available_names)
         try:
             opponent_data = await self.fetch_pokemon_data(opponent_name)
             self.opponent_pokemon = opponent_data.copy()
-            for stat in self.opponent_pokemon.get('stats', []):
-                 if stat['stat']['name'] == 'hp':
-                     self.opponent_pokemon['hp'] = stat['base_stat']
-                     break
+            self.opponent_pokemon['hp'] = stat_record(opponent_data).hp
         except Exception as e:
             print(f"Error fetching opponent pokemon data: {e}")
             self.opponent_pokemon = None
 
     def attack(self, attacking_pokemon: Dict[str, Any], defending_pokemon: Dict[str, Any], move: str):
-        attacker_attack = 0
-        defender_defense = 0
-        for stat in attacking_pokemon.get('stats', []):
-            if stat['stat']['name'] == 'attack':
-                attacker_attack = stat['base_stat']
-                break
-        for stat in defending_pokemon.get('stats', []):
-            if stat['stat']['name'] == 'defense':
-                defender_defense = stat['base_stat']
-                break
-
-        if defender_defense == 0:
-            defender_defense = 1
-            
-        base_damage = 20
-        damage = max(1, int((attacker_attack / defender_defense) * base_damage))
+        damage = move_index.damage(stat_record(attacking_pokemon), stat_record(defending_pokemon), move)
         defending_pokemon['hp'] = max(0, defending_pokemon['hp'] - damage)
         return f"{attacking_pokemon['name']} used {move}! It dealt {damage} damage."
 
-    async def catch_pokemon(self) -> Dict[str, Any] | None:
+    async def catch_pokemon(self, pokemon_type: str | None = None, generation: str | None = None) -> Dict[str, Any] | None:
         if len(self.caught_pokemon) >= 6:
             raise ValueError("You can only have 6 Pokemon in your team!")
             
-        if not self.all_pokemon_names:
-            await self.load_all_pokemon_names()
-            if not self.all_pokemon_names:
-                 print("Could not load pokemon names from PokeAPI.")
-                 return None
+        await roster.ensure_loaded()
+        if not roster.loaded:
+             print("Could not load pokemon names from PokeAPI.")
+             return None
                  
-        import random
-        available_to_catch = [name for name in self.all_pokemon_names if name not in [p['name'] for p in self.caught_pokemon]]
-        
-        if not available_to_catch:
+        caught_names = {p['name'] for p in self.caught_pokemon}
+        pokemon_name = await roster.sample(exclude=caught_names, pokemon_type=pokemon_type, generation=generation)
+        if pokemon_name is None:
             print("All available pokemon caught. Allowing duplicates.")
-            pokemon_name = random.choice(self.all_pokemon_names)
-        else:
-            pokemon_name = random.choice(available_to_catch)
+            pokemon_name = await roster.sample(pokemon_type=pokemon_type, generation=generation)
+            if pokemon_name is None:
+                return None
 
         try:
             pokemon_data = await self.fetch_pokemon_data(pokemon_name)
-            caught_data = {
-                "name": pokemon_data.get('name'),
-                "id": pokemon_data.get('id'),
-                "stats": pokemon_data.get('stats'),
-                "sprites": pokemon_data.get('sprites'),
-                "hp": None,
-                "moves": ["Tackle", "Quick Attack", "Scratch", "Bite"]  # Add basic moves
-            }
+            caught_data = self.make_caught_entry(pokemon_data)
             self.caught_pokemon.append(caught_data)
             return caught_data
         except Exception as e:
             print(f"Error fetching pokemon data for catching: {e}")
             return None
 
+    @staticmethod
+    def make_caught_entry(pokemon_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "name": pokemon_data.get('name'),
+            "id": pokemon_data.get('id'),
+            "types": pokemon_data.get('types'),
+            "stats": pokemon_data.get('stats'),
+            "sprites": pokemon_data.get('sprites'),
+            "hp": None,
+            "moves": list(BASIC_MOVES)  # Add basic moves
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact session snapshot; species data is stored by name and reloaded from the pokemon store."""
+        def battler(pokemon: Dict[str, Any] | None) -> Dict[str, Any] | None:
+            return {"name": pokemon['name'], "hp": pokemon['hp']} if pokemon else None
+
+        return {
+            "caught": [{"name": p['name'], "personality": p.get('personality')} for p in self.caught_pokemon],
+            "current": battler(self.current_pokemon),
+            "opponent": battler(self.opponent_pokemon)
+        }
+
+    @classmethod
+    async def from_dict(cls, data: Dict[str, Any]) -> "PokemonGame":
+        """Rebuilds a game from a to_dict snapshot."""
+        game = cls()
+        for entry in data.get("caught", []):
+            caught_data = cls.make_caught_entry(await pokemon_store.get(entry["name"]))
+            if entry.get("personality"):
+                caught_data['personality'] = entry["personality"]
+            game.caught_pokemon.append(caught_data)
+        current, opponent = data.get("current"), data.get("opponent")
+        if current:
+            selected = next((p for p in game.caught_pokemon if p['name'] == current["name"]), None)
+            if selected:
+                game.current_pokemon = {**selected, "hp": current["hp"]}
+        if opponent:
+            game.opponent_pokemon = {**(await pokemon_store.get(opponent["name"])), "hp": opponent["hp"]}
+        return game
+
     async def opponent_attack(self) -> str:
         if not self.opponent_pokemon or not self.current_pokemon:
             return "No Pokemon in battle!"
             
         import random
-        moves = ["Tackle", "Quick Attack", "Scratch", "Bite"]
-        move = random.choice(moves)
+        move = random.choice(BASIC_MOVES)
         return self.attack(self.opponent_pokemon, self.current_pokemon, move)
 
-game = PokemonGame()
+# Fast start: the app is ready as soon as a roster snapshot is loaded and the
+# remote roster refresh runs in the background. FAST_START=0 restores the
+# blocking startup that waits for PokeAPI.
+FAST_START = os.getenv("FAST_START", "1").lower() not in ("0", "false", "no")
+roster_refresh_task: asyncio.Task | None = None
+move_refresh_task: asyncio.Task | None = None
+
+async def refresh_roster():
+    try:
+        await roster.refresh()
+    except Exception as e:
+        print(f"Background roster refresh failed: {e}")
+
+async def refresh_moves():
+    try:
+        await move_index.ensure_loaded(BASIC_MOVES)
+    except Exception as e:
+        print(f"Could not fetch move data, using built-in values: {e}")
 
 @app.on_event("startup")
 async def startup_event():
-    await game.load_all_pokemon_names()
+    global roster_refresh_task, personality_pool_task, move_refresh_task, simulation_executor
+    await pokeapi_client.start()
+    simulation_executor = simulation_pool(SIMULATOR_PROCESSES)
+    move_index.load_snapshot()
+    if not pokemon_store.offline:
+        # Built-in values for the basic moves serve until PokeAPI's arrive
+        move_refresh_task = asyncio.create_task(refresh_moves())
+    if pokemon_store.offline:
+        # Offline, only species that are actually in the local store can be used
+        roster.set_names(pokemon_store.species_names())
+        print(f"Loaded {len(roster)} pokemon names from the local store.")
+    elif not FAST_START:
+        await roster.ensure_loaded()
+    else:
+        if roster.load_snapshot():
+            print(f"Loaded {len(roster)} pokemon names from {roster.path}; refreshing in the background.")
+        roster_refresh_task = asyncio.create_task(refresh_roster())
+    personality_pool_task = asyncio.create_task(personality_pool.run())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    tasks = [task for task in (roster_refresh_task, personality_pool_task, move_refresh_task) if task is not None]
+    for task in tasks:
+        task.cancel()
+    # The pool task stops its fills before returning; only then is it safe to close the stores they write to
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await pokeapi_client.close()
+    await ai_client.close()
+    pokemon_store.close()
+    session_store.close()
+    personality_pool.close()
+    if simulation_executor is not None:
+        await asyncio.to_thread(simulation_executor.shutdown, cancel_futures=True)
 
 @app.get("/", response_class=HTMLResponse)
 async def get_home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return get_templates().TemplateResponse("index.html", {"request": request})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return registry.render()
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Ready once a roster is available, whether from a snapshot or PokeAPI."""
+    if not roster.loaded:
+        return JSONResponse(status_code=503, content={"status": "starting", "roster": 0})
+    return {"status": "ready", "roster": len(roster)}
+
+@app.get("/stats/pokemon_store")
+async def get_pokemon_store_stats():
+    return pokemon_store.stats()
+
+@app.get("/stats/personality_pool")
+async def get_personality_pool_stats():
+    return personality_pool.stats()
+
+@app.get("/stats/http")
+async def get_http_stats():
+    return {"pokeapi": pokeapi_client.stats(), "ai_client": ai_client.stats()}
+
+@app.post("/simulate")
+async def simulate(request: SimulationRequest):
+    """Runs headless battles for `player` against the given and/or random opponents."""
+    total_opponents = len(request.opponents) + request.random_opponents
+    if total_opponents > SIMULATOR_MAX_OPPONENTS:
+        raise HTTPException(status_code=400, detail=f"At most {SIMULATOR_MAX_OPPONENTS} opponents per request.")
+    if total_opponents * request.battles > SIMULATOR_MAX_BATTLES:
+        raise HTTPException(status_code=400, detail=f"At most {SIMULATOR_MAX_BATTLES} battles per request.")
+
+    opponent_names = list(request.opponents)
+    for _ in range(request.random_opponents):
+        opponent_name = await roster.sample(exclude={request.player})
+        if opponent_name is None:
+            break
+        opponent_names.append(opponent_name)
+    if not opponent_names:
+        raise HTTPException(status_code=400, detail="Provide opponents or random_opponents.")
+
+    try:
+        species = await asyncio.gather(*(pokemon_store.get(name) for name in [request.player, *opponent_names]))
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=f"Could not load pokemon data: {e}")
+
+    player, *opponents = [stat_record(entry) for entry in species]
+    pairs = [(player, opponent) for opponent in opponents]
+    processes = SIMULATOR_PROCESSES if simulation_executor is not None else 1
+    results = await asyncio.to_thread(
+        simulate_matchups, pairs, request.battles, processes, move_index.detached(), executor=simulation_executor
+    )
+    return {"summary": summarize(results), "matchups": results}
+
+async def save_session(state: Dict[str, Any]) -> None:
+    await session_store.save(state["token"], state["game"].to_dict())
+
+async def send_species(pipeline: MessagePipeline, state: Dict[str, Any], *species: Dict[str, Any] | None) -> None:
+    """Sends static data for species this connection has not seen yet; later frames refer to them by name."""
+    frame = state["species"].frame(*species)
+    if frame:
+        await pipeline.send(frame)
+
+async def handle_resume(pipeline: MessagePipeline, state: Dict[str, Any], message: Dict[str, Any]) -> None:
+    token = message.get("token", "")
+    try:
+        snapshot = await session_store.load(token) if token else None
+        if snapshot is None:
+            await pipeline.send({"type": "server_log", "message": "Server: Session not found, starting a new game."})
+            await pipeline.send({"type": "session", "token": state["token"], "resume_failed": True})
+            return
+        game = await PokemonGame.from_dict(snapshot)
+        # AI work still pending for the game being replaced is stale
+        pipeline.cancel("recommendation", "commentary")
+        state["game"], state["token"] = game, token
+        in_battle = bool(game.current_pokemon and game.opponent_pokemon
+                         and game.current_pokemon['hp'] > 0 and game.opponent_pokemon['hp'] > 0)
+        await send_species(pipeline, state, *game.caught_pokemon, game.opponent_pokemon if in_battle else None)
+        await pipeline.send({
+            "type": "session_resumed",
+            "token": token,
+            "caught_list": [caught_entry(p) for p in game.caught_pokemon],
+            "battle": battle_start(game.current_pokemon, game.opponent_pokemon) if in_battle else None
+        })
+    except Exception as e:
+        print(f"Error resuming session: {e}")
+        await pipeline.send({"type": "error", "message": f"Could not resume session: {e}"})
+        await pipeline.send({"type": "session", "token": state["token"], "resume_failed": True})
+
+async def handle_select_pokemon(pipeline: MessagePipeline, state: Dict[str, Any], message: Dict[str, Any]) -> None:
+    game = state["game"]
+    pokemon_name = message.get("pokemon")
+
+    if not any(p['name'] == pokemon_name for p in game.caught_pokemon):
+        await pipeline.send({"type": "error", "message": f"You haven't caught {pokemon_name} yet!"})
+        return
+
+    # A new battle makes any pending recommendation or commentary stale
+    pipeline.cancel("recommendation", "commentary")
+    success = await game.select_pokemon(pokemon_name)
+    if success:
+        await game.select_opponent()
+        if not game.opponent_pokemon:
+            await pipeline.send({"type": "error", "message": "Could not find an opponent."})
+            return
+        await send_species(pipeline, state, game.current_pokemon, game.opponent_pokemon)
+        await pipeline.send({"type": "game_state", **battle_start(game.current_pokemon, game.opponent_pokemon)})
+    else:
+        await pipeline.send({"type": "error", "message": "Failed to select Pokemon."})
+
+async def handle_catch_attempt(pipeline: MessagePipeline, state: Dict[str, Any], message: Dict[str, Any]) -> None:
+    started = time.perf_counter()
+    try:
+        game = state["game"]
+        caught_data = await game.catch_pokemon(
+            pokemon_type=message.get("pokemon_type"),
+            generation=message.get("generation")
+        )
+    except Exception as e:
+        print(f"Error during catch attempt: {str(e)}")
+        await pipeline.send({"type": "error", "message": f"An error occurred while catching: {str(e)}"})
+        return
+
+    if not caught_data:
+        print("Failed to catch Pokemon - caught_data is None")
+        await pipeline.send({"type": "error", "message": "Failed to catch a pokemon."})
+        return
+
+    print(f"Successfully caught Pokemon: {caught_data['name']}")
+    # Usually served straight from the pre-generated pool; otherwise the catch itself is done and
+    # the personality is generated without blocking the next message
+    pooled = personality_pool.take(caught_data['name'])
+    if pooled is not None:
+        caught_data['personality'] = pooled
+        await send_catch_result(pipeline, state, game, caught_data, started, "pool")
+    else:
+        pipeline.spawn(send_catch_result(pipeline, state, game, caught_data, started, "live"))
+
+async def send_catch_result(
+    pipeline: MessagePipeline,
+    state: Dict[str, Any],
+    game: "PokemonGame",
+    caught_data: Dict[str, Any],
+    started: float,
+    source: str
+) -> None:
+    if 'personality' not in caught_data:
+        # Pool miss: generate personality/backstory using AI
+        prompt = personality_prompt(caught_data['name'])
+        print(f"Attempting to generate personality for {caught_data['name']} with prompt: {prompt}") # Add logging
+        with span("ws.catch_attempt.personality"):
+            try:
+                personality = await ai_client.generate_content(
+                    prompt=prompt,
+                    kind="personality", # Routed to a fast model tier by the AI server
+                    max_tokens=50 # Keep it concise
+                )
+                print(f"Generated personality: {personality}") # Add logging
+                caught_data['personality'] = personality
+            except Exception as e:
+                print(f"Error generating personality: {e}")
+                caught_data['personality'] = "A mysterious Pokemon."
+
+    await send_species(pipeline, state, caught_data)
+    await pipeline.send({
+        "type": "catch_result",
+        "caught_pokemon": caught_data['name'],
+        "slot": game.caught_pokemon.index(caught_data), # Position in the team; personalities can finish out of order
+        "team": [p['name'] for p in game.caught_pokemon], # Names in team order, so the client's list has no gaps
+        "newly_caught_personality": caught_data.get('personality', "") # Include personality
+    })
+    catch_latency.observe(time.perf_counter() - started, source=source)
+    # A pooled catch is saved by handle_message; a live one finishes after that save
+    if source == "live" and state["game"] is game:
+        await save_session(state)
+
+async def handle_get_recommendation(pipeline: MessagePipeline, state: Dict[str, Any], message: Dict[str, Any]) -> None:
+    game = state["game"]
+    player_pokemon = game.current_pokemon
+    opponent_pokemon = game.opponent_pokemon
+
+    if not player_pokemon or not opponent_pokemon:
+        await pipeline.send({"type": "error", "message": "Cannot get recommendation: Pokemon not selected or opponent not ready."})
+        return
+
+    # Scored locally over the same damage model as handle_attack, so no model call is needed
+    pick = move_index.recommend(
+        stat_record(player_pokemon), stat_record(opponent_pokemon), opponent_pokemon['hp'], player_pokemon.get('moves', [])
+    )
+    if pick is None:
+        await pipeline.send({"type": "error", "message": "Cannot get recommendation: no moves available."})
+        return
+    reason = recommendation_text(pick, opponent_pokemon['name'])
+    await pipeline.send({
+        "type": "recommendation",
+        "recommended_move": reason,
+        "move": pick["move"],
+        "damage": pick["damage"],
+        "knocks_out": pick["knocks_out"]
+    })
+
+    if message.get("rationale", RECOMMENDATION_RATIONALE):
+        # Optional flavour text from the AI; the recommendation itself is already on the client
+        rationale_prompt = f"In a Pokemon battle, {player_pokemon['name']} (HP: {player_pokemon['hp']}) is fighting {opponent_pokemon['name']} (HP: {opponent_pokemon['hp']}). The best move is {reason} In one short, lively sentence, explain to the trainer why {pick['move']} is the right call."
+        await pipeline.send({"type": "server_log", "message": "Server: Requesting recommendation rationale from AI..."})
+        pipeline.spawn(send_rationale(pipeline, rationale_prompt, pick["move"]), lane="recommendation")
+
+async def send_rationale(pipeline: MessagePipeline, rationale_prompt: str, move: str) -> None:
+    try:
+        with span("ws.get_recommendation.ai"):
+            rationale = await ai_client.generate_content(
+                prompt=rationale_prompt,
+                kind="recommendation",
+                max_tokens=100, # Keep the response concise
+                # The AI server's stock fallback names its own move, which would contradict the recommendation
+                fallback=False
+            )
+    except Exception as e:
+        print(f"Error getting recommendation rationale: {str(e)}")
+        return
+
+    if not rationale:
+        await pipeline.send({"type": "server_log", "message": "Server: AI rationale unavailable."})
+        return
+    await pipeline.send({"type": "recommendation_rationale", "move": move, "rationale": rationale})
+
+async def handle_attack(pipeline: MessagePipeline, state: Dict[str, Any], message: Dict[str, Any]) -> None:
+    game = state["game"]
+    player_pokemon = game.current_pokemon
+    opponent_pokemon = game.opponent_pokemon
+    move = message.get('move')
+
+    if not player_pokemon or not opponent_pokemon:
+        await pipeline.send({"type": "error", "message": "Cannot attack: Pokemon not selected or opponent not ready."})
+        return
+
+    # The recommendation and commentary for the previous turn no longer apply
+    pipeline.cancel("recommendation", "commentary")
+
+    winner = None # Initialize winner variable
+    battle_messages = [] # List to hold messages for the log
+
+    # Player's attack
+    player_attack_message = game.attack(player_pokemon, opponent_pokemon, move)
+    battle_messages.append(player_attack_message)
+
+    # Check if opponent is defeated after player's attack
+    if opponent_pokemon['hp'] <= 0:
+        winner = "Player"
+    else:
+        # Opponent's attack (only if opponent didn't faint)
+        opponent_attack_message = await game.opponent_attack()
+        battle_messages.append(opponent_attack_message)
+
+        # Check if player is defeated after opponent's attack
+        if player_pokemon['hp'] <= 0:
+            winner = "Opponent"
+
+    # Combine battle messages for the description
+    description = "\n".join(battle_messages)
+
+    # Send the mechanical turn result right away (only what changed); AI commentary streams in after it
+    await pipeline.send({"type": "game_state", **turn_delta(player_pokemon, opponent_pokemon, description, move, winner)})
+
+    # Stream a creative AI description if no winner yet
+    if ai_client and not winner:
+        pipeline.spawn(stream_commentary(pipeline, description), lane="commentary")
+
+async def stream_commentary(pipeline: MessagePipeline, description: str) -> None:
+    await pipeline.send({"type": "server_log", "message": "Server: Streaming AI battle description..."})
+    started = time.perf_counter()
+    ttft_ms = None
+    chunks = []
+    with span("ws.attack.commentary"):
+        async for chunk in ai_client.stream_content(
+            prompt=description,
+            kind="commentary",
+            temperature=0.7
+        ):
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - started) * 1000
+            chunks.append(chunk)
+            await pipeline.send({"type": "description_chunk", "text": chunk})
+    api_description = "".join(chunks)
+    await pipeline.send({
+        "type": "description_done",
+        "description": api_description or description, # Fall back to the mechanical description
+        "ttft_ms": ttft_ms
+    })
+    if ttft_ms is None:
+        await pipeline.send({"type": "server_log", "message": "Server: AI description unavailable, using battle log."})
+    else:
+        await pipeline.send({"type": "server_log", "message": f"Server: AI first token after {ttft_ms:.0f} ms."})
+
+MESSAGE_HANDLERS = {
+    "resume": handle_resume,
+    "select_pokemon": handle_select_pokemon,
+    "catch_attempt": handle_catch_attempt,
+    "get_recommendation": handle_get_recommendation,
+    "attack": handle_attack
+}
+
+async def handle_message(pipeline: MessagePipeline, state: Dict[str, Any], message: Dict[str, Any]) -> None:
+    handler = MESSAGE_HANDLERS.get(message["type"])
+    if handler is None:
+        print(f"Ignoring unknown message type: {message['type']}")
+        return
+
+    # Every message is its own trace; the id propagates to AIClient, ai_server and any spawned AI task
+    with trace(), span(f"ws.{message['type']}"), timed(ws_message_duration, type=message["type"]):
+        await handler(pipeline, state, message)
+        if message["type"] in SESSION_MUTATING_MESSAGES:
+            await save_session(state)
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     client_id = str(id(websocket))
-    game_states[client_id] = {"game": PokemonGame()}
-    
+    state = {"game": PokemonGame(), "token": secrets.token_urlsafe(16), "species": SpeciesTracker()}
+    game_states[client_id] = state
+    # Browsers get JSON text frames; other clients may ask for binary MessagePack with ?encoding=msgpack
+    codec = codec_for(websocket.query_params.get("encoding"))
+    pipeline = MessagePipeline(websocket, lambda message: handle_message(pipeline, state, message), codec=codec)
+    await pipeline.send({"type": "session", "token": state["token"], "encoding": codec.name})
+
     try:
-        while True:
-            data = await websocket.receive_text()
-            message = json.loads(data)
-            
-            if message["type"] == "select_pokemon":
-                game = game_states[client_id]["game"]
-                pokemon_name = message["pokemon"]
-                
-                if not any(p['name'] == pokemon_name for p in game.caught_pokemon):
-                    await websocket.send_json({"type": "error", "message": f"You haven't caught {pokemon_name} yet!"})
-                    return
-
-                success = await game.select_pokemon(pokemon_name)
-                if success:
-                    await game_states[client_id]["game"].select_opponent()
-                    response = {
-                        "type": "game_state",
-                        "player_pokemon": game_states[client_id]["game"].current_pokemon,
-                        "opponent_pokemon": game_states[client_id]["game"].opponent_pokemon
-                    }
-                    await websocket.send_json(response)
-                else:
-                    await websocket.send_json({"type": "error", "message": "Failed to select Pokemon."})
-            
-            elif message["type"] == "catch_attempt":
-                try:
-                    game = game_states[client_id]["game"]
-                    caught_data = await game.catch_pokemon()
-                    if caught_data:
-                        print(f"Successfully caught Pokemon: {caught_data['name']}")
-                        
-                        # Generate personality/backstory using AI
-                        personality_prompt = f"Generate a very short, quirky personality trait or backstory for a {caught_data['name']} Pokemon.\nExample: Likes collecting shiny stones."
-                        print(f"Attempting to generate personality for {caught_data['name']} with prompt: {personality_prompt}") # Add logging
-                        try:
-                            personality = await ai_client.generate_content(
-                                prompt=personality_prompt,
-                                model="claude-3-opus-20240229", # Or another suitable model
-                                max_tokens=50 # Keep it concise
-                            )
-                            print(f"Generated personality: {personality}") # Add logging
-                            caught_data['personality'] = personality
-                        except Exception as e:
-                            print(f"Error generating personality: {e}")
-                            caught_data['personality'] = "A mysterious Pokemon."
-
-                        await websocket.send_json({
-                            "type": "catch_result",
-                            "caught_pokemon": caught_data['name'],
-                            "caught_list": game.caught_pokemon,
-                            "newly_caught_personality": caught_data.get('personality', "") # Include personality
-                        })
-                    else:
-                        print("Failed to catch Pokemon - caught_data is None")
-                        await websocket.send_json({"type": "error", "message": "Failed to catch a pokemon."})
-                except Exception as e:
-                    print(f"Error during catch attempt: {str(e)}")
-                    await websocket.send_json({"type": "error", "message": f"An error occurred while catching: {str(e)}"})    
-            
-            elif message["type"] == "get_recommendation":
-                try:
-                    game = game_states[client_id]["game"]
-                    player_pokemon = game.current_pokemon
-                    opponent_pokemon = game.opponent_pokemon
-
-                    if not player_pokemon or not opponent_pokemon:
-                        await websocket.send_json({"type": "error", "message": "Cannot get recommendation: Pokemon not selected or opponent not ready."})
-                        return
-
-                    # Construct prompt for attack recommendation
-                    recommendation_prompt = f"Given the following Pokemon battle scenario: Your Pokemon, {player_pokemon['name']} (HP: {player_pokemon.get('hp', 'unknown')}), is fighting against opponent's {opponent_pokemon['name']} (HP: {opponent_pokemon.get('hp', 'unknown')}). Your available moves are: {player_pokemon.get('moves', [])}. Based on typical Pokemon battles, which of your moves would be most effective in this situation? Provide ONLY the move name as the first word of your response, followed by a very brief reason.\nExample: Tackle because it's a basic reliable move."
-
-                    await websocket.send_json({"type": "server_log", "message": "Server: Requesting attack recommendation from AI..."})
-                    
-                    recommendation = await ai_client.generate_content(
-                        prompt=recommendation_prompt,
-                        model="claude-3-opus-20240229", # Or another suitable model
-                        max_tokens=100 # Keep the response concise
-                    )
-                    
-                    await websocket.send_json({"type": "server_log", "message": f"Server: Recommendation received: {recommendation[:50]}..."})
-                    
-                    # Send the recommendation back to the client
-                    await websocket.send_json({
-                        "type": "recommendation",
-                        "recommended_move": recommendation
-                    })
-
-                except Exception as e:
-                    print(f"Error getting recommendation: {str(e)}")
-                    await websocket.send_json({"type": "error", "message": f"An error occurred while getting recommendation: {str(e)}"})
-            
-            elif message["type"] == "attack":
-                try:
-                    game = game_states[client_id]["game"]
-                    player_pokemon = game.current_pokemon
-                    opponent_pokemon = game.opponent_pokemon
-                    move = message['move']
-
-                    if not player_pokemon or not opponent_pokemon:
-                        await websocket.send_json({"type": "error", "message": "Cannot attack: Pokemon not selected or opponent not ready."})
-                        return
-
-                    winner = None # Initialize winner variable
-                    battle_messages = [] # List to hold messages for the log
-
-                    # Player's attack
-                    player_attack_message = game.attack(player_pokemon, opponent_pokemon, move)
-                    battle_messages.append(player_attack_message)
-
-                    # Check if opponent is defeated after player's attack
-                    if opponent_pokemon['hp'] <= 0:
-                        winner = "Player"
-                    else:
-                        # Opponent's attack (only if opponent didn't faint)
-                        opponent_attack_message = await game.opponent_attack()
-                        battle_messages.append(opponent_attack_message)
-
-                        # Check if player is defeated after opponent's attack
-                        if player_pokemon['hp'] <= 0:
-                            winner = "Opponent"
-
-                    # Combine battle messages for the description
-                    description_for_api = "\n".join(battle_messages)
-                    api_description = description_for_api # Default description
-
-                    # Call AI API for creative description if no winner yet
-                    if ai_client and not winner:
-                        try:
-                            await websocket.send_json({"type": "server_log", "message": "Server: Making AI call for battle description..."})
-                            response = await ai_client.generate_content(
-                                prompt=description_for_api,
-                                model="claude-3-opus-20240229",
-                                temperature=0.7
-                            )
-                            await websocket.send_json({"type": "server_log", "message": f"Server: AI response received: {response[:50]}..."})
-                            if response:
-                                api_description = response
-                        except Exception as api_error:
-                            await websocket.send_json({"type": "server_log", "message": f"Server: Error calling AI: {api_error}"})
-                            api_description = description_for_api
-
-                    # Prepare and send the final game state payload
-                    response_payload = {
-                        "type": "game_state",
-                        "player_pokemon": player_pokemon,
-                        "opponent_pokemon": opponent_pokemon,
-                        "description": api_description, # Use API description if successful, otherwise default
-                        "move": move,
-                        "winner": winner # Will be None if battle continues
-                    }
-                    await websocket.send_json(response_payload)
-
-                except Exception as e:
-                    print(f"Error in attack handling: {str(e)}")
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": f"An error occurred during the attack: {str(e)}"
-                    })
-    
+        await pipeline.run()
     except Exception as e:
         print(f"WebSocket error: {str(e)}")
     finally:
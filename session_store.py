@@ -0,0 +1,164 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+
+def encode_session(data: Dict[str, Any]) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def decode_session(blob: bytes) -> Dict[str, Any]:
+    return json.loads(blob)
+
+
+class SessionStore(ABC):
+    """
+    Key/value store for serialized game sessions, keyed by session token.
+
+    The interface is deliberately Redis-shaped (get/set with TTL/delete on
+    opaque bytes) so a networked backend can replace the local ones without
+    touching server.py. Expired sessions are purged at most once every
+    `purge_interval` seconds, from save().
+    """
+
+    purge_interval = 60.0
+
+    def __init__(self, ttl: float = 86400.0):
+        self.ttl = ttl
+        self._next_purge = time.time() + self.purge_interval
+
+    @abstractmethod
+    async def get(self, token: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, token: str, blob: bytes) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, token: str) -> None:
+        ...
+
+    @abstractmethod
+    async def purge_expired(self) -> int:
+        """Drops every expired session; returns how many were dropped."""
+
+    async def load(self, token: str) -> Optional[Dict[str, Any]]:
+        blob = await self.get(token)
+        return decode_session(blob) if blob is not None else None
+
+    async def save(self, token: str, data: Dict[str, Any]) -> None:
+        await self.set(token, encode_session(data))
+        if time.time() >= self._next_purge:
+            self._next_purge = time.time() + self.purge_interval
+            await self.purge_expired()
+
+    def close(self) -> None:
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local store; sessions survive reconnects but not restarts."""
+
+    def __init__(self, ttl: float = 86400.0):
+        super().__init__(ttl)
+        self._sessions: Dict[str, Tuple[float, bytes]] = {}
+
+    async def get(self, token: str) -> Optional[bytes]:
+        entry = self._sessions.get(token)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._sessions[token]
+            return None
+        return entry[1]
+
+    async def set(self, token: str, blob: bytes) -> None:
+        self._sessions[token] = (time.time() + self.ttl, blob)
+
+    async def delete(self, token: str) -> None:
+        self._sessions.pop(token, None)
+
+    async def purge_expired(self) -> int:
+        now = time.time()
+        expired = [token for token, (expires, _) in self._sessions.items() if expires <= now]
+        for token in expired:
+            del self._sessions[token]
+        return len(expired)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    File-backed store shared by every worker process on the host. WAL mode
+    lets readers in one worker proceed while another worker writes.
+
+    Queries run in a worker thread, so a save waiting on another process's
+    write lock (up to `busy_timeout` seconds) never stalls the event loop
+    and the other connections it serves.
+    """
+
+    def __init__(self, path: str = "sessions.sqlite3", ttl: float = 86400.0, busy_timeout: float = 10.0):
+        super().__init__(ttl)
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=busy_timeout)
+        # One connection is shared by the worker threads; statements and commits must not interleave
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "token TEXT PRIMARY KEY, data BLOB NOT NULL, expires REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def _execute(self, sql: str, params: Tuple[Any, ...], commit: bool = False) -> sqlite3.Cursor:
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            if commit:
+                self._db.commit()
+            return cursor
+
+    async def get(self, token: str) -> Optional[bytes]:
+        def read() -> Optional[bytes]:
+            row = self._execute(
+                "SELECT data FROM sessions WHERE token = ? AND expires > ?", (token, time.time())
+            ).fetchone()
+            return row[0] if row is not None else None
+
+        return await asyncio.to_thread(read)
+
+    async def set(self, token: str, blob: bytes) -> None:
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR REPLACE INTO sessions (token, data, expires) VALUES (?, ?, ?)",
+            (token, blob, time.time() + self.ttl),
+            True
+        )
+
+    async def delete(self, token: str) -> None:
+        await asyncio.to_thread(self._execute, "DELETE FROM sessions WHERE token = ?", (token,), True)
+
+    async def purge_expired(self) -> int:
+        cursor = await asyncio.to_thread(self._execute, "DELETE FROM sessions WHERE expires <= ?", (time.time(),), True)
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def session_store_from_env() -> SessionStore:
+    """
+    SESSION_STORE=memory (default) or sqlite; SESSION_STORE_PATH and
+    SESSION_TTL (seconds) configure it. Use sqlite when running several
+    uvicorn workers so any worker can resume any session.
+    """
+    ttl = float(os.getenv("SESSION_TTL", "86400"))
+    if os.getenv("SESSION_STORE", "memory").lower() == "sqlite":
+        return SQLiteSessionStore(os.getenv("SESSION_STORE_PATH", "sessions.sqlite3"), ttl=ttl)
+    return MemorySessionStore(ttl=ttl)
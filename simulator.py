@@ -0,0 +1,164 @@
+import multiprocessing
+import os
+import random
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from battle_engine import StatRecord, apply_turns
+from moves import BASIC_MOVES, MoveIndex
+
+# Safety net for battles where neither side can land a hit (e.g. both sides
+# immune to every move they use); such battles count for neither player.
+MAX_TURNS = 1000
+
+
+def simulate_batch(
+    pairs: Sequence[Tuple[StatRecord, StatRecord]],
+    battles: int,
+    move_index: Optional[MoveIndex] = None,
+    seed: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Runs `battles` full battles for every (player, opponent) pair, all in lockstep.
+
+    Uses the same rules as the /ws game loop: the player hits first, the
+    opponent only strikes back if it is still standing, and whoever drops
+    to 0 HP loses. Hits go through the game's damage model (`move_index`,
+    the built-in basic moves by default), so power, type effectiveness and
+    STAB apply. The player always uses the move recommended for the
+    matchup; the opponent picks a random basic move every turn, as in the
+    game, so battles of one pair differ. Each turn is resolved for every
+    unfinished battle with one apply_turns call.
+    """
+    move_index = move_index if move_index is not None else MoveIndex(path=None)
+    rng = random.Random(seed)
+    picks = [(move_index.recommend(player, opponent, opponent.hp, BASIC_MOVES) or {}).get("move") for player, opponent in pairs]
+    players = [player for player, _ in pairs for _ in range(battles)]
+    opponents = [opponent for _, opponent in pairs for _ in range(battles)]
+    player_moves = [move for move in picks for _ in range(battles)]
+    player_hp = [player.hp for player in players]
+    opponent_hp = [opponent.hp for opponent in opponents]
+    winners: List[str | None] = [None] * len(players)
+    turns = [0] * len(players)
+
+    # Damage depends only on the two species and the move, so each combination is computed once
+    damages: Dict[Tuple[int, int, Optional[str]], int] = {}
+
+    def damage(attacker: StatRecord, defender: StatRecord, move: Optional[str]) -> int:
+        key = (id(attacker), id(defender), move)
+        value = damages.get(key)
+        if value is None:
+            value = damages[key] = move_index.damage(attacker, defender, move)
+        return value
+
+    active = list(range(len(players)))
+    turn = 0
+    while active and turn < MAX_TURNS:
+        turn += 1
+        hps = [opponent_hp[i] for i in active]
+        apply_turns(hps, [players[i] for i in active], [opponents[i] for i in active],
+                    [player_moves[i] for i in active], damage)
+        still_active = []
+        for i, hp in zip(active, hps):
+            opponent_hp[i] = hp
+            if hp <= 0:
+                winners[i] = "Player"
+                turns[i] = turn
+            else:
+                still_active.append(i)
+        active = still_active
+
+        hps = [player_hp[i] for i in active]
+        apply_turns(hps, [opponents[i] for i in active], [players[i] for i in active],
+                    [rng.choice(BASIC_MOVES) for _ in active], damage)
+        still_active = []
+        for i, hp in zip(active, hps):
+            player_hp[i] = hp
+            if hp <= 0:
+                winners[i] = "Opponent"
+                turns[i] = turn
+            else:
+                still_active.append(i)
+        active = still_active
+
+    results = []
+    for index, (player, opponent) in enumerate(pairs):
+        chunk = slice(index * battles, (index + 1) * battles)
+        pair_winners = winners[chunk]
+        player_wins = pair_winners.count("Player")
+        results.append({
+            "player": player.name,
+            "opponent": opponent.name,
+            "player_move": picks[index],
+            "battles": battles,
+            "player_wins": player_wins,
+            "opponent_wins": pair_winners.count("Opponent"),
+            "win_rate": player_wins / battles if battles else 0.0,
+            "turns": dict(sorted(Counter(turns[chunk]).items()))
+        })
+    return results
+
+
+def worker_count(processes: int) -> int:
+    """`processes=0` means one worker per CPU core."""
+    return processes or os.cpu_count() or 1
+
+
+def simulation_pool(processes: int) -> Optional[ProcessPoolExecutor]:
+    """
+    A process pool for simulate_matchups, or None when one process is enough.
+    Workers are spawned rather than forked so they never inherit the parent's
+    event loop, sockets or database handles.
+    """
+    processes = worker_count(processes)
+    if processes <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+
+
+def simulate_matchups(
+    pairs: Sequence[Tuple[StatRecord, StatRecord]],
+    battles: int = 100,
+    processes: int = 1,
+    move_index: Optional[MoveIndex] = None,
+    seed: Optional[int] = None,
+    executor: Optional[Executor] = None
+) -> List[Dict[str, Any]]:
+    """
+    Simulates every pair, optionally splitting the pairs into `processes`
+    chunks run on a process pool.
+
+    `processes=0` uses one worker per CPU core. A long-lived `executor`
+    (see simulation_pool) is reused; without one a pool is created for this
+    call. Workers get a detached copy of `move_index`.
+    """
+    processes = worker_count(processes)
+    if processes <= 1 or len(pairs) <= 1:
+        return simulate_batch(pairs, battles, move_index, seed)
+
+    if executor is None:
+        with simulation_pool(processes) as pool:
+            return simulate_matchups(pairs, battles, processes, move_index, seed, pool)
+
+    move_index = move_index.detached() if move_index is not None else None
+    chunk_size = -(-len(pairs) // processes)
+    chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+    seeds = [None if seed is None else seed + i for i in range(len(chunks))]
+    results = executor.map(simulate_batch, chunks, [battles] * len(chunks), [move_index] * len(chunks), seeds)
+    return [result for chunk_results in results for result in chunk_results]
+
+
+def summarize(results: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregates per-pair results into an overall win rate and turn distribution."""
+    battles = sum(result["battles"] for result in results)
+    player_wins = sum(result["player_wins"] for result in results)
+    turns: Counter = Counter()
+    for result in results:
+        turns.update(result["turns"])
+    return {
+        "battles": battles,
+        "player_wins": player_wins,
+        "win_rate": player_wins / battles if battles else 0.0,
+        "turns": dict(sorted(turns.items()))
+    }
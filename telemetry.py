@@ -0,0 +1,191 @@
+import contextvars
+import time
+import uuid
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Header used to propagate the trace id from server.py through AIClient to ai_server.
+TRACE_HEADER = "X-Trace-Id"
+
+# Latency buckets (seconds) covering cache hits through multi-second model calls.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+current_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+current_span: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("span", default=None)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = _label_key(labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # Per label set: [per-bucket counts..., +Inf count], sum
+        self.values: Dict[LabelKey, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        counts, total = self.values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def count(self, **labels: Any) -> int:
+        entry = self.values.get(_label_key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket_labels = _format_labels(key, 'le="%g"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            cumulative += counts[-1]
+            bucket_labels = _format_labels(key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total[0]:g}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """A value read from a callback at scrape time, e.g. a queue depth."""
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.read():g}"]
+
+
+class Registry:
+    """Holds a process's metrics and renders them in Prometheus text format."""
+
+    def __init__(self, recent_spans: int = 512):
+        self.metrics: Dict[str, Any] = {}
+        self.spans: Deque[Dict[str, Any]] = deque(maxlen=recent_spans)
+        self.span_duration = self.histogram("span_duration_seconds", "Duration of traced spans.")
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self.metrics.setdefault(name, Counter(name, help))
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(name, help, buckets))
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]) -> Gauge:
+        return self.metrics.setdefault(name, Gauge(name, help, read))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def trace(self, trace_id: str) -> List[Dict[str, Any]]:
+        """Recently finished spans belonging to one trace, oldest first."""
+        return [span for span in self.spans if span["trace_id"] == trace_id]
+
+
+registry = Registry()
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+@contextmanager
+def trace(trace_id: Optional[str] = None) -> Iterator[str]:
+    """Binds a trace id (given, e.g. from TRACE_HEADER, or freshly generated) to the current context."""
+    trace_id = trace_id or new_trace_id()
+    token = current_trace_id.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        current_trace_id.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Times a unit of work under the current trace. The duration lands in the
+    span_duration_seconds histogram and the span record (with its parent)
+    in the registry's recent-span buffer. Attributes may be added to the
+    yielded dict while the span is open.
+    """
+    record = {
+        "trace_id": current_trace_id.get() or "",
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": current_span.get(),
+        "name": name,
+        "attributes": attributes
+    }
+    token = current_span.set(record["span_id"])
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = repr(e)
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        current_span.reset(token)
+        record["duration_ms"] = duration * 1000
+        registry.span_duration.observe(duration, span=name)
+        registry.spans.append(record)
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels: Any) -> Iterator[None]:
+    """Observes the duration of the enclosed block in `histogram`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started, **labels)
+
+
+def record_usage(counter: Counter, usage: Dict[str, int], **labels: Any) -> None:
+    """Adds a ModelResponse.usage dict to a token counter, labelled by token kind."""
+    for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind):
+            counter.inc(usage[kind], kind=kind.split("_")[0], **labels)
+
+
+def trace_headers() -> Dict[str, str]:
+    """Headers that carry the current trace id to another service."""
+    trace_id = current_trace_id.get()
+    return {TRACE_HEADER: trace_id} if trace_id else {}
@@ -0,0 +1,20 @@
+"""
+The project root is importable from every test, as it is for the benchmark
+scripts. Caches and stores that server.py opens at import time go to a
+scratch directory instead of the working tree.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_scratch = tempfile.mkdtemp(prefix="pokemon-tests-")
+for variable, filename in (
+    ("POKEMON_CACHE_PATH", "pokemon_cache.sqlite3"),
+    ("ROSTER_PATH", "roster_cache.json"),
+    ("MOVES_PATH", "moves_cache.json"),
+    ("PERSONALITY_POOL_PATH", "personality_pool.sqlite3"),
+    ("SESSION_STORE_PATH", "sessions.sqlite3")
+):
+    os.environ.setdefault(variable, os.path.join(_scratch, filename))
@@ -0,0 +1,85 @@
+"""Test doubles shared by the test modules."""
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import List, Optional
+
+from starlette.websockets import WebSocketDisconnect
+
+
+class FakeStream:
+    """Stands in for the SDK's `async with client.messages.stream(...)` context."""
+
+    def __init__(self, chunks: List[str], delay: float = 0.0, fail_after: Optional[int] = None):
+        self.chunks = chunks
+        self.delay = delay
+        self.fail_after = fail_after
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    @property
+    def text_stream(self):
+        return self._texts()
+
+    async def _texts(self):
+        for index, chunk in enumerate(self.chunks):
+            if self.fail_after is not None and index >= self.fail_after:
+                raise RuntimeError("upstream dropped the stream")
+            await asyncio.sleep(self.delay)
+            yield chunk
+
+    async def get_final_message(self):
+        return SimpleNamespace(usage=SimpleNamespace(input_tokens=12, output_tokens=len(self.chunks)))
+
+
+class FakeMessages:
+    """Async Anthropic `messages` stub: stream() yields `chunks`, create() answers `text`."""
+
+    def __init__(self, chunks: Optional[List[str]] = None, delay: float = 0.0, fail_after: Optional[int] = None, text: str = "ok"):
+        self.chunks = chunks if chunks is not None else ["Pikachu ", "dodges ", "and strikes!"]
+        self.delay = delay
+        self.fail_after = fail_after
+        self.text = text
+        self.models: List[str] = []
+
+    def stream(self, model, max_tokens, temperature, messages):
+        self.models.append(model)
+        return FakeStream(self.chunks, self.delay, self.fail_after)
+
+    async def create(self, model, max_tokens, temperature, messages):
+        self.models.append(model)
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(
+            content=[SimpleNamespace(text=self.text)],
+            usage=SimpleNamespace(input_tokens=12, output_tokens=4)
+        )
+
+
+class FakeWebSocket:
+    """The receive_text/send_text surface MessagePipeline uses, backed by queues; disconnect() ends the reader."""
+
+    def __init__(self):
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.outgoing: asyncio.Queue = asyncio.Queue()
+
+    def push(self, text: str) -> None:
+        self.incoming.put_nowait(text)
+
+    def disconnect(self) -> None:
+        self.incoming.put_nowait(None)
+
+    async def receive_text(self) -> str:
+        text = await self.incoming.get()
+        if text is None:
+            raise WebSocketDisconnect(1000)
+        return text
+
+    async def send_text(self, text: str) -> None:
+        await self.outgoing.put(json.loads(text))
+
+    async def next_frame(self, timeout: float = 1.0) -> dict:
+        return await asyncio.wait_for(self.outgoing.get(), timeout)
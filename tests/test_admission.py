@@ -0,0 +1,72 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import ai_server
+from admission import AdmissionLimiter
+from fakes import FakeMessages
+
+
+@pytest.fixture(autouse=True)
+def upstream(monkeypatch):
+    monkeypatch.setattr(ai_server, "async_client", SimpleNamespace(messages=FakeMessages(delay=0.01)))
+    monkeypatch.setattr(ai_server, "limiter", AdmissionLimiter(max_concurrency=4, max_queue=4, queue_timeout=1.0))
+
+
+def stream_request(payload):
+    """ASGI scope and receive callable for one POST /generate_stream whose client never reads the reply."""
+    body = json.dumps(payload).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/generate_stream", "raw_path": b"/generate_stream", "root_path": "",
+        "query_string": b"", "client": ("127.0.0.1", 1234), "server": ("ai-server", 80),
+        "headers": [(b"host", b"ai-server"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())]
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    return scope, receive
+
+
+def test_stream_slot_is_released_when_cancelled_before_the_body_starts():
+    # The server cancels a request whose client went away; here that happens
+    # right after admission, before the response body was iterated
+    async def run() -> int:
+        leaked = 0
+        for _ in range(ai_server.limiter.max_concurrency + 2):
+            scope, receive = stream_request({"prompt": "Pikachu used Tackle!", "kind": "commentary"})
+
+            async def send(message):
+                await asyncio.sleep(0)
+
+            task = asyncio.create_task(ai_server.app(scope, receive, send))
+            while ai_server.limiter.active == 0 and not task.done():
+                await asyncio.sleep(0)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await asyncio.sleep(0.02)
+            leaked = ai_server.limiter.active
+        return leaked
+
+    assert asyncio.run(run()) == 0
+
+
+def test_stream_slot_is_released_when_the_client_disconnects():
+    async def run() -> None:
+        scope, receive = stream_request({"prompt": "Pikachu used Tackle!"})
+
+        async def send(message):
+            raise OSError("client disconnected")
+
+        await asyncio.gather(ai_server.app(scope, receive, send), return_exceptions=True)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert ai_server.limiter.active == 0
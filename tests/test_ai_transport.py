@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import httpx
+import websockets
+
+import ai_server
+from ai_client import AIClient
+from ai_transport import MultiplexedConnection
+
+
+def reply(message):
+    return json.dumps({"id": message["id"], "response": {"response": message["prompt"], "model": "m", "usage": {}}})
+
+
+def test_connection_reopens_after_the_server_drops_it():
+    async def handler(ws):
+        # Each connection answers one request, then goes away
+        await ws.send(reply(json.loads(await ws.recv())))
+        await ws.close()
+
+    async def run():
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            connection = MultiplexedConnection(f"ws://127.0.0.1:{port}", reconnect_delay=0.0)
+            first = await connection.request({"prompt": "one"})
+            while connection.connected:
+                await asyncio.sleep(0.01)
+            second = await connection.request({"prompt": "two"})
+            await connection.close()
+            return connection, first, second
+
+    connection, first, second = asyncio.run(run())
+    assert (first["response"], second["response"]) == ("one", "two")
+    assert connection.connects == 2
+    assert connection.disconnects >= 1
+
+
+def test_pending_requests_fail_when_the_socket_closes():
+    async def handler(ws):
+        await ws.recv()
+        await ws.close()
+
+    async def run():
+        async with websockets.serve(handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            connection = MultiplexedConnection(f"ws://127.0.0.1:{port}", reconnect_delay=0.0)
+            try:
+                await connection.request({"prompt": "lost"})
+            except ConnectionError:
+                return True
+            finally:
+                await connection.close()
+            return False
+
+    assert asyncio.run(run())
+
+
+def test_ai_client_falls_back_to_http_while_the_socket_is_down():
+    posted = []
+
+    def answer(request):
+        posted.append(json.loads(request.content))
+        return httpx.Response(200, json={"response": "over http", "model": "m", "usage": {}})
+
+    async def run():
+        # Nothing listens on the WebSocket port, so every call goes over HTTP
+        client = AIClient(base_url="http://127.0.0.1:9", transport="ws")
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(answer))
+        text = await client.generate_content(prompt="Which move?", cache=False)
+        await client.close()
+        return client, text
+
+    client, text = asyncio.run(run())
+    assert text == "over http"
+    assert client.ws_fallbacks == 1
+    assert posted[0]["prompt"] == "Which move?"
+
+
+def test_server_answers_requests_without_an_id_in_order(monkeypatch):
+    async def generate_content(request):
+        await asyncio.sleep(0.1 if request.prompt == "slow" else 0.0)
+        return ai_server.ModelResponse(response=request.prompt, model="m", usage={})
+
+    monkeypatch.setattr(ai_server, "generate_content", generate_content)
+
+    async def run():
+        incoming = [{"type": "websocket.connect"}]
+        incoming += [{"type": "websocket.receive", "text": json.dumps({"prompt": prompt})} for prompt in ("slow", "fast")]
+        incoming.append({"type": "websocket.disconnect", "code": 1000})
+        sent = []
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "websocket", "path": "/ws", "raw_path": b"/ws", "query_string": b"", "headers": [],
+                 "scheme": "ws", "server": ("testserver", 80), "client": ("testclient", 1), "root_path": "",
+                 "subprotocols": []}
+        await ai_server.app(scope, receive, send)
+        return [json.loads(message["text"])["response"] for message in sent if message["type"] == "websocket.send"]
+
+    assert asyncio.run(run()) == ["slow", "fast"]
@@ -0,0 +1,57 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import ai_server
+from ai_client import AIClient
+from fakes import FakeMessages
+from telemetry import registry, trace
+
+
+@pytest.fixture(autouse=True)
+def upstream(monkeypatch):
+    monkeypatch.setattr(ai_server, "async_client", SimpleNamespace(messages=FakeMessages(delay=0.02)))
+
+
+def asgi_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=ai_server.app), base_url="http://ai-server")
+
+
+def test_batch_size_fits_the_limiter():
+    assert ai_server.MAX_BATCH_SIZE <= ai_server.limiter.max_concurrency + ai_server.limiter.max_queue
+
+
+def test_full_batch_is_not_shed_by_its_own_items():
+    async def run():
+        requests = [{"prompt": f"Pikachu used Tackle {i}!"} for i in range(ai_server.MAX_BATCH_SIZE)]
+        async with asgi_client() as client:
+            ok = await client.post("/generate_batch", json={"requests": requests})
+            too_big = await client.post("/generate_batch", json={"requests": requests + requests[:1]})
+        return ok, too_big
+
+    ok, too_big = asyncio.run(run())
+    assert ok.status_code == 200
+    assert [item["status_code"] for item in ok.json()["responses"]] == [200] * ai_server.MAX_BATCH_SIZE
+    assert too_big.status_code == 413
+
+
+def test_batched_items_keep_their_callers_trace_ids():
+    async def run():
+        client = AIClient(base_url="http://ai-server", batch_window=0.05, max_batch_size=8, cache=None)
+        client.client = asgi_client()
+
+        async def call(trace_id: str) -> str:
+            with trace(trace_id):
+                return await client.generate_content(prompt=f"Personality for {trace_id}", kind="personality")
+
+        results = await asyncio.gather(call("trace-a"), call("trace-b"))
+        await client.close()
+        return client, results
+
+    client, results = asyncio.run(run())
+    assert results == ["ok", "ok"]
+    assert client.batches == 1
+    for trace_id in ("trace-a", "trace-b"):
+        assert "anthropic.messages.create" in [span["name"] for span in registry.trace(trace_id)]
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+import server
+from battle_engine import StatRecord, move_damage
+from pokemon_store import PokemonStore
+from roster import RosterIndex
+from wire import species_summary
+
+
+def species(name, types, attack, defense, hp=60):
+    stats = {"hp": hp, "attack": attack, "defense": defense, "special-attack": 40, "special-defense": 40, "speed": 50}
+    return {
+        "name": name,
+        "id": 1,
+        "types": [{"slot": slot, "type": {"name": t}} for slot, t in enumerate(types, 1)],
+        "stats": [{"base_stat": value, "stat": {"name": stat}} for stat, value in stats.items()],
+        "sprites": {"front_default": None},
+        "moves": []
+    }
+
+
+POKEAPI = {
+    "stab-rattata": species("stab-rattata", ["normal"], attack=56, defense=35),
+    "stab-charmander": species("stab-charmander", ["fire"], attack=52, defense=43)
+}
+
+
+@pytest.fixture
+def game(monkeypatch, tmp_path):
+    async def fetch(name):
+        return POKEAPI[name]
+
+    roster = RosterIndex(path=None)
+    roster.set_names(["stab-rattata"])
+    monkeypatch.setattr(server, "roster", roster)
+    monkeypatch.setattr(server, "pokemon_store", PokemonStore(db_path=str(tmp_path / "pokemon.sqlite3"), fetcher=fetch))
+    return server.PokemonGame()
+
+
+def expected_damage(attacker, defender, multiplier):
+    return move_damage(StatRecord.from_species(attacker), StatRecord.from_species(defender), 40, multiplier)
+
+
+def test_caught_pokemon_get_stab(game):
+    async def play():
+        caught = await game.catch_pokemon()
+        # The species frame goes out before the first attack, as in handle_catch_attempt
+        species_summary(caught)
+        assert await game.select_pokemon("stab-rattata")
+        game.opponent_pokemon = {**POKEAPI["stab-charmander"], "hp": 100}
+        game.attack(game.current_pokemon, game.opponent_pokemon, "Tackle")
+        return caught
+
+    caught = asyncio.run(play())
+    assert caught["types"] == POKEAPI["stab-rattata"]["types"]
+    damage = 100 - game.opponent_pokemon["hp"]
+    assert damage == expected_damage(POKEAPI["stab-rattata"], POKEAPI["stab-charmander"], 1.5)
+    assert damage > expected_damage(POKEAPI["stab-rattata"], POKEAPI["stab-charmander"], 1.0)
+
+
+def test_resumed_games_keep_stab(game):
+    async def play():
+        await game.catch_pokemon()
+        await game.select_pokemon("stab-rattata")
+        game.opponent_pokemon = {**POKEAPI["stab-charmander"], "hp": 100}
+        resumed = await server.PokemonGame.from_dict(game.to_dict())
+        resumed.attack(resumed.current_pokemon, resumed.opponent_pokemon, "Tackle")
+        return resumed
+
+    resumed = asyncio.run(play())
+    assert 100 - resumed.opponent_pokemon["hp"] == expected_damage(POKEAPI["stab-rattata"], POKEAPI["stab-charmander"], 1.5)
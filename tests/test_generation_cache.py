@@ -0,0 +1,61 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+
+import ai_server
+from ai_client import AIClient
+from generation_cache import GenerationCache
+from model_router import TEMPLATE, template_text
+
+
+def test_template_fallbacks_are_not_cached(tmp_path):
+    cache = GenerationCache(disk_path=str(tmp_path / "generations.sqlite3"))
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return "Likes collecting shiny stones.", {}, TEMPLATE
+
+    async def run():
+        return [await cache.fetch("key", compute) for _ in range(2)]
+
+    assert asyncio.run(run()) == [("Likes collecting shiny stones.", {}, TEMPLATE)] * 2
+    assert len(calls) == 2
+    assert cache.get("key") is None
+    cache.close()
+
+
+def test_model_generations_are_cached_with_their_model(tmp_path):
+    path = str(tmp_path / "generations.sqlite3")
+    cache = GenerationCache(disk_path=path)
+
+    async def compute():
+        return "Naps in sunbeams.", {"output_tokens": 4}, "claude-3-haiku-20240307"
+
+    asyncio.run(cache.fetch("key", compute))
+    cache.close()
+    reopened = GenerationCache(disk_path=path)
+    assert reopened.get("key") == ("Naps in sunbeams.", {"output_tokens": 4}, "claude-3-haiku-20240307")
+    reopened.close()
+
+
+def test_ai_client_skips_caching_router_templates(monkeypatch):
+    async def create(**kwargs):
+        raise RuntimeError("upstream unavailable")
+
+    monkeypatch.setattr(ai_server, "async_client", SimpleNamespace(messages=SimpleNamespace(create=create)))
+
+    async def run():
+        client = AIClient(base_url="http://ai-server", cache=GenerationCache())
+        client.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=ai_server.app), base_url="http://ai-server")
+        stock = await client.generate_content(prompt="Which move?", kind="recommendation", temperature=0.2)
+        withheld = await client.generate_content(prompt="Which move?", kind="recommendation", temperature=0.2, fallback=False)
+        await client.close()
+        return client, stock, withheld
+
+    client, stock, withheld = asyncio.run(run())
+    assert stock == template_text("recommendation", "")
+    assert withheld == ""
+    assert client.cache.stats()["entries"] == 0
+    assert client.cache.misses == 2
@@ -0,0 +1,19 @@
+import asyncio
+
+import httpx
+
+import ai_server
+
+
+def test_request_duration_is_labelled_by_route():
+    async def run():
+        transport = httpx.ASGITransport(app=ai_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://ai-server") as client:
+            await client.get("/healthz")
+            for i in range(5):
+                await client.get(f"/no-such-path-{i}")
+
+    ai_server.request_duration.values.clear()
+    asyncio.run(run())
+    paths = {dict(key)["path"]: sum(counts) for key, (counts, _) in ai_server.request_duration.values.items()}
+    assert paths == {"/healthz": 1, "other": 5}
@@ -0,0 +1,83 @@
+import asyncio
+import time
+import contextlib
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+
+from model_router import ModelRouter, Route, Tier
+
+
+def tiers():
+    return [
+        Tier("fast", "fast-model", expected_latency=0.05, input_cost=0.0, output_cost=0.0),
+        Tier("balanced", "balanced-model", expected_latency=0.1, input_cost=0.0, output_cost=0.0)
+    ]
+
+
+def test_hung_tier_leaves_time_for_the_faster_one():
+    router = ModelRouter(tiers=tiers(), routes={"default": Route("balanced", 100, deadline=1.0)}, baseline_tier="balanced")
+
+    async def call(model, prompt, max_tokens):
+        await asyncio.sleep(10.0 if model == "balanced-model" else 0.01)
+        return SimpleNamespace(response=model, usage={})
+
+    started = time.perf_counter()
+    result, decision = asyncio.run(router.run("commentary", "Pikachu used Tackle!", 100, None, call))
+    elapsed = time.perf_counter() - started
+
+    assert result.response == "fast-model"
+    assert decision["tier"] == "fast" and decision["reason"] == "timeout"
+    assert elapsed < 0.5
+
+
+def test_last_resort_gets_the_whole_deadline():
+    router = ModelRouter(tiers=tiers(), routes={"default": Route("fast", 100, deadline=1.0)}, baseline_tier="fast")
+
+    async def call(model, prompt, max_tokens):
+        # Slower than the tier's prediction, but within the deadline
+        await asyncio.sleep(0.3)
+        return SimpleNamespace(response=model, usage={})
+
+    result, decision = asyncio.run(router.run(None, "Summarize the battle.", 100, None, call))
+    assert result.response == "fast-model"
+    assert decision["tier"] == "fast"
+
+
+def test_queue_wait_is_not_counted_as_tier_latency():
+    fast, balanced = tiers()
+    router = ModelRouter(tiers=[fast, balanced], routes={"default": Route("fast", 100, deadline=1.0)}, baseline_tier="fast")
+
+    @contextlib.asynccontextmanager
+    async def slot():
+        await asyncio.sleep(0.2)
+        yield
+
+    async def call(model, prompt, max_tokens):
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(response=model, usage={})
+
+    result, decision = asyncio.run(router.run(None, "Summarize the battle.", 100, None, call, slot=slot))
+    assert decision["tier"] == "fast" and decision["reason"] == "preferred"
+    assert fast.latency < 0.1
+
+
+def test_shed_requests_are_not_routed_around():
+    router = ModelRouter(tiers=tiers(), routes={"default": Route("balanced", 100, deadline=1.0)}, baseline_tier="balanced")
+    calls = []
+
+    @contextlib.asynccontextmanager
+    async def slot():
+        raise HTTPException(status_code=429, detail="full")
+        yield
+
+    async def call(model, prompt, max_tokens):
+        calls.append(model)
+        return SimpleNamespace(response=model, usage={})
+
+    try:
+        asyncio.run(router.run(None, "Summarize the battle.", 100, None, call, slot=slot))
+        raise AssertionError("a shed request was routed to another tier")
+    except HTTPException as e:
+        assert e.status_code == 429
+    assert calls == []
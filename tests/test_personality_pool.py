@@ -0,0 +1,40 @@
+import asyncio
+
+from personality_pool import PersonalityPool
+
+
+def test_cancelled_run_stops_fills_before_returning(tmp_path):
+    started = []
+
+    async def generate(name):
+        started.append(name)
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            # Like an HTTP client closing its connection, unwinding takes a moment
+            await asyncio.sleep(0.02)
+            raise
+        return f"{name} hums a tune nobody else has ever heard."
+
+    pool = PersonalityPool(
+        db_path=str(tmp_path / "pool.sqlite3"),
+        generate=generate,
+        species=lambda: ["pikachu", "eevee"],
+        concurrency=2,
+        rate=1000.0
+    )
+
+    async def run():
+        worker = asyncio.create_task(pool.run())
+        while len(started) < 2:
+            await asyncio.sleep(0.001)
+        fills = list(pool._fills)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        # Shutdown closes the pool right after this; a fill still running could write to the closed connection
+        return fills, [task.done() for task in fills], pool.active
+
+    fills, done, active = asyncio.run(run())
+    pool.close()
+    assert fills and all(done)
+    assert active == 0 and pool.generated == 0
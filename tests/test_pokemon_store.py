@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+from pokemon_store import PokemonStore
+
+
+def species(name, id):
+    return {
+        "name": name,
+        "id": id,
+        "types": [{"type": {"name": "normal"}}],
+        "stats": [{"base_stat": 50, "stat": {"name": "hp"}}],
+        "sprites": {"front_default": f"https://img/{id}.png", "back_default": "x", "other": {"home": {}}},
+        "moves": [{"move": {"name": "tackle"}}]
+    }
+
+
+def test_offline_store_serves_seeded_species(tmp_path):
+    seed = tmp_path / "seed.json"
+    seed.write_text(json.dumps([species("pidgey", 16), species("rattata", 19)]))
+    store = PokemonStore(str(tmp_path / "pokemon.sqlite3"), offline=True)
+    assert store.seed_from_file(str(seed)) == 2
+    store.close()
+
+    async def scenario():
+        # A fresh store on the same file reads the seeded records from disk only
+        offline = PokemonStore(str(tmp_path / "pokemon.sqlite3"), offline=True)
+        try:
+            pidgey = await offline.get("pidgey")
+            try:
+                await offline.get("mew")
+                raise AssertionError("offline miss did not raise")
+            except LookupError:
+                pass
+            return pidgey, offline.species_names()
+        finally:
+            offline.close()
+
+    pidgey, names = asyncio.run(scenario())
+    assert names == ["pidgey", "rattata"]
+    assert pidgey["sprites"] == {"front_default": "https://img/16.png"}
+    assert "moves" not in pidgey
+
+
+def test_counters_and_coalesced_misses(tmp_path):
+    fetched = []
+
+    async def fetcher(name):
+        fetched.append(name)
+        await asyncio.sleep(0.01)
+        return species(name, 25)
+
+    async def scenario():
+        store = PokemonStore(str(tmp_path / "pokemon.sqlite3"), max_memory_entries=1, fetcher=fetcher)
+        try:
+            first = await asyncio.gather(*(store.get("pikachu") for _ in range(5)))
+            await store.get("pikachu")
+            store.put(species("eevee", 133))  # evicts pikachu from memory
+            await store.get("pikachu")
+            return first, store.stats()
+        finally:
+            store.close()
+
+    first, stats = asyncio.run(scenario())
+    assert fetched == ["pikachu"]
+    assert all(record["name"] == "pikachu" for record in first)
+    assert first[0] is not first[1]
+    assert stats["misses"] == 1
+    assert stats["coalesced"] == 4
+    assert stats["memory_hits"] == 1
+    assert stats["disk_hits"] == 1
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from roster import RosterIndex
+
+POKEAPI = {
+    "/generation/generation-iii": {"pokemon_species": [{"name": "deoxys"}, {"name": "beldum"}]},
+    "/pokemon-species/deoxys": {"varieties": [
+        {"pokemon": {"name": "deoxys-normal"}}, {"pokemon": {"name": "deoxys-attack"}}
+    ]},
+    "/pokemon-species/beldum": {"varieties": [{"pokemon": {"name": "beldum"}}]}
+}
+
+
+async def fetch_json(path):
+    return POKEAPI[path]
+
+
+def test_generation_filter_includes_forms():
+    roster = RosterIndex(fetch_json=fetch_json, path=None)
+    roster.set_names(["bulbasaur", "deoxys-normal", "deoxys-attack", "beldum"])
+
+    async def run():
+        return {await roster.sample(generation="generation-iii") for _ in range(200)}
+
+    assert asyncio.run(run()) == {"deoxys-normal", "deoxys-attack", "beldum"}
+
+
+def test_filters_fail_offline_without_fetching():
+    calls = []
+
+    async def fetch(path):
+        calls.append(path)
+        return POKEAPI[path]
+
+    roster = RosterIndex(fetch_json=fetch, path=None, offline=True)
+    roster.set_names(["bulbasaur", "beldum"])
+    with pytest.raises(LookupError, match="offline"):
+        asyncio.run(roster.sample(pokemon_type="steel"))
+    assert calls == []
+    assert asyncio.run(roster.sample()) in {"bulbasaur", "beldum"}
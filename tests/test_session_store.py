@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+import pytest
+
+from session_store import MemorySessionStore, SessionStore, SQLiteSessionStore
+
+
+def test_base_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_memory_store_purges_expired_sessions():
+    async def run():
+        store = MemorySessionStore(ttl=60.0)
+        await store.save("live", {"turn": 1})
+        store.ttl = -1.0
+        await store.save("stale", {"turn": 1})
+        assert await store.purge_expired() == 1
+        assert set(store._sessions) == {"live"}
+
+    asyncio.run(run())
+
+
+def test_save_purges_periodically(tmp_path):
+    async def run():
+        store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), ttl=-1.0)
+        await store.save("stale", {"turn": 1})
+        store.ttl, store._next_purge = 60.0, 0.0
+        await store.save("live", {"turn": 2})
+        rows = store._db.execute("SELECT token FROM sessions").fetchall()
+        store.close()
+        return rows
+
+    assert asyncio.run(run()) == [("live",)]
+
+
+def test_sqlite_queries_run_off_the_event_loop(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    threads = set()
+    execute = store._execute
+
+    def record(*args):
+        threads.add(threading.get_ident())
+        return execute(*args)
+
+    store._execute = record
+
+    async def run():
+        await store.save("token", {"turn": 3})
+        return await store.load("token")
+
+    assert asyncio.run(run()) == {"turn": 3}
+    store.close()
+    assert threads and threading.get_ident() not in threads
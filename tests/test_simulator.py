@@ -0,0 +1,100 @@
+import asyncio
+import json
+import zlib
+
+import httpx
+
+from battle_engine import StatRecord, stat_record
+from moves import MoveIndex
+from pokemon_store import PokemonStore
+from simulator import simulate_batch, simulate_matchups, simulation_pool
+
+
+def record(name, types, hp=120, attack=60, defense=60):
+    return StatRecord(name, 1, hp, attack, defense, 50, 50, 50, types=types)
+
+
+def test_opponent_moves_vary_between_battles():
+    pairs = [(record("snorlax", ("normal",), hp=200), record("absol", ("dark",), hp=200))]
+    result = simulate_batch(pairs, 200, seed=1)[0]
+    assert len(result["turns"]) > 1
+    assert result["player_wins"] + result["opponent_wins"] == 200
+
+
+def test_damage_model_applies_types():
+    # Tackle cannot touch a ghost; Bite is super effective against it
+    pairs = [(record("rattata", ("normal",)), record("gastly", ("ghost",)))]
+    result = simulate_batch(pairs, 20, seed=1)[0]
+    assert result["player_move"] == "Bite"
+    assert result["player_wins"] == 20
+
+
+def test_worker_processes_use_the_given_move_index():
+    index = MoveIndex(path=None)
+    index.effectiveness["dark"]["ghost"] = 0.0
+    pairs = [(record("rattata", ("normal",)), record(f"gastly-{i}", ("ghost",))) for i in range(2)]
+    results = simulate_matchups(pairs, 10, processes=2, move_index=index, seed=1)
+    assert [result["player_wins"] for result in results] == [0, 0]
+
+
+def test_store_refetches_records_cached_without_types(tmp_path):
+    path = str(tmp_path / "pokemon.sqlite3")
+    fetched = []
+
+    async def fetch(name):
+        fetched.append(name)
+        return {"name": name, "id": 19, "types": [{"slot": 1, "type": {"name": "normal"}}], "stats": [], "sprites": {}}
+
+    old = {"name": "rattata", "id": 19, "stats": [], "sprites": {}}
+    store = PokemonStore(db_path=path, fetcher=fetch)
+    store._connect().execute(
+        "INSERT INTO species (name, id, data) VALUES (?, ?, ?)",
+        ("rattata", 19, zlib.compress(json.dumps(old).encode("utf-8")))
+    )
+    store._connect().commit()
+
+    # Offline there is nothing to refetch from, so the old record is served as it is
+    offline = PokemonStore(db_path=path, offline=True)
+    assert asyncio.run(offline.get("rattata")) == old
+    offline.close()
+
+    assert asyncio.run(store.get("rattata"))["types"][0]["type"]["name"] == "normal"
+    assert asyncio.run(store.get("rattata"))["types"]
+    assert fetched == ["rattata"]
+    store.close()
+
+
+def test_stat_record_caches_typeless_species_until_types_arrive():
+    stats = [{"base_stat": 30, "stat": {"name": "hp"}}]
+    typeless = {"name": "zubat-test", "id": 41, "stats": stats}
+    assert stat_record(typeless) is stat_record(typeless)
+    typed = stat_record({**typeless, "types": [{"slot": 1, "type": {"name": "poison"}}]})
+    assert typed.types == ("poison",)
+    assert stat_record(typeless) is typed
+
+
+def test_shared_pool_runs_every_chunk():
+    pairs = [(record("rattata", ("normal",)), record(f"pidgey-{i}", ("normal", "flying"))) for i in range(3)]
+    pool = simulation_pool(2)
+    try:
+        first = simulate_matchups(pairs, 10, processes=2, seed=1, executor=pool)
+        again = simulate_matchups(pairs, 10, processes=2, seed=1, executor=pool)
+    finally:
+        pool.shutdown()
+    assert [result["opponent"] for result in first] == ["pidgey-0", "pidgey-1", "pidgey-2"]
+    assert first == again
+
+
+def test_simulate_rejects_oversized_requests():
+    import server
+
+    async def post(body):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://game") as client:
+            return await client.post("/simulate", json=body)
+
+    too_many_battles = asyncio.run(post({"player": "pikachu", "random_opponents": 200, "battles": 10000}))
+    assert too_many_battles.status_code == 400
+    assert "battles" in too_many_battles.json()["detail"]
+    too_many_opponents = asyncio.run(post({"player": "pikachu", "opponents": ["bulbasaur"] * 501}))
+    assert too_many_opponents.status_code == 422
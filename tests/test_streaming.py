@@ -0,0 +1,89 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import ai_server
+from ai_client import AIClient
+from fakes import FakeMessages
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Replaces ai_server's Anthropic client with a streaming fake."""
+    def install(**kwargs) -> FakeMessages:
+        messages = FakeMessages(**kwargs)
+        monkeypatch.setattr(ai_server, "async_client", SimpleNamespace(messages=messages))
+        return messages
+    return install
+
+
+def asgi_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=ai_server.app), base_url="http://ai-server")
+
+
+async def stream_events(payload):
+    async with asgi_client() as client:
+        response = await client.post("/generate_stream", json=payload)
+    return response, [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_generate_stream_yields_deltas_then_done(upstream):
+    upstream(chunks=["Pikachu ", "dodges ", "and strikes!"])
+    response, events = asyncio.run(stream_events({"prompt": "Pikachu used Tackle!", "kind": "commentary"}))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [event["text"] for event in events if event["type"] == "delta"] == ["Pikachu ", "dodges ", "and strikes!"]
+    done = events[-1]
+    assert done["type"] == "done"
+    assert done["usage"] == {"input_tokens": 12, "output_tokens": 3}
+    assert done["ttft_ms"] is not None and done["ttft_ms"] >= 0
+    assert done["route"]["kind"] == "commentary"
+
+
+def test_generate_stream_reports_upstream_failure_as_error_event(upstream):
+    upstream(chunks=["Pikachu ", "dodges ", "and strikes!"], fail_after=1)
+    response, events = asyncio.run(stream_events({"prompt": "Pikachu used Tackle!"}))
+
+    assert response.status_code == 200
+    assert events[0] == {"type": "delta", "text": "Pikachu "}
+    assert events[-1]["type"] == "error"
+    assert "dropped" in events[-1]["detail"]
+    assert ai_server.limiter.active == 0
+
+
+def test_ai_client_stream_content_yields_chunks_and_records_ttft(upstream):
+    upstream(chunks=["A ", "critical ", "hit!"])
+
+    async def collect():
+        client = AIClient(base_url="http://ai-server")
+        client.client = asgi_client()
+        chunks = [chunk async for chunk in client.stream_content(prompt="Bite!", kind="commentary")]
+        await client.close()
+        return client, chunks
+
+    client, chunks = asyncio.run(collect())
+    assert chunks == ["A ", "critical ", "hit!"]
+    stats = client.stats()
+    assert stats["streams"] == 1
+    assert stats["errors"] == 0
+    assert stats["avg_ttft_ms"] > 0
+    assert client.in_flight == 0
+
+
+def test_ai_client_stream_content_ends_early_on_error_event(upstream):
+    upstream(chunks=["A ", "critical ", "hit!"], fail_after=2)
+
+    async def collect():
+        client = AIClient(base_url="http://ai-server")
+        client.client = asgi_client()
+        chunks = [chunk async for chunk in client.stream_content(prompt="Bite!")]
+        await client.close()
+        return client, chunks
+
+    client, chunks = asyncio.run(collect())
+    assert chunks == ["A ", "critical "]
+    assert client.errors == 1
@@ -0,0 +1,154 @@
+import asyncio
+import contextlib
+import json
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+import server
+from fakes import FakeWebSocket
+from wire import SpeciesTracker
+
+
+def pokemon(name, types, hp=500):
+    stats = {"hp": hp, "attack": 50, "defense": 50, "special-attack": 50, "special-defense": 50, "speed": 50}
+    return {
+        "name": name,
+        "id": 1,
+        "types": [{"slot": slot, "type": {"name": t}} for slot, t in enumerate(types, 1)],
+        "stats": [{"base_stat": value, "stat": {"name": stat}} for stat, value in stats.items()],
+        "sprites": {"front_default": None},
+        "moves": ["Tackle", "Bite"],
+        "hp": hp
+    }
+
+
+class SlowAI:
+    """Stands in for server.ai_client; rationales and commentary wait until `hold` is set."""
+
+    def __init__(self):
+        self.hold = asyncio.Event()
+
+    async def generate_content(self, prompt, **kwargs):
+        await self.hold.wait()
+        return "Bite lands hard."
+
+    async def stream_content(self, prompt, **kwargs):
+        await self.hold.wait()
+        yield "Chomp!"
+
+
+@pytest.fixture
+def ai(monkeypatch):
+    slow = SlowAI()
+    monkeypatch.setattr(server, "ai_client", slow)
+    return slow
+
+
+def connect() -> tuple:
+    """server.py's /ws pipeline with a battle already under way."""
+    ws = FakeWebSocket()
+    game = server.PokemonGame()
+    game.current_pokemon = pokemon("ws-rattata", ["normal"])
+    game.opponent_pokemon = pokemon("ws-gastly", ["ghost", "poison"])
+    state = {"game": game, "token": "test-token", "species": SpeciesTracker()}
+    pipeline = server.MessagePipeline(ws, lambda message: server.handle_message(pipeline, state, message))
+    return ws, pipeline, asyncio.create_task(pipeline.run())
+
+
+async def next_of(ws: FakeWebSocket, *types: str) -> dict:
+    """The next frame of one of `types`, skipping server_log lines."""
+    while True:
+        frame = await asyncio.wait_for(ws.next_frame(), 1.0)
+        if frame["type"] in types:
+            return frame
+
+
+async def disconnect(ws: FakeWebSocket, runner: asyncio.Task) -> None:
+    ws.disconnect()
+    with contextlib.suppress(WebSocketDisconnect):
+        await runner
+
+
+def test_attack_is_answered_while_the_rationale_is_pending(ai):
+    async def run():
+        ws, pipeline, runner = connect()
+        ws.push(json.dumps({"type": "get_recommendation"}))
+        recommendation = await next_of(ws, "recommendation")
+        await asyncio.sleep(0.01)
+        pending = not pipeline.lanes["recommendation"].done()
+        ws.push(json.dumps({"type": "attack", "move": "Tackle"}))
+        frames = [await next_of(ws, "superseded", "game_state") for _ in range(2)]
+        await disconnect(ws, runner)
+        return recommendation, pending, frames
+
+    recommendation, pending, frames = asyncio.run(run())
+    assert recommendation["move"] == "Bite"
+    assert pending
+    assert frames[0] == {"type": "superseded", "lane": "recommendation"}
+    assert frames[1]["type"] == "game_state" and frames[1]["move"] == "Tackle"
+
+
+def test_rationale_arrives_when_nothing_supersedes_it(ai):
+    async def run():
+        ws, pipeline, runner = connect()
+        ws.push(json.dumps({"type": "get_recommendation"}))
+        await next_of(ws, "recommendation")
+        ai.hold.set()
+        rationale = await next_of(ws, "recommendation_rationale")
+        await disconnect(ws, runner)
+        return rationale
+
+    assert asyncio.run(run()) == {"type": "recommendation_rationale", "move": "Bite", "rationale": "Bite lands hard."}
+
+
+def test_next_attack_supersedes_streaming_commentary(ai):
+    async def run():
+        ws, pipeline, runner = connect()
+        ws.push(json.dumps({"type": "attack", "move": "Tackle"}))
+        await next_of(ws, "game_state")
+        await asyncio.sleep(0.01)
+        commentary = pipeline.lanes["commentary"]
+        ws.push(json.dumps({"type": "attack", "move": "Bite"}))
+        frames = [await next_of(ws, "superseded", "game_state", "description_chunk") for _ in range(2)]
+        cancelled = commentary.cancelled()
+        await disconnect(ws, runner)
+        return frames, cancelled
+
+    frames, cancelled = asyncio.run(run())
+    assert frames[0] == {"type": "superseded", "lane": "commentary"}
+    assert frames[1]["type"] == "game_state" and frames[1]["move"] == "Bite"
+    assert cancelled
+
+
+def test_disconnect_cancels_pending_lanes(ai):
+    async def run():
+        ws, pipeline, runner = connect()
+        ws.push(json.dumps({"type": "get_recommendation"}))
+        await next_of(ws, "recommendation")
+        await asyncio.sleep(0.01)
+        task = pipeline.lanes["recommendation"]
+        await disconnect(ws, runner)
+        return task, pipeline
+
+    task, pipeline = asyncio.run(run())
+    assert task.cancelled()
+    assert not pipeline.lanes and not pipeline.tasks
+
+
+def test_malformed_frames_do_not_close_the_session(ai):
+    async def run():
+        ws, pipeline, runner = connect()
+        for text in ("not json", "[1, 2]", json.dumps({"move": "Tackle"})):
+            ws.push(text)
+        errors = [await ws.next_frame() for _ in range(3)]
+        ws.push(json.dumps({"type": "attack", "move": "Tackle"}))
+        state = await next_of(ws, "game_state")
+        still_running = not runner.done()
+        await disconnect(ws, runner)
+        return errors, state, still_running
+
+    errors, state, still_running = asyncio.run(run())
+    assert errors == [{"type": "error", "message": "Malformed message."}] * 3
+    assert state["move"] == "Tackle"
+    assert still_running
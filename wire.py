@@ -0,0 +1,67 @@
+from typing import Any, Dict, List, Optional
+
+from battle_engine import stat_record
+
+# Stats sent to the browser, in StatRecord attribute names
+WIRE_STATS = ("hp", "attack", "defense", "special_attack", "special_defense", "speed")
+
+
+def species_summary(species: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The static part of a species as the client sees it: one sprite URL and
+    flat base stats instead of PokeAPI's nested `stats` list and `sprites` tree.
+    """
+    record = stat_record(species)
+    sprites = species.get('sprites') or {}
+    return {
+        "name": species['name'],
+        "id": species.get('id'),
+        "sprite": sprites.get('front_default'),
+        "stats": {stat: getattr(record, stat) for stat in WIRE_STATS}
+    }
+
+
+class SpeciesTracker:
+    """
+    Remembers which species a connection has been sent, so static species
+    data crosses the wire once per session and later frames refer to
+    species by name.
+    """
+
+    def __init__(self):
+        self.sent: set = set()
+
+    def frame(self, *species: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """A `species` frame for those not sent yet, or None if the client has them all."""
+        new: List[Dict[str, Any]] = []
+        for entry in species:
+            if entry and entry['name'] not in self.sent:
+                self.sent.add(entry['name'])
+                new.append(species_summary(entry))
+        return {"type": "species", "species": new} if new else None
+
+
+def battle_start(player: Dict[str, Any], opponent: Dict[str, Any]) -> Dict[str, Any]:
+    """Everything about a new battle that is not static species data."""
+    return {
+        "player": player['name'],
+        "opponent": opponent['name'],
+        "moves": player.get('moves', []),
+        "player_hp": player['hp'],
+        "opponent_hp": opponent['hp']
+    }
+
+
+def turn_delta(player: Dict[str, Any], opponent: Dict[str, Any], description: str, move: str, winner: Optional[str]) -> Dict[str, Any]:
+    """What one attack changed: both HPs, the battle log line and the winner, if any."""
+    return {
+        "player_hp": player['hp'],
+        "opponent_hp": opponent['hp'],
+        "description": description,
+        "move": move,
+        "winner": winner
+    }
+
+
+def caught_entry(pokemon: Dict[str, Any]) -> Dict[str, Any]:
+    return {"name": pokemon['name'], "personality": pokemon.get('personality')}
@@ -0,0 +1,184 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from telemetry import registry
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson for faster frame encoding
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install msgpack for binary frames
+    msgpack = None
+
+superseded_tasks = registry.counter(
+    "ws_superseded_tasks_total", "Background /ws tasks cancelled because a newer message made them stale."
+)
+
+
+def encode(payload: Any) -> str:
+    """Serializes an outgoing frame, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload).decode()
+    return json.dumps(payload, separators=(",", ":"))
+
+
+def decode(data: str | bytes) -> Any:
+    """Parses an incoming frame; raises ValueError on malformed JSON."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class JSONCodec:
+    name = "json"
+    binary = False
+    encode = staticmethod(encode)
+    decode = staticmethod(decode)
+
+
+class MessagePackCodec:
+    name = "msgpack"
+    binary = True
+
+    @staticmethod
+    def encode(payload: Any) -> bytes:
+        return msgpack.packb(payload)
+
+    @staticmethod
+    def decode(data: bytes) -> Any:
+        try:
+            return msgpack.unpackb(data)
+        except (msgpack.UnpackException, ValueError) as e:
+            raise ValueError(str(e)) from e
+
+
+def codec_for(name: Optional[str]) -> Any:
+    """The codec a client asked for; JSON unless it asked for msgpack and msgpack is installed."""
+    if name == "msgpack" and msgpack is not None:
+        return MessagePackCodec
+    return JSONCodec
+
+
+class MessagePipeline:
+    """
+    Per-connection reader, dispatcher and writer for a WebSocket.
+
+    The reader parses frames into a bounded inbox. The dispatcher hands
+    messages to `handler` one at a time, in arrival order, so game state
+    changes stay sequential. The writer sends queued payloads in the order
+    they were queued, as JSON text or, with MessagePackCodec, binary
+    MessagePack frames. Slow work such as AI calls runs in tasks started with
+    spawn(), so the next message is read while it is pending. A task
+    spawned in a lane replaces the lane's previous task, and cancel() drops
+    lanes that a newer message has made stale; the client is sent
+    {"type": "superseded", "lane": ...} for each task dropped that way.
+    """
+
+    def __init__(
+        self,
+        websocket: Any,
+        handler: Callable[[Dict[str, Any]], Awaitable[None]],
+        max_inbox: int = 64,
+        max_outbox: int = 256,
+        codec: Any = JSONCodec
+    ):
+        self.websocket = websocket
+        self.handler = handler
+        self.codec = codec
+        self.inbox: asyncio.Queue = asyncio.Queue(max_inbox)
+        self.outbox: asyncio.Queue = asyncio.Queue(max_outbox)
+        self.lanes: Dict[str, asyncio.Task] = {}
+        self.tasks: Set[asyncio.Task] = set()
+
+    async def send(self, payload: Dict[str, Any]) -> None:
+        """Queues a frame; waits only if the client has fallen max_outbox frames behind."""
+        await self.outbox.put(payload)
+
+    def send_nowait(self, payload: Dict[str, Any]) -> None:
+        """Best-effort send for notices; dropped if the outbox is full."""
+        try:
+            self.outbox.put_nowait(payload)
+        except asyncio.QueueFull:
+            pass
+
+    def spawn(self, coro: Awaitable[None], lane: Optional[str] = None) -> asyncio.Task:
+        """Runs `coro` in the background, superseding the task already in `lane`."""
+        if lane is not None:
+            self.cancel(lane)
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self._task_done)
+        if lane is not None:
+            self.lanes[lane] = task
+        return task
+
+    def cancel(self, *lanes: str) -> None:
+        for lane in lanes:
+            task = self.lanes.pop(lane, None)
+            if task is not None and not task.done():
+                task.cancel()
+                superseded_tasks.inc(lane=lane)
+                # Queued ahead of whatever the superseding message sends, so the client can drop partial output
+                self.send_nowait({"type": "superseded", "lane": lane})
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self.tasks.discard(task)
+        for lane, lane_task in list(self.lanes.items()):
+            if lane_task is task:
+                del self.lanes[lane]
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Background task failed: {task.exception()!r}")
+
+    async def _read(self) -> None:
+        while True:
+            if self.codec.binary:
+                data = await self.websocket.receive_bytes()
+            else:
+                data = await self.websocket.receive_text()
+            try:
+                message = self.codec.decode(data)
+            except ValueError:
+                message = None
+            if not isinstance(message, dict) or "type" not in message:
+                await self.send({"type": "error", "message": "Malformed message."})
+                continue
+            await self.inbox.put(message)
+
+    async def _dispatch(self) -> None:
+        while True:
+            message = await self.inbox.get()
+            try:
+                await self.handler(message)
+            except Exception as e:
+                print(f"Error handling {message['type']} message: {e}")
+                await self.send({"type": "error", "message": f"An error occurred: {e}"})
+
+    async def _write(self) -> None:
+        while True:
+            frame = self.codec.encode(await self.outbox.get())
+            if self.codec.binary:
+                await self.websocket.send_bytes(frame)
+            else:
+                await self.websocket.send_text(frame)
+
+    async def run(self) -> None:
+        """Runs until the client disconnects or the socket fails, then cancels all pending work."""
+        workers: List[asyncio.Task] = [
+            asyncio.create_task(self._read()),
+            asyncio.create_task(self._dispatch()),
+            asyncio.create_task(self._write())
+        ]
+        try:
+            done, _ = await asyncio.wait(workers, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+        finally:
+            pending = workers + list(self.tasks)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)